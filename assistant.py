@@ -1,13 +1,53 @@
 import os
-import requests
+import json
+import httpx
+import random
+import asyncio
 import logging
+import importlib.util
 from dotenv import load_dotenv
+from response_cache import ResponseCache, Abandoned, cache_key
+from rate_limiter import PriorityRateLimiter, Overloaded, PRIORITY_CHAT, PRIORITY_BACKGROUND
+from conversation_memory import ConversationMemory
 
 logging.basicConfig(format='%(asctime)s - %(name)s - %(levelname)s - %(message)s', level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 load_dotenv()
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+GEMINI_URL = "https://generativelanguage.googleapis.com/v1beta/models/gemini-1.5-flash:generateContent"
+GEMINI_STREAM_URL = "https://generativelanguage.googleapis.com/v1beta/models/gemini-1.5-flash:streamGenerateContent?alt=sse"
+GEMINI_CONNECT_TIMEOUT = float(os.getenv("GEMINI_CONNECT_TIMEOUT", "5"))
+GEMINI_READ_TIMEOUT = float(os.getenv("GEMINI_READ_TIMEOUT", "60"))
+GEMINI_MAX_CONNECTIONS = int(os.getenv("GEMINI_MAX_CONNECTIONS", "50"))
+
+response_cache = ResponseCache(
+    max_entries=int(os.getenv("ASSISTANT_CACHE_SIZE", "1000")),
+    ttl=float(os.getenv("ASSISTANT_CACHE_TTL", "86400")),
+    path=os.getenv("ASSISTANT_CACHE_PATH")
+)
+response_cache.load()
+
+GEMINI_MAX_RETRIES = int(os.getenv("GEMINI_MAX_RETRIES", "3"))
+GEMINI_BACKOFF_BASE = float(os.getenv("GEMINI_BACKOFF_BASE", "1"))
+GEMINI_BACKOFF_MAX = float(os.getenv("GEMINI_BACKOFF_MAX", "30"))
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+memory = ConversationMemory(
+    max_tokens=int(os.getenv("CONVERSATION_MAX_TOKENS", "2000")),
+    max_chats=int(os.getenv("CONVERSATION_MAX_CHATS", "10000"))
+)
+_background_tasks = set()
+# Último resumo pendente de cada chat; o próximo espera por ele
+_summaries = {}
+
+# Limite compartilhado por todas as conversas, dimensionado pela cota do projeto
+rate_limiter = PriorityRateLimiter(
+    rate_per_minute=float(os.getenv("GEMINI_RATE_PER_MINUTE", "15")),
+    burst=int(os.getenv("GEMINI_BURST", "5")),
+    max_queue=int(os.getenv("GEMINI_MAX_QUEUE", "100")),
+    max_wait=float(os.getenv("GEMINI_MAX_WAIT", "30"))
+)
 
 BASE_PROMPT = """
 Você é o Vison, um assistente de IA executiva, especializado em gerenciamento de tempo e organização de projetos. Sua missão é ajudar os CEOs a serem mais produtivos, organizados e eficientes, oferecendo conselhos práticos, estratégias e sugestões baseadas em boas práticas de gestão. Responda de forma clara, amigável e concisa, sempre adaptando suas respostas ao contexto fornecido pelo usuário.
@@ -26,32 +66,198 @@ Exemplo:
   Resposta: "Isso parece um comando! Use os comandos específicos do bot como /schedule para agendar. Como posso te ajudar a gerenciar seu tempo ou projetos hoje?"
 """
 
+SUMMARY_PROMPT = """
+Você resume conversas entre um usuário e o Vision, um assistente de gestão de tempo e projetos. Escreva em português um resumo de até 5 frases com os fatos, tarefas, prazos e preferências que o usuário mencionou e os conselhos já dados, para servir de contexto às próximas respostas.
+"""
+
 TEMPERATURE = 0.7
+SUMMARY_TEMPERATURE = 0.2
 
-async def get_gemini_response(message: str, custom_prompt: str = BASE_PROMPT, temperature: float = TEMPERATURE) -> str:
-    url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-1.5-flash:generateContent?key={GEMINI_API_KEY}"
-    headers = {"Content-Type": "application/json"}
-    
-    full_prompt = f"{custom_prompt}\n\nPergunta do usuário: {message}"
-    
-    data = {
-        "contents": [{"parts": [{"text": full_prompt}]}],
+_client = None
+
+def get_http_client() -> httpx.AsyncClient:
+    # Cliente único com pool de conexões keep-alive (HTTP/2 quando o pacote h2 está instalado)
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            http2=importlib.util.find_spec("h2") is not None,
+            timeout=httpx.Timeout(GEMINI_READ_TIMEOUT, connect=GEMINI_CONNECT_TIMEOUT),
+            limits=httpx.Limits(max_connections=GEMINI_MAX_CONNECTIONS, max_keepalive_connections=GEMINI_MAX_CONNECTIONS),
+            headers={"Content-Type": "application/json", "x-goog-api-key": GEMINI_API_KEY or ""}
+        )
+    return _client
+
+async def close_http_client():
+    if _client is not None:
+        await _client.aclose()
+
+def _build_request(message: str, custom_prompt: str, temperature: float, history: list = (), summary: str = "") -> dict:
+    # O prompt base vai como system_instruction em vez de ser concatenado à pergunta
+    system_text = f"{custom_prompt}\n\nResumo da conversa até aqui: {summary}" if summary else custom_prompt
+    contents = [{"role": role, "parts": [{"text": text}]} for role, text in history]
+    contents.append({"role": "user", "parts": [{"text": message}]})
+
+    return {
+        "system_instruction": {"parts": [{"text": system_text}]},
+        "contents": contents,
         "generationConfig": {
             "temperature": temperature
         }
     }
 
+async def _summarize(chat_id: int, overflow: list, before: asyncio.Task = None):
+    # Resumos do mesmo chat rodam em fila: cada um parte do resultado do anterior
+    if before is not None:
+        await asyncio.gather(before, return_exceptions=True)
+    # Junta as mensagens que saíram da janela ao resumo anterior do chat
+    _, previous = memory.history(chat_id)
+    transcript = "\n".join(f"{'Usuário' if role == 'user' else 'Vision'}: {text}" for role, text in overflow)
+    message = f"Resumo anterior: {previous or '(nenhum)'}\n\nNovas mensagens:\n{transcript}"
+    data = _build_request(message, SUMMARY_PROMPT, SUMMARY_TEMPERATURE)
+    try:
+        summary = await _with_retries(lambda: _generate(data), PRIORITY_BACKGROUND)
+    except (httpx.HTTPError, Overloaded) as e:
+        logger.warning(f"Não foi possível resumir a conversa do chat {chat_id}: {e}")
+        summary = f"{previous} {transcript}"[-memory.max_tokens * 2:]
+    memory.set_summary(chat_id, summary.strip())
+
+def _remember(chat_id: int, message: str, reply: str):
+    overflow = memory.record(chat_id, message, reply)
+    if overflow:
+        task = asyncio.create_task(_summarize(chat_id, overflow, _summaries.get(chat_id)))
+        _summaries[chat_id] = task
+        _background_tasks.add(task)
+        task.add_done_callback(lambda done: _summary_done(chat_id, done))
+
+def _summary_done(chat_id: int, task: asyncio.Task):
+    _background_tasks.discard(task)
+    if _summaries.get(chat_id) is task:
+        del _summaries[chat_id]
+
+def forget_conversation(chat_id: int):
+    memory.clear(chat_id)
+
+def _retry_delay(error: httpx.HTTPError, attempt: int):
+    # Devolve quanto esperar antes de tentar de novo, ou None se o erro não vale nova tentativa
+    if isinstance(error, httpx.HTTPStatusError):
+        if error.response.status_code not in RETRYABLE_STATUS:
+            return None
+        retry_after = error.response.headers.get("Retry-After")
+        if retry_after and retry_after.isdigit():
+            return float(retry_after)
+    elif not isinstance(error, httpx.TransportError):
+        return None
+    # Backoff exponencial com jitter completo
+    return random.uniform(0, min(GEMINI_BACKOFF_MAX, GEMINI_BACKOFF_BASE * 2 ** attempt))
+
+async def _with_retries(send, priority: int):
+    for attempt in range(GEMINI_MAX_RETRIES + 1):
+        await rate_limiter.acquire(priority)
+        try:
+            return await send()
+        except httpx.HTTPError as e:
+            delay = _retry_delay(e, attempt)
+            if delay is None or attempt == GEMINI_MAX_RETRIES:
+                raise
+            if isinstance(e, httpx.HTTPStatusError) and e.response.status_code == 429:
+                rate_limiter.pause(delay)
+            logger.warning(f"Falha na API Gemini ({e}), nova tentativa em {delay:.1f}s")
+            await asyncio.sleep(delay)
+
+async def _generate(data: dict) -> str:
+    response = await get_http_client().post(GEMINI_URL, json=data)
+    response.raise_for_status()
+    result = response.json()
+    return result["candidates"][0]["content"]["parts"][0]["text"]
+
+EMPTY_RESPONSE_MESSAGE = "Desculpe, não consegui gerar uma resposta para essa mensagem. Tente reformular a pergunta"
+
+def _error_message(error: Exception) -> str:
+    if isinstance(error, Overloaded):
+        logger.warning(f"Requisição ao Gemini descartada: {error}")
+        return "Estou recebendo muitas mensagens agora. Tente novamente em alguns segundos"
+    if isinstance(error, httpx.HTTPStatusError) and error.response.status_code == 429:
+        return "Limite de requisições excedido, tente novamente mais tarde"
+    if isinstance(error, httpx.TimeoutException):
+        logger.error(f"Tempo esgotado na API Gemini: {error!r}")
+        return "Desculpe, a resposta demorou demais. Tente novamente em instantes"
+    logger.error(f"Erro na API Gemini: {error}")
+    return "Desculpe, ocorreu um erro ao processar sua mensagem"
+
+async def _open_stream(data: dict):
+    # Abre o stream e só devolve a resposta se o status for de sucesso, para que as
+    # novas tentativas aconteçam antes de qualquer texto chegar ao usuário
+    request = get_http_client().build_request("POST", GEMINI_STREAM_URL, json=data)
+    response = await get_http_client().send(request, stream=True)
     try:
-        response = requests.post(url, headers=headers, json=data)
-        
-        if response.status_code == 429:
-            return "Limite de requisições excedido, tente novamente mais tarde"
-        
         response.raise_for_status()
-        
-        result = response.json()
-        return result["candidates"][0]["content"]["parts"][0]["text"]
-    
-    except requests.exceptions.RequestException as e:
-        logger.error(f"Erro na API Gemini: {e}")
-        return "Desculpe, ocorreu um erro ao processar sua mensagem"
\ No newline at end of file
+    except httpx.HTTPStatusError:
+        await response.aread()
+        await response.aclose()
+        raise
+    return response
+
+async def stream_gemini_response(message: str, custom_prompt: str = BASE_PROMPT, temperature: float = TEMPERATURE, priority: int = PRIORITY_CHAT, chat_id: int = None):
+    # Entrega os pedaços da resposta conforme o streamGenerateContent envia os eventos SSE.
+    # Sem histórico, respostas em cache (ou já sendo geradas para a mesma pergunta) saem de uma vez.
+    history, summary = memory.history(chat_id) if chat_id is not None else ([], "")
+    use_cache = not (history or summary)
+    key = cache_key(message, custom_prompt, temperature)
+    if use_cache:
+        cached = response_cache.get(key)
+        if cached is None:
+            pending = response_cache.pending(key)
+            if pending is not None:
+                try:
+                    cached = await asyncio.shield(pending)
+                except Exception:
+                    # A chamada original falhou: tenta por conta própria
+                    pass
+        if cached is not None:
+            if chat_id is not None:
+                _remember(chat_id, message, cached)
+            yield cached
+            return
+        response_cache.begin(key)
+
+    data = _build_request(message, custom_prompt, temperature, history, summary)
+    text = ""
+    try:
+        response = await _with_retries(lambda: _open_stream(data), priority)
+        try:
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                try:
+                    chunk = json.loads(line[len("data:"):])
+                except ValueError:
+                    logger.warning(f"Evento SSE inválido do Gemini ignorado: {line[:200]!r}")
+                    continue
+                for candidate in chunk.get("candidates", [])[:1]:
+                    for part in candidate.get("content", {}).get("parts", []):
+                        if part.get("text"):
+                            text += part["text"]
+                            yield part["text"]
+        finally:
+            await response.aclose()
+    except (httpx.HTTPError, Overloaded) as e:
+        if use_cache:
+            response_cache.abandon(key, e)
+        yield ("\n\n" if text else "") + _error_message(e)
+        return
+    except BaseException:
+        if use_cache:
+            response_cache.abandon(key, Abandoned("Resposta interrompida"))
+        raise
+
+    if not text:
+        # Stream sem texto (ex.: resposta bloqueada pelos filtros de segurança)
+        if use_cache:
+            response_cache.abandon(key, Abandoned("Resposta vazia"))
+        logger.warning("Stream do Gemini terminou sem texto")
+        yield EMPTY_RESPONSE_MESSAGE
+        return
+    if use_cache:
+        response_cache.resolve(key, text)
+    if chat_id is not None:
+        _remember(chat_id, message, text)
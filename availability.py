@@ -0,0 +1,131 @@
+import os
+import json
+import asyncio
+import logging
+from datetime import datetime, timedelta, time
+from zoneinfo import ZoneInfo
+from dotenv import load_dotenv
+from calendar_client import get_calendar_client
+
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+
+DEFAULT_TIMEZONE = "America/Sao_Paulo"
+DEFAULT_WORK_START = "08:00"
+DEFAULT_WORK_END = "18:00"
+DEFAULT_WORK_DAYS = [0, 1, 2, 3, 4]  # Segunda a sexta
+# Máximo de calendários aceitos pela API em um único freebusy.query
+FREEBUSY_LIMIT = 50
+
+# Jornada por participante, ex.:
+# ATTENDEE_SETTINGS='{"ana@empresa.com": {"start": "09:00", "end": "17:00", "timezone": "Europe/Lisbon", "days": [0, 1, 2, 3]}}'
+ATTENDEE_SETTINGS = json.loads(os.getenv("ATTENDEE_SETTINGS") or "{}")
+
+def _attendee_settings(calendar_id: str) -> tuple:
+    settings = ATTENDEE_SETTINGS.get(calendar_id, {})
+    return (
+        ZoneInfo(settings.get("timezone", DEFAULT_TIMEZONE)),
+        time.fromisoformat(settings.get("start", DEFAULT_WORK_START)),
+        time.fromisoformat(settings.get("end", DEFAULT_WORK_END)),
+        set(settings.get("days", DEFAULT_WORK_DAYS))
+    )
+
+def _off_hours(calendar_id: str, time_min: datetime, time_max: datetime) -> list:
+    # Intervalos fora da jornada do participante, calculados no fuso dele
+    tz, work_start, work_end, work_days = _attendee_settings(calendar_id)
+    intervals = []
+    day = time_min.astimezone(tz).date() - timedelta(days=1)
+    last_day = time_max.astimezone(tz).date() + timedelta(days=1)
+    cursor = datetime.combine(day, time.min, tz)
+    while day <= last_day:
+        if day.weekday() in work_days:
+            intervals.append((cursor.timestamp(), datetime.combine(day, work_start, tz).timestamp()))
+            cursor = datetime.combine(day, work_end, tz)
+        day += timedelta(days=1)
+    intervals.append((cursor.timestamp(), datetime.combine(day, time.min, tz).timestamp()))
+    return intervals
+
+def merge_intervals(intervals: list) -> list:
+    # Varredura única sobre os intervalos ordenados pelo início
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1][1] = end
+        else:
+            merged.append([start, end])
+    return merged
+
+def common_free_slots(busy: list, time_min: datetime, time_max: datetime, duration: timedelta, limit: int) -> list:
+    # Os `limit` melhores intervalos livres: os mais folgados (mais tempo livre além da reunião),
+    # e entre eles os mais cedo; devolvidos em ordem cronológica
+    seconds = duration.total_seconds()
+    gaps = []
+    cursor = time_min.timestamp()
+    for start, end in merge_intervals(busy) + [[time_max.timestamp(), time_max.timestamp()]]:
+        if start - cursor >= seconds:
+            gaps.append((cursor, start))
+        cursor = max(cursor, end)
+    best = sorted(gaps, key=lambda gap: (gap[0] - gap[1], gap[0]))[:limit]
+    return sorted(best)
+
+async def _query_busy(calendar_ids: list, time_min: datetime, time_max: datetime) -> tuple:
+    client = get_calendar_client()
+    chunks = [calendar_ids[i:i + FREEBUSY_LIMIT] for i in range(0, len(calendar_ids), FREEBUSY_LIMIT)]
+    responses = await asyncio.gather(*(
+        client.run(client.freebusy().query(body={
+            "timeMin": time_min.isoformat(),
+            "timeMax": time_max.isoformat(),
+            "items": [{"id": calendar_id} for calendar_id in chunk]
+        }))
+        for chunk in chunks
+    ))
+
+    busy = {}
+    unavailable = []
+    for response in responses:
+        for calendar_id, calendar in response.get("calendars", {}).items():
+            if calendar.get("errors"):
+                unavailable.append(calendar_id)
+                continue
+            busy[calendar_id] = [
+                (datetime.fromisoformat(b["start"].replace("Z", "+00:00")).timestamp(),
+                 datetime.fromisoformat(b["end"].replace("Z", "+00:00")).timestamp())
+                for b in calendar.get("busy", [])
+            ]
+    return busy, unavailable
+
+async def find_common_slots(calendar_ids: list, duration_minutes: int, days: int = 5, limit: int = 5) -> dict:
+    if duration_minutes <= 0:
+        return {"error": "A duração da reunião deve ser maior que zero."}
+    if days <= 0:
+        return {"error": "O número de dias deve ser maior que zero."}
+    try:
+        tz = ZoneInfo(DEFAULT_TIMEZONE)
+        time_min = datetime.now(tz).replace(second=0, microsecond=0)
+        time_max = (time_min + timedelta(days=days)).replace(hour=0, minute=0)
+        duration = timedelta(minutes=duration_minutes)
+
+        busy, unavailable = await _query_busy(calendar_ids, time_min, time_max)
+        if unavailable:
+            return {"error": f"Não consegui acessar a agenda de: {', '.join(unavailable)}"}
+
+        intervals = []
+        for calendar_id in calendar_ids:
+            intervals.extend(busy.get(calendar_id, []))
+            intervals.extend(_off_hours(calendar_id, time_min, time_max))
+
+        slots = common_free_slots(intervals, time_min, time_max, duration, limit)
+        if not slots:
+            return {"message": f"Nenhum horário de {duration_minutes} min livre para todos nos próximos {days} dias."}
+
+        response = f"Melhores horários de {duration_minutes} min para {len(calendar_ids)} participantes:\n"
+        for start, end in slots:
+            slot_start = datetime.fromtimestamp(start, tz)
+            slot_end = datetime.fromtimestamp(end, tz)
+            response += f"- {slot_start.strftime('%d/%m %H:%M')} às {(slot_start + duration).strftime('%H:%M')} (livre até {slot_end.strftime('%H:%M')})\n"
+        return {"message": response}
+    except Exception as e:
+        logger.error(f"Erro ao buscar horários em comum: {e}")
+        return {"error": str(e)}
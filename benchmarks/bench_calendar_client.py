@@ -0,0 +1,61 @@
+# Compara o custo por chamada de montar o serviço do Google Calendar a cada comando (caminho antigo)
+# com o CalendarClient compartilhado. Não faz chamadas de rede: mede apenas a preparação da requisição.
+#
+# Uso: python benchmarks/bench_calendar_client.py [iterações]
+import os
+import sys
+import json
+import time
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from google.auth.credentials import AnonymousCredentials
+from google.oauth2 import service_account
+from googleapiclient.discovery import build
+from calendar_client import CalendarClient, SCOPES
+
+def load_credentials():
+    google_credentials = os.getenv("GOOGLE_CREDENTIALS")
+    if google_credentials:
+        return service_account.Credentials.from_service_account_info(json.loads(google_credentials), scopes=SCOPES)
+    return AnonymousCredentials()
+
+def legacy_call():
+    google_credentials = os.getenv("GOOGLE_CREDENTIALS")
+    if google_credentials:
+        credentials = service_account.Credentials.from_service_account_info(json.loads(google_credentials), scopes=SCOPES)
+    else:
+        credentials = AnonymousCredentials()
+    service = build("calendar", "v3", credentials=credentials)
+    return service.events().list(calendarId="primary", singleEvents=True)
+
+def client_call(client):
+    return client.events().list(calendarId="primary", singleEvents=True)
+
+def measure(fn, iterations):
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+def report(label, samples):
+    print(f"{label:<32} média {statistics.mean(samples):8.3f} ms   mediana {statistics.median(samples):8.3f} ms   máx {max(samples):8.3f} ms")
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+
+    report("legado (por chamada)", measure(legacy_call, iterations))
+
+    credentials = load_credentials()
+    start = time.perf_counter()
+    client = CalendarClient(credentials=credentials)
+    client_call(client)
+    print(f"{'CalendarClient (frio)':<32} {(time.perf_counter() - start) * 1000:8.3f} ms")
+
+    report("CalendarClient (quente)", measure(lambda: client_call(client), iterations))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+# Mede a vazão do cluster.py com 1..N workers: o processo de entrada distribui updates de
+# texto por chat_id e cada worker monta o Update e passa o texto pelo roteador de intenções,
+# a parte de CPU de uma mensagem comum. Não usa rede nem o Telegram.
+#
+# Uso: python benchmarks/bench_cluster.py [updates] [máximo de workers]
+import os
+import sys
+import time
+import asyncio
+import functools
+import multiprocessing
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from telegram import Update
+from cluster import Cluster, receive
+from intent_router import route_message
+
+TEXTS = [
+    "marca reunião com a equipe amanhã às 15h",
+    "quais são minhas tarefas?",
+    "tenho horário livre na sexta?",
+    "o que tenho hoje na agenda",
+    "me explica como priorizar o backlog do time de produto"
+]
+
+def make_update(update_id: int, chat_id: int) -> dict:
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private"},
+            "from": {"id": chat_id, "is_bot": False, "first_name": "Teste"},
+            "text": TEXTS[update_id % len(TEXTS)]
+        }
+    }
+
+def bench_worker(ready, index: int, count: int, connection):
+    ready.wait()
+    while True:
+        for kind, payload in receive(connection):
+            if kind == "stop":
+                return
+            update = Update.de_json(payload, None)
+            route_message(update.message.text)
+
+def run(workers: int, updates: list) -> float:
+    ready = multiprocessing.get_context("spawn").Event()
+    cluster = Cluster(workers, target=functools.partial(bench_worker, ready))
+    cluster.start()
+    time.sleep(2)  # importações dos workers fora da medida
+    start = time.perf_counter()
+    ready.set()
+    for update in updates:
+        cluster.route(update)
+    asyncio.run(cluster.stop())
+    return time.perf_counter() - start
+
+def main():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    max_workers = int(sys.argv[2]) if len(sys.argv) > 2 else os.cpu_count()
+    updates = [make_update(n, 1000 + n % 500) for n in range(total)]
+    print(f"{total} updates, {os.cpu_count()} núcleos")
+    baseline = None
+    workers = 1
+    while workers <= max_workers:
+        elapsed = run(workers, updates)
+        rate = total / elapsed
+        baseline = baseline or rate
+        print(f"{workers:>3} workers: {elapsed:6.2f}s  {rate:8.0f} updates/s  ({rate / baseline:.2f}x)")
+        workers *= 2
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+# Compara a montagem do resumo do /monday antiga (next() sobre todas as colunas de cada item
+# e concatenação de strings) com o registro de esquemas e a renderização em uma passada.
+# Não faz chamadas de rede: os boards são gerados em memória.
+#
+# Uso: python benchmarks/bench_monday_summary.py [itens por board] [colunas por board]
+import os
+import sys
+import time
+import random
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from monday_schema import resolve_schema, column_ids
+from monday_integration import render_summary
+
+BOARD_COLUMNS = {
+    "Sprints": ["Timeline", "Goal"],
+    "Épicos": ["Owner", "Phase"],
+    "Retrospectivas": ["Recurring", "Type"],
+    "Roadmap": ["Status"]
+}
+
+def make_boards(items_per_board, extra_columns):
+    boards = []
+    for index, (name, titles) in enumerate(BOARD_COLUMNS.items()):
+        titles = [f"Extra {n}" for n in range(extra_columns)] + titles
+        columns = [{"id": f"col_{index}_{n}", "title": title} for n, title in enumerate(titles)]
+        items = [
+            {
+                "name": f"Item {n}",
+                "column_values": [{"id": column["id"], "text": random.choice(["Feito", "Em andamento", ""]), "value": None} for column in columns]
+            }
+            for n in range(items_per_board)
+        ]
+        boards.append({"id": str(index), "name": name, "columns": columns, "items": items})
+    return boards
+
+def legacy_summary(boards):
+    summary = "Oi! Aqui está um resumo dos seus projetos no Monday.com:\n\n"
+    for board in boards:
+        board_name = board['name']
+        summary += f"📋 *{board_name}*:\n"
+        items = board.get("items", [])
+        columns = {col["id"]: col["title"] for col in board.get("columns", [])}
+        if not items:
+            summary += "   - Nada por aqui ainda!\n"
+            continue
+        for item in items:
+            column_values = {col["id"]: col for col in item["column_values"]}
+            if board_name == "Sprints":
+                timeline = next((col["text"] for col in column_values.values() if columns.get(col["id"]) == "Timeline"), "Sem cronograma")
+                goal = next((col["text"] for col in column_values.values() if columns.get(col["id"]) == "Goal" or columns.get(col["id"]) == "Meta"), "Sem meta")
+                summary += f"   - {item['name']} (Cronograma: {timeline}, Meta: {goal})\n"
+            elif board_name == "Épicos":
+                owners = next((col["text"] for col in column_values.values() if columns.get(col["id"]) == "Person" or columns.get(col["id"]) == "Owner"), "Sem proprietário")
+                phase = next((col["text"] for col in column_values.values() if columns.get(col["id"]) == "Phase" or columns.get(col["id"]) == "Fase"), "Sem fase")
+                summary += f"   - {item['name']} (Responsável: {owners}, Fase: {phase})\n"
+            elif board_name == "Retrospectivas":
+                recurring = next((col["text"] for col in column_values.values() if columns.get(col["id"]) == "Recurring" or columns.get(col["id"]) == "Recorrente"), "Não especificado")
+                type_ = next((col["text"] for col in column_values.values() if columns.get(col["id"]) == "Type" or columns.get(col["id"]) == "Tipo"), "Sem tipo")
+                summary += f"   - {item['name']} (Recorrente: {recurring}, Tipo: {type_})\n"
+            elif board_name != "Introdução":
+                status = next((col["text"] for col in column_values.values() if columns.get(col["id"]) == "Status"), "Sem status")
+                summary += f"   - {item['name']} (Status: {status})\n"
+        summary += "\n"
+    return summary
+
+def trim_columns(boards):
+    # O que a API devolve quando a consulta pede só as colunas do esquema
+    trimmed = []
+    for board in boards:
+        wanted = set(column_ids(resolve_schema(board)))
+        items = [
+            {"name": item["name"], "column_values": [column for column in item["column_values"] if column["id"] in wanted]}
+            for item in board["items"]
+        ]
+        trimmed.append(dict(board, items=items))
+    return trimmed
+
+def measure(fn, iterations):
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+def report(label, samples):
+    print(f"{label:<32} média {statistics.mean(samples):9.3f} ms   mediana {statistics.median(samples):9.3f} ms   máx {max(samples):9.3f} ms")
+
+def main():
+    items_per_board = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    extra_columns = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    iterations = 5
+
+    boards = make_boards(items_per_board, extra_columns)
+    trimmed = trim_columns(boards)
+    print(f"{len(boards)} boards x {items_per_board} itens, {extra_columns + 2} colunas por board")
+
+    report("legado", measure(lambda: legacy_summary(boards), iterations))
+    report("esquema (todas as colunas)", measure(lambda: render_summary(boards), iterations))
+    report("esquema (colunas pedidas)", measure(lambda: render_summary(trimmed), iterations))
+
+if __name__ == "__main__":
+    main()
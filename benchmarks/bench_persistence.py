@@ -0,0 +1,82 @@
+# Compara a persistência anterior (carrega todos os usuários na inicialização e grava cada
+# user_data entregue pelo Application com um comando próprio) com a atual (carga por usuário
+# no primeiro update, gravação só do que mudou, numa transação por rodada).
+# Usa um banco temporário com 100k usuários; não faz chamadas de rede.
+#
+# Uso: python benchmarks/bench_persistence.py [usuários no banco] [updates] [usuários ativos]
+import os
+import sys
+import time
+import pickle
+import random
+import asyncio
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlite_persistence import SQLitePersistence
+
+# Quantos updates chegam entre duas rodadas de gravação do Application
+UPDATES_PER_FLUSH = 200
+
+class LegacyPersistence(SQLitePersistence):
+    async def get_user_data(self) -> dict:
+        rows = await self._read("SELECT user_id, data FROM user_data")
+        return {user_id: pickle.loads(data) for user_id, data in rows}
+
+    async def update_user_data(self, user_id: int, data: dict) -> None:
+        await self._read("INSERT OR REPLACE INTO user_data (user_id, data) VALUES (?, ?)", (user_id, pickle.dumps(data)))
+
+    async def refresh_user_data(self, user_id: int, user_data: dict) -> None:
+        pass
+
+def populate(path: str, users: int):
+    persistence = SQLitePersistence(path)
+    connection = persistence._conn()
+    connection.execute("BEGIN")
+    connection.executemany(
+        "INSERT INTO user_data (user_id, data) VALUES (?, ?)",
+        ((user_id, pickle.dumps({"calendar_id": f"user{user_id}@empresa.com", "summary": "Reunião semanal"})) for user_id in range(users))
+    )
+    connection.execute("COMMIT")
+    connection.close()
+
+async def simulate(persistence, updates: int, active: int) -> tuple:
+    # Mesma sequência do Application: get_* na inicialização, refresh a cada update,
+    # e a cada rodada update_user_data de todos os usuários que mandaram algo
+    random.seed(1)
+    start = time.perf_counter()
+    user_data = await persistence.get_user_data()
+    await persistence.get_conversations("schedule")
+    startup = time.perf_counter() - start
+
+    start = time.perf_counter()
+    touched = set()
+    for n in range(updates):
+        user_id = random.randrange(active)
+        data = user_data.setdefault(user_id, {})
+        await persistence.refresh_user_data(user_id, data)
+        if random.random() < 0.1:
+            data["summary"] = f"Reunião {n}"
+        touched.add(user_id)
+        if n % UPDATES_PER_FLUSH == UPDATES_PER_FLUSH - 1:
+            await asyncio.gather(*(persistence.update_user_data(user_id, dict(user_data[user_id])) for user_id in touched))
+            touched.clear()
+    await persistence.flush()
+    return startup, time.perf_counter() - start
+
+async def main():
+    users = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    updates = int(sys.argv[2]) if len(sys.argv) > 2 else 20000
+    active = int(sys.argv[3]) if len(sys.argv) > 3 else 2000
+    with tempfile.TemporaryDirectory() as directory:
+        print(f"{users} usuários no banco, {updates} updates de {active} usuários ativos")
+        for name, cls in (("anterior", LegacyPersistence), ("atual", SQLitePersistence)):
+            path = os.path.join(directory, f"{name}.db")
+            populate(path, users)
+            persistence = cls(path)
+            startup, elapsed = await simulate(persistence, updates, active)
+            print(f"{name:>9}: inicialização {startup * 1000:7.1f} ms  updates {elapsed:5.2f}s ({elapsed / updates * 1e6:6.1f} µs/update)")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,17 +1,32 @@
 import os
+import asyncio
+import secrets
 from dotenv import load_dotenv
-from telegram import Update
+from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import (
-    Application, CommandHandler, MessageHandler, filters, ContextTypes, ConversationHandler
+    Application, CommandHandler, MessageHandler, CallbackQueryHandler, filters, ContextTypes, ConversationHandler
 )
 import logging
 from schedule_calendar import (
     schedule_event, get_event, add_participant, remove_participant, 
-    cancel_meeting, edit_meeting, get_free_time, get_busy_days, clear_calendar
+    cancel_meeting, edit_meeting, get_free_time, get_busy_days, clear_calendar, shift_meetings,
+    get_occupancy_analytics, suggest_slots, on_event_changed
 )
-from assistant import get_gemini_response
-from monday_integration import get_monday_summary  
-from datetime import datetime
+from calendar_client import get_calendar_client
+from availability import find_common_slots
+from assistant import stream_gemini_response, close_http_client, response_cache, forget_conversation, rate_limiter
+from telegram_streaming import ProgressiveReply, split_message
+from intent_router import route_message
+from rate_limiter import PRIORITY_ASK
+from monday_integration import get_monday_summary
+from monday_client import close_monday_client
+from monday_webhook import start_monday_webhook, MONDAY_WEBHOOK_PORT
+from task_store import task_store
+from reminders import reminder_scheduler, TASK_REMINDER_HOUR
+from update_processor import ChatOrderedUpdateProcessor
+from sqlite_persistence import SQLitePersistence
+from telegram_webhook import run_webhook, used_update_types, TELEGRAM_WEBHOOK_URL
+from datetime import datetime, timedelta
 
 # Configura logging
 logging.basicConfig(format='%(asctime)s - %(name)s - %(levelname)s - %(message)s', level=logging.INFO)
@@ -20,12 +35,16 @@ logger = logging.getLogger(__name__)
 # Carrega variáveis de ambiente
 load_dotenv()
 BOT_TOKEN = os.getenv("BOT_TOKEN")
+# Chats (IDs separados por vírgula) que podem usar o /metrics
+ADMIN_CHAT_IDS = [int(chat_id) for chat_id in os.getenv("ADMIN_CHAT_IDS", "").split(",") if chat_id.strip()]
 
-# Lista de tarefas em memória
-tasks = []
+monday_webhook_server = None
+update_processor = ChatOrderedUpdateProcessor()
+# (índice, total) quando este processo é um dos workers do cluster.py
+cluster_shard = None
 
 # Estados do ConversationHandler para o fluxo de agendamento
-EMAIL, SUMMARY, START_TIME, END_TIME = range(4)
+EMAIL, SUMMARY, START_TIME, END_TIME, SUGGESTED_SLOT = range(5)
 
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await update.message.reply_text(
@@ -34,6 +53,8 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
         "enviando mensagens sem \"/\". Estou aqui para otimizar seu dia!\n\n"
         "Comandos disponíveis:\n"
         "• Para falar comigo diretamente me mande mensagem a qualquer momento, é só escrever que te respondo.\n"
+        "• Pedidos diretos também funcionam sem comando, como \"marca reunião amanhã 10h com a equipe\" ou \"quais minhas tarefas\"\n"
+        "• \"/resetchat\" - Comece uma conversa nova comigo\n"
         "• \"/schedule\" - Agende eventos\n"
         "• \"/getevent\" - Veja sua agenda do dia\n"
         "• \"/monday\" - Resumo do Monday.com\n"
@@ -46,11 +67,20 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
         "• \"/removetask\" - Remova uma tarefa\n"
         "• \"/prioritizetask\" - Defina prioridades\n"
         "• \"/freetime\" - Veja horários livres\n"
+        "• \"/commonslots\" - Horários livres em comum para vários participantes\n"
         "• \"/busydays\" - Dias mais ocupados do mês\n"
-        "• \"/clearcalendar\" - Liste reuniões para cancelar\n\n"
+        "• \"/clearcalendar\" - Liste e cancele as reuniões do dia\n"
+        "• \"/shiftmeetings\" - Reagende um bloco de reuniões\n\n"
         "Experimente agora! Como posso ajudar você hoje?"
     )
 
+async def stream_reply(update: Update, message: str, **kwargs):
+    # Mostra a resposta do Gemini conforme os tokens chegam, editando a mesma mensagem
+    reply = ProgressiveReply(update.message)
+    async for chunk in stream_gemini_response(message, chat_id=update.effective_chat.id, **kwargs):
+        await reply.append(chunk)
+    await reply.finish()
+
 async def ask(update: Update, context: ContextTypes.DEFAULT_TYPE):
     args = context.args
     if not args:
@@ -59,8 +89,18 @@ async def ask(update: Update, context: ContextTypes.DEFAULT_TYPE):
     message = " ".join(args)
     logger.info(f"Recebida pergunta para a assistente: {message}")
     await context.bot.send_chat_action(chat_id=update.effective_chat.id, action="typing")
-    reply = await get_gemini_response(message, temperature=0.7)
-    await update.message.reply_text(reply)
+    await stream_reply(update, message, temperature=0.7, priority=PRIORITY_ASK)
+
+async def reset_chat(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    forget_conversation(update.effective_chat.id)
+    await update.message.reply_text("Pronto! Comecei uma conversa nova, sem o histórico anterior.")
+
+async def schedule_with_reminder(chat_id: int, summary: str, event_start: dict, event_end: dict, calendar_id: str) -> dict:
+    # Agenda e programa o lembrete da reunião para o chat que pediu
+    result = await schedule_event(summary, event_start, event_end, calendar_id)
+    if "eventId" in result:
+        await reminder_scheduler.event_scheduled(chat_id, result["eventId"], summary, datetime.fromisoformat(event_start["dateTime"]))
+    return result
 
 async def schedule_start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await update.message.reply_text("Por favor, digite o e-mail do calendário onde o evento será agendado (ex.: 'brenamarq@gmail.com').")
@@ -73,11 +113,16 @@ async def get_email(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 async def get_summary(update: Update, context: ContextTypes.DEFAULT_TYPE):
     context.user_data['summary'] = update.message.text
-    await update.message.reply_text("Digite o horário de início no formato 'DD/MM/YYYY HH:MM' (ex.: '21/03/2025 10:00').")
+    await update.message.reply_text(
+        "Digite o horário de início no formato 'DD/MM/YYYY HH:MM' (ex.: '21/03/2025 10:00'), "
+        "ou 'sugerir 60' para eu sugerir horários livres para uma reunião de 60 minutos."
+    )
     return START_TIME
 
 async def get_start_time(update: Update, context: ContextTypes.DEFAULT_TYPE):
     start_time_str = update.message.text
+    if start_time_str.lower().startswith("sugerir"):
+        return await suggest_start_time(update, context)
     try:
         start_dt = datetime.strptime(start_time_str, "%d/%m/%Y %H:%M")
         context.user_data['start_time_iso'] = start_dt.isoformat() + "-03:00"
@@ -103,7 +148,7 @@ async def get_end_time(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await context.bot.send_chat_action(chat_id=update.effective_chat.id, action="typing")
         await update.message.reply_text("Agendando reunião…")
         
-        result = await schedule_event(summary, event_start, event_end, calendar_id)
+        result = await schedule_with_reminder(update.effective_chat.id, summary, event_start, event_end, calendar_id)
         
         if "error" in result:
             await update.message.reply_text(f"Erro ao agendar: {result['error']}")
@@ -116,33 +161,91 @@ async def get_end_time(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text("Formato inválido! Use 'DD/MM/YYYY HH:MM' (ex.: '21/03/2025 11:00'). Tente novamente.")
         return END_TIME
 
+async def suggest_start_time(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    # "sugerir [duração_min] [dias]"
+    parts = update.message.text.split()[1:]
+    try:
+        duration = int(parts[0]) if parts else 60
+        days = int(parts[1]) if len(parts) > 1 else 14
+    except ValueError:
+        await update.message.reply_text("Use 'sugerir 60' (duração em minutos) ou 'sugerir 60 30' (duração e dias).")
+        return START_TIME
+
+    await context.bot.send_chat_action(chat_id=update.effective_chat.id, action="typing")
+    result = await suggest_slots(context.user_data['calendar_id'], duration, days)
+    if "error" in result:
+        await update.message.reply_text(f"{result['error']}\nDigite o horário de início no formato 'DD/MM/YYYY HH:MM'.")
+        return START_TIME
+
+    keyboard = [
+        [InlineKeyboardButton(
+            f"{start.strftime('%d/%m %H:%M')} - {end.strftime('%H:%M')}",
+            callback_data=f"slot:{start.strftime('%d/%m/%Y %H:%M')}|{end.strftime('%d/%m/%Y %H:%M')}"
+        )]
+        for start, end in result["slots"]
+    ]
+    await update.message.reply_text(
+        "Escolha um dos horários sugeridos ou digite outro no formato 'DD/MM/YYYY HH:MM':",
+        reply_markup=InlineKeyboardMarkup(keyboard)
+    )
+    return SUGGESTED_SLOT
+
+async def pick_suggested_slot(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    query = update.callback_query
+    await query.answer()
+    start_str, end_str = query.data.removeprefix("slot:").split("|")
+    start_dt = datetime.strptime(start_str, "%d/%m/%Y %H:%M")
+    end_dt = datetime.strptime(end_str, "%d/%m/%Y %H:%M")
+    summary = context.user_data['summary']
+
+    event_start = {"dateTime": start_dt.isoformat() + "-03:00", "timeZone": "America/Sao_Paulo"}
+    event_end = {"dateTime": end_dt.isoformat() + "-03:00", "timeZone": "America/Sao_Paulo"}
+    await query.edit_message_text(f"Agendando reunião para {start_str}…")
+    result = await schedule_with_reminder(update.effective_chat.id, summary, event_start, event_end, context.user_data['calendar_id'])
+
+    if "error" in result:
+        await query.edit_message_text(f"Erro ao agendar: {result['error']}")
+    else:
+        await query.edit_message_text(result["message"])
+
+    context.user_data.clear()
+    return ConversationHandler.END
+
 async def cancel(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await update.message.reply_text("Agendamento cancelado.")
     context.user_data.clear()
     return ConversationHandler.END
 
+def _parse_calendar_ids(text: str) -> list:
+    # Vários calendários separados por vírgula, sem repetições
+    return list(dict.fromkeys(c.strip() for c in text.split(",") if c.strip())) or ["primary"]
+
 async def get_event_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     args = context.args
     if not args:
-        calendar_id = "primary"
+        calendar_ids = ["primary"]
         await context.bot.send_chat_action(chat_id=update.effective_chat.id, action="typing")
-        result = await get_event(calendar_id)
+        result = await get_event(calendar_ids)
     elif len(args) == 1:
-        calendar_id = args[0]
+        calendar_ids = _parse_calendar_ids(args[0])
         await context.bot.send_chat_action(chat_id=update.effective_chat.id, action="typing")
-        result = await get_event(calendar_id)
+        result = await get_event(calendar_ids)
     elif len(args) == 2:
-        calendar_id = args[0]
+        calendar_ids = _parse_calendar_ids(args[0])
         date_str = args[1]
         await context.bot.send_chat_action(chat_id=update.effective_chat.id, action="typing")
         try:
             datetime.strptime(date_str, "%d/%m/%Y")
-            result = await get_event(calendar_id, date_str)
+            result = await get_event(calendar_ids, date_str)
         except ValueError:
             await update.message.reply_text("Formato de data inválido! Use 'DD/MM/YYYY' (ex.: '28/03/2025').")
             return
     else:
-        await update.message.reply_text("Uso: /getevent [email] [data]\nExemplo: /getevent 'brenamarq@gmail.com' '28/03/2025'\nOu apenas /getevent para o dia atual.")
+        await update.message.reply_text(
+            "Uso: /getevent [email] [data]\nExemplo: /getevent 'brenamarq@gmail.com' '28/03/2025'\n"
+            "Para juntar várias agendas, separe os e-mails por vírgula: /getevent 'eu@gmail.com,sala@empresa.com'\n"
+            "Ou apenas /getevent para o dia atual."
+        )
         return
 
     if "error" in result:
@@ -153,60 +256,86 @@ async def get_event_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 async def add_participant_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     args = context.args
     if len(args) < 2:
-        await update.message.reply_text("Uso: /addparticipant 'título' 'participante'\nExemplo: /addparticipant 'Reunião com equipe' 'joao@gmail.com'")
+        await update.message.reply_text("Uso: /addparticipant 'título' 'participante' ['data']\nExemplo: /addparticipant 'Reunião com equipe' 'joao@gmail.com' '28/03/2025'")
         return
     summary = args[0]
     participant = args[1]
+    date_str = args[2] if len(args) > 2 else None
+    if date_str:
+        try:
+            datetime.strptime(date_str, "%d/%m/%Y")
+        except ValueError:
+            await update.message.reply_text("Formato de data inválido! Use 'DD/MM/YYYY' (ex.: '28/03/2025').")
+            return
     calendar_id = "primary"
-    result = await add_participant(calendar_id, summary, participant)
+    result = await add_participant(calendar_id, summary, participant, date_str)
     await update.message.reply_text(result["message"] if "message" in result else f"Erro: {result['error']}")
 
 async def remove_participant_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     args = context.args
     if len(args) < 2:
-        await update.message.reply_text("Uso: /removeparticipant 'título' 'participante'\nExemplo: /removeparticipant 'Reunião com equipe' 'joao@gmail.com'")
+        await update.message.reply_text("Uso: /removeparticipant 'título' 'participante' ['data']\nExemplo: /removeparticipant 'Reunião com equipe' 'joao@gmail.com' '28/03/2025'")
         return
     summary = args[0]
     participant = args[1]
+    date_str = args[2] if len(args) > 2 else None
+    if date_str:
+        try:
+            datetime.strptime(date_str, "%d/%m/%Y")
+        except ValueError:
+            await update.message.reply_text("Formato de data inválido! Use 'DD/MM/YYYY' (ex.: '28/03/2025').")
+            return
     calendar_id = "primary"
-    result = await remove_participant(calendar_id, summary, participant)
+    result = await remove_participant(calendar_id, summary, participant, date_str)
     await update.message.reply_text(result["message"] if "message" in result else f"Erro: {result['error']}")
 
 async def cancel_meeting_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     args = context.args
     if not args:
-        await update.message.reply_text("Uso: /cancelmeeting 'título'\nExemplo: /cancelmeeting 'Reunião com equipe'")
+        await update.message.reply_text("Uso: /cancelmeeting 'título' ['data']\nExemplo: /cancelmeeting 'Reunião com equipe' '28/03/2025'")
         return
     summary = args[0]
+    date_str = args[1] if len(args) > 1 else None
+    if date_str:
+        try:
+            datetime.strptime(date_str, "%d/%m/%Y")
+        except ValueError:
+            await update.message.reply_text("Formato de data inválido! Use 'DD/MM/YYYY' (ex.: '28/03/2025').")
+            return
     calendar_id = "primary"
-    result = await cancel_meeting(calendar_id, summary)
+    result = await cancel_meeting(calendar_id, summary, date_str)
     await update.message.reply_text(result["message"] if "message" in result else f"Erro: {result['error']}")
 
 async def edit_meeting_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     args = context.args
     if len(args) < 3:
-        await update.message.reply_text("Uso: /editmeeting 'título' 'nova_data' 'novo_horário'\nExemplo: /editmeeting 'Reunião com equipe' '28/03/2025' '14:00'")
+        await update.message.reply_text("Uso: /editmeeting 'título' 'nova_data' 'novo_horário' ['data_atual']\nExemplo: /editmeeting 'Reunião com equipe' '28/03/2025' '14:00'")
         return
     summary = args[0]
     new_date = args[1]
     new_time = args[2]
+    date_str = args[3] if len(args) > 3 else None
     calendar_id = "primary"
     try:
         datetime.strptime(new_date, "%d/%m/%Y")
         datetime.strptime(new_time, "%H:%M")
-        result = await edit_meeting(calendar_id, summary, new_date, new_time)
+        if date_str:
+            datetime.strptime(date_str, "%d/%m/%Y")
+        result = await edit_meeting(calendar_id, summary, new_date, new_time, date_str)
         await update.message.reply_text(result["message"] if "message" in result else f"Erro: {result['error']}")
     except ValueError:
         await update.message.reply_text("Formato inválido! Use 'DD/MM/YYYY' para data e 'HH:MM' para horário.")
 
 async def task_list_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    tasks = await task_store.list_tasks(update.effective_chat.id)
     if not tasks:
         await update.message.reply_text("Aqui estão suas tarefas pendentes:\nNenhuma tarefa por enquanto!")
     else:
-        response = "Aqui estão suas tarefas pendentes:\n"
+        lines = ["Aqui estão suas tarefas pendentes:"]
         for task in tasks:
-            response += f"- {task['description']} (Prazo: {task['deadline']}, Responsável: {task['responsible']}, Prioridade: {task['priority']})\n"
-        await update.message.reply_text(response)
+            deadline = datetime.strptime(task["deadline"], "%Y-%m-%d").strftime("%d/%m/%Y")
+            lines.append(f"- {task['description']} (Prazo: {deadline}, Responsável: {task['responsible']}, Prioridade: {task['priority']})")
+        await update.message.reply_text("\n".join(lines))
 
 async def add_task_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     args = context.args
@@ -217,11 +346,18 @@ async def add_task_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     deadline = args[1]
     responsible = args[2]
     try:
-        datetime.strptime(deadline, "%d/%m/%Y")
-        tasks.append({"description": description, "deadline": deadline, "responsible": responsible, "priority": "Normal"})
-        await update.message.reply_text(f"Tarefa adicionada: \"{description}\" com prazo até {deadline}.")
+        deadline_date = datetime.strptime(deadline, "%d/%m/%Y").date()
     except ValueError:
         await update.message.reply_text("Formato de prazo inválido! Use 'DD/MM/YYYY' (ex.: '28/03/2025').")
+        return
+    task_id = await task_store.add(update.effective_chat.id, description, deadline_date.isoformat(), responsible)
+    if reminder_scheduler.task_added(task_id, update.effective_chat.id, description, deadline_date):
+        await update.message.reply_text(f"Tarefa adicionada: \"{description}\" com prazo até {deadline}.")
+    else:
+        await update.message.reply_text(
+            f"Tarefa adicionada: \"{description}\" com prazo até {deadline}. "
+            f"O lembrete sai às {TASK_REMINDER_HOUR}h do dia do prazo, horário que já passou, então esta tarefa não terá lembrete."
+        )
 
 async def remove_task_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     args = context.args
@@ -229,9 +365,10 @@ async def remove_task_command(update: Update, context: ContextTypes.DEFAULT_TYPE
         await update.message.reply_text("Uso: /removetask 'descrição'\nExemplo: /removetask 'Revisar código'")
         return
     description = args[0]
-    global tasks
-    tasks = [t for t in tasks if t["description"] != description]
-    await update.message.reply_text(f"A tarefa \"{description}\" foi removida da sua lista.")
+    if await task_store.remove(update.effective_chat.id, description):
+        await update.message.reply_text(f"A tarefa \"{description}\" foi removida da sua lista.")
+    else:
+        await update.message.reply_text(f"Tarefa \"{description}\" não encontrada.")
 
 async def prioritize_task_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     args = context.args
@@ -240,31 +377,32 @@ async def prioritize_task_command(update: Update, context: ContextTypes.DEFAULT_
         return
     description = args[0]
     priority = args[1].capitalize()
-    for task in tasks:
-        if task["description"] == description:
-            task["priority"] = priority
-            await update.message.reply_text(f"A tarefa \"{description}\" foi marcada como prioridade {priority}.")
-            return
-    await update.message.reply_text(f"Tarefa \"{description}\" não encontrada.")
+    if await task_store.set_priority(update.effective_chat.id, description, priority):
+        await update.message.reply_text(f"A tarefa \"{description}\" foi marcada como prioridade {priority}.")
+    else:
+        await update.message.reply_text(f"Tarefa \"{description}\" não encontrada.")
 
 async def free_time_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     args = context.args
-    calendar_id = "primary"
+    calendar_ids = _parse_calendar_ids(args[1]) if len(args) > 1 else ["primary"]
     if args:
         date_str = args[0]
         try:
             datetime.strptime(date_str, "%d/%m/%Y")
-            result = await get_free_time(calendar_id, date_str)
+            result = await get_free_time(calendar_ids, date_str)
         except ValueError:
-            await update.message.reply_text("Formato inválido! Use 'DD/MM/YYYY' (ex.: '28/03/2025').")
+            await update.message.reply_text("Formato inválido! Use 'DD/MM/YYYY' (ex.: '28/03/2025') e, opcionalmente, os e-mails separados por vírgula.")
             return
     else:
-        result = await get_free_time(calendar_id)  # Amanhã por padrão
+        result = await get_free_time(calendar_ids)  # Amanhã por padrão
     await update.message.reply_text(result["message"] if "message" in result else f"Erro: {result['error']}")
 
 async def busy_days_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     args = context.args
     calendar_id = "primary"
+    if args and args[0].lower() in ("analise", "análise"):
+        await busy_days_analytics(update, context, args[1:])
+        return
     if args:
         month = args[0]
         try:
@@ -277,6 +415,32 @@ async def busy_days_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         result = await get_busy_days(calendar_id)  # Mês atual por padrão
     await update.message.reply_text(result["message"] if "message" in result else f"Erro: {result['error']}")
 
+async def busy_days_analytics(update: Update, context: ContextTypes.DEFAULT_TYPE, args: list):
+    calendar_id = "primary"
+    today = datetime.now()
+    periods = {"trimestre": 90, "semestre": 182, "ano": 365}
+    if not args or args[0].lower() in periods:
+        days = periods[args[0].lower()] if args else 90
+        start_str = (today - timedelta(days=days - 1)).strftime("%d/%m/%Y")
+        end_str = today.strftime("%d/%m/%Y")
+    elif len(args) == 2:
+        start_str, end_str = args
+        try:
+            datetime.strptime(start_str, "%d/%m/%Y")
+            datetime.strptime(end_str, "%d/%m/%Y")
+        except ValueError:
+            await update.message.reply_text("Formato inválido! Use 'DD/MM/YYYY' (ex.: '01/01/2025' '31/03/2025').")
+            return
+    else:
+        await update.message.reply_text(
+            "Uso: /busydays analise [trimestre|semestre|ano] ou /busydays analise 'início' 'fim'\n"
+            "Exemplo: /busydays analise 01/01/2025 31/03/2025"
+        )
+        return
+    await context.bot.send_chat_action(chat_id=update.effective_chat.id, action="typing")
+    result = await get_occupancy_analytics(calendar_id, start_str, end_str)
+    await update.message.reply_text(result["message"] if "message" in result else f"Erro: {result['error']}")
+
 async def clear_calendar_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     args = context.args
     calendar_id = "primary"
@@ -284,22 +448,128 @@ async def clear_calendar_command(update: Update, context: ContextTypes.DEFAULT_T
         date_str = args[0]
         try:
             datetime.strptime(date_str, "%d/%m/%Y")
-            result = await clear_calendar(calendar_id, date_str)
         except ValueError:
             await update.message.reply_text("Formato inválido! Use 'DD/MM/YYYY' (ex.: '28/03/2025').")
             return
+        confirm = len(args) > 1 and args[1].lower() == "confirmar"
+        # Títulos opcionais, separados por vírgula, para cancelar só parte das reuniões
+        summaries = [s.strip() for s in " ".join(args[2:]).split(",") if s.strip()] if confirm else None
+        await context.bot.send_chat_action(chat_id=update.effective_chat.id, action="typing")
+        result = await clear_calendar(calendar_id, date_str, confirm, summaries)
     else:
         result = await clear_calendar(calendar_id)  # Hoje por padrão
     await update.message.reply_text(result["message"] if "message" in result else f"Erro: {result['error']}")
 
+async def shift_meetings_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    args = context.args
+    if len(args) < 2:
+        await update.message.reply_text(
+            "Uso: /shiftmeetings 'data' '+minutos' ou 'nova_data' ['títulos separados por vírgula']\n"
+            "Exemplo: /shiftmeetings '28/03/2025' '+30'\n"
+            "Exemplo: /shiftmeetings '28/03/2025' '31/03/2025' Daily, Review"
+        )
+        return
+    date_str = args[0]
+    calendar_id = "primary"
+    try:
+        target_date = datetime.strptime(date_str, "%d/%m/%Y")
+        if "/" in args[1]:
+            offset = datetime.strptime(args[1], "%d/%m/%Y") - target_date
+        else:
+            offset = timedelta(minutes=int(args[1]))
+    except ValueError:
+        await update.message.reply_text("Formato inválido! Use 'DD/MM/YYYY' para datas e '+30' ou '-15' para minutos.")
+        return
+    summaries = [s.strip() for s in " ".join(args[2:]).split(",") if s.strip()]
+    await context.bot.send_chat_action(chat_id=update.effective_chat.id, action="typing")
+    result = await shift_meetings(calendar_id, date_str, offset, summaries)
+    await update.message.reply_text(result["message"] if "message" in result else f"Erro: {result['error']}")
+
+async def common_slots_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    args = context.args
+    if len(args) < 3:
+        await update.message.reply_text(
+            "Uso: /commonslots 'duração_min' 'dias' 'email1' 'email2' ...\n"
+            "Exemplo: /commonslots 60 5 ana@empresa.com joao@empresa.com"
+        )
+        return
+    try:
+        duration = int(args[0])
+        days = int(args[1])
+    except ValueError:
+        await update.message.reply_text("Duração e dias devem ser números (ex.: /commonslots 60 5 ...).")
+        return
+    calendar_ids = list(dict.fromkeys(args[2:]))
+    await context.bot.send_chat_action(chat_id=update.effective_chat.id, action="typing")
+    result = await find_common_slots(calendar_ids, duration, days)
+    await update.message.reply_text(result["message"] if "message" in result else f"Erro: {result['error']}")
+
+async def ask_meeting_confirmation(update: Update, context: ContextTypes.DEFAULT_TYPE, intent: dict):
+    # Texto livre pode ter sido mal entendido: o evento só é criado depois do "Confirmar"
+    token = secrets.token_hex(4)
+    context.user_data['pending_meeting'] = {"token": token, "summary": intent["summary"], "start": intent["start"], "end": intent["end"]}
+    keyboard = [[
+        InlineKeyboardButton("✅ Confirmar", callback_data=f"meeting:confirm:{token}"),
+        InlineKeyboardButton("❌ Cancelar", callback_data=f"meeting:cancel:{token}")
+    ]]
+    await update.message.reply_text(
+        f"Agendar \"{intent['summary']}\" em {intent['start'].strftime('%d/%m/%Y')} "
+        f"das {intent['start'].strftime('%H:%M')} às {intent['end'].strftime('%H:%M')} na sua agenda principal?",
+        reply_markup=InlineKeyboardMarkup(keyboard)
+    )
+
+async def confirm_meeting(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    query = update.callback_query
+    await query.answer()
+    _, action, token = query.data.split(":")
+    pending = context.user_data.get('pending_meeting')
+    if not pending or pending["token"] != token:
+        await query.edit_message_text("Este pedido de agendamento expirou.")
+        return
+    del context.user_data['pending_meeting']
+    if action != "confirm":
+        await query.edit_message_text("Agendamento cancelado.")
+        return
+
+    await query.edit_message_text(f"Agendando \"{pending['summary']}\"…")
+    event_start = {"dateTime": pending["start"].isoformat() + "-03:00", "timeZone": "America/Sao_Paulo"}
+    event_end = {"dateTime": pending["end"].isoformat() + "-03:00", "timeZone": "America/Sao_Paulo"}
+    result = await schedule_with_reminder(update.effective_chat.id, pending["summary"], event_start, event_end, "primary")
+    if "error" in result:
+        await query.edit_message_text(f"Erro ao agendar: {result['error']}")
+    else:
+        await query.edit_message_text(f"{result['message']} (dia {pending['start'].strftime('%d/%m/%Y')})")
+
+async def dispatch_intent(update: Update, context: ContextTypes.DEFAULT_TYPE, intent: dict):
+    # Executa localmente o que o roteador reconheceu, sem passar pelo Gemini
+    logger.info(f"Mensagem roteada localmente: {intent['intent']} (confiança {intent['confidence']})")
+    if intent["intent"] == "tasks":
+        await task_list_command(update, context)
+        return
+
+    await context.bot.send_chat_action(chat_id=update.effective_chat.id, action="typing")
+    date_str = intent["date"].strftime("%d/%m/%Y") if intent.get("date") else None
+    if intent["intent"] == "schedule":
+        await ask_meeting_confirmation(update, context, intent)
+        return
+    elif intent["intent"] == "free_time":
+        result = await get_free_time(["primary"], date_str)
+    else:
+        result = await get_event(["primary"], date_str)
+    await update.message.reply_text(result["message"] if "message" in result else f"Erro: {result['error']}")
+
 async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
     message = update.message.text
     if message.startswith('/'):
         await update.message.reply_text("Isso parece um comando! Use os comandos disponíveis como /schedule ou /tasklist.")
+        return
+
+    intent = route_message(message)
+    if intent:
+        await dispatch_intent(update, context, intent)
     else:
         await context.bot.send_chat_action(chat_id=update.effective_chat.id, action="typing")
-        reply = await get_gemini_response(message)
-        await update.message.reply_text(reply)
+        await stream_reply(update, message)
 
 async def error_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     logger.error(f"Erro: {context.error}")
@@ -311,11 +581,65 @@ async def monday_summary(update: Update, context: ContextTypes.DEFAULT_TYPE):
     result = await get_monday_summary()
     if "error" in result:
         await update.message.reply_text(result["error"])
-    else:
-        await update.message.reply_text(result["message"])
+        return
+    # Contas grandes passam do limite de uma mensagem do Telegram
+    for chunk in split_message(result["message"]):
+        await update.message.reply_text(chunk)
+
+async def metrics_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    metrics = update_processor.metrics()
+    in_flight = ", ".join(f"{name}: {count}" for name, count in sorted(metrics["in_flight"].items())) or "nenhum"
+    shard = f"Processo: {cluster_shard[0] + 1} de {cluster_shard[1]}\n" if cluster_shard else ""
+    await update.message.reply_text(
+        "📊 Métricas do bot\n"
+        f"{shard}"
+        f"Workers: {metrics['workers']}\n"
+        f"Updates na fila: {metrics['queue_depth']}\n"
+        f"Em andamento: {in_flight}\n"
+        f"Chats ativos: {metrics['active_chats']}\n"
+        f"Updates processados: {metrics['processed']}\n"
+        f"Fila do Gemini: {rate_limiter.queue_depth()}\n"
+        f"Cache de respostas: {response_cache.stats()['hit_rate']:.0%} de acertos"
+    )
 
-def main():
-    application = Application.builder().token(BOT_TOKEN).build()
+async def post_init(application: Application):
+    reminder_scheduler.start(application, shard=cluster_shard)
+    # Reuniões canceladas ou reagendadas pelo bot levam junto o lembrete
+    on_event_changed(reminder_scheduler.event_changed)
+    # Webhooks do Monday.com invalidam o cache do /monday board a board;
+    # no cluster o servidor fica no processo de entrada, que repassa aos workers
+    global monday_webhook_server
+    if MONDAY_WEBHOOK_PORT and cluster_shard is None:
+        monday_webhook_server = await start_monday_webhook()
+
+async def post_shutdown(application: Application):
+    # Descarta chamadas ao Google Calendar que ainda estão na fila
+    get_calendar_client().shutdown()
+    await close_http_client()
+    await close_monday_client()
+    await task_store.close()
+    if monday_webhook_server is not None:
+        await monday_webhook_server.stop()
+    response_cache.save(shard=cluster_shard[0] if cluster_shard else None)
+    logger.info(f"Cache de respostas: {response_cache.stats()}")
+
+def build_application(persistence=None, shard: tuple = None) -> Application:
+    # Chats diferentes em paralelo; updates do mesmo chat sempre em ordem
+    global cluster_shard
+    cluster_shard = shard
+    builder = (
+        Application.builder()
+        .token(BOT_TOKEN)
+        .concurrent_updates(update_processor)
+        .post_init(post_init)
+        .post_shutdown(post_shutdown)
+    )
+    if persistence is not None:
+        builder = builder.persistence(persistence)
+    if shard is not None:
+        # Workers recebem os updates do processo de entrada, não do Telegram
+        builder = builder.updater(None)
+    application = builder.build()
 
     conv_handler = ConversationHandler(
         entry_points=[CommandHandler("schedule", schedule_start)],
@@ -324,13 +648,22 @@ def main():
             SUMMARY: [MessageHandler(filters.TEXT & ~filters.COMMAND, get_summary)],
             START_TIME: [MessageHandler(filters.TEXT & ~filters.COMMAND, get_start_time)],
             END_TIME: [MessageHandler(filters.TEXT & ~filters.COMMAND, get_end_time)],
+            SUGGESTED_SLOT: [
+                CallbackQueryHandler(pick_suggested_slot, pattern="^slot:"),
+                MessageHandler(filters.TEXT & ~filters.COMMAND, get_start_time),
+            ],
         },
-        fallbacks=[CommandHandler("cancel", cancel)]
+        fallbacks=[CommandHandler("cancel", cancel)],
+        name="schedule",
+        persistent=persistence is not None
     )
 
     # Handlers específicos
     application.add_handler(CommandHandler("start", start))
     application.add_handler(CommandHandler("ask", ask))
+    application.add_handler(CommandHandler("resetchat", reset_chat))
+    # Fora dos chats de administração o /metrics cai no tratamento de comando desconhecido
+    application.add_handler(CommandHandler("metrics", metrics_command, filters=filters.Chat(chat_id=ADMIN_CHAT_IDS)))
     application.add_handler(conv_handler)  # Inclui /schedule
     application.add_handler(CommandHandler("getevent", get_event_command))
     application.add_handler(CommandHandler("addparticipant", add_participant_command))
@@ -342,9 +675,12 @@ def main():
     application.add_handler(CommandHandler("removetask", remove_task_command))
     application.add_handler(CommandHandler("prioritizetask", prioritize_task_command))
     application.add_handler(CommandHandler("freetime", free_time_command))
+    application.add_handler(CommandHandler("commonslots", common_slots_command))
     application.add_handler(CommandHandler("busydays", busy_days_command))
     application.add_handler(CommandHandler("clearcalendar", clear_calendar_command))
+    application.add_handler(CommandHandler("shiftmeetings", shift_meetings_command))
     application.add_handler(CommandHandler("monday", monday_summary))
+    application.add_handler(CallbackQueryHandler(confirm_meeting, pattern="^meeting:"))
 
     # Handlers genéricos
     application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handle_message))  # Mensagens sem comandos
@@ -352,9 +688,16 @@ def main():
 
     # Handler de erros
     application.add_error_handler(error_handler)  # Correção aqui
+    return application
 
+def main():
+    # Conversas e user_data sobrevivem a reinícios (um /schedule pela metade continua de onde parou)
+    application = build_application(persistence=SQLitePersistence())
     logger.info("Bot iniciado com sucesso")
-    application.run_polling(allowed_updates=Update.ALL_TYPES)
+    if TELEGRAM_WEBHOOK_URL:
+        asyncio.run(run_webhook(application))
+    else:
+        application.run_polling(allowed_updates=used_update_types(application))
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
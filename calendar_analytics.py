@@ -0,0 +1,93 @@
+import numpy as np
+from datetime import datetime, timedelta
+
+SLOT_MINUTES = 5
+WORK_START_HOUR = 8
+WORK_END_HOUR = 18
+# Intervalos livres menores que isso entre duas reuniões contam como fragmentação
+SHORT_GAP_MINUTES = 30
+
+def occupancy_matrix(starts: np.ndarray, ends: np.ndarray, range_start: datetime, days: int, slot_minutes: int = SLOT_MINUTES) -> np.ndarray:
+    # Matriz booleana (dias x slots do dia) montada com um vetor de diferenças + soma acumulada,
+    # sem laço em Python por evento. starts/ends são timestamps em segundos.
+    slots_per_day = 24 * 60 // slot_minutes
+    total = days * slots_per_day
+    slot_seconds = slot_minutes * 60
+    origin = range_start.timestamp()
+
+    first = np.clip(np.floor((starts - origin) / slot_seconds), 0, total).astype(np.int64)
+    last = np.clip(np.ceil((ends - origin) / slot_seconds), 0, total).astype(np.int64)
+    valid = last > first
+
+    delta = np.zeros(total + 1, dtype=np.int32)
+    np.add.at(delta, first[valid], 1)
+    np.add.at(delta, last[valid], -1)
+    return (np.cumsum(delta[:-1]) > 0).reshape(days, slots_per_day)
+
+def busy_hours_per_day(occupancy: np.ndarray, slot_minutes: int = SLOT_MINUTES) -> np.ndarray:
+    return occupancy.sum(axis=1) * slot_minutes / 60
+
+def weekday_hour_heatmap(occupancy: np.ndarray, range_start: datetime, slot_minutes: int = SLOT_MINUTES) -> np.ndarray:
+    # Horas ocupadas somadas por (dia da semana, hora do dia)
+    days = occupancy.shape[0]
+    per_hour = occupancy.reshape(days, 24, 60 // slot_minutes).sum(axis=2) * slot_minutes / 60
+    weekdays = (range_start.weekday() + np.arange(days)) % 7
+    heatmap = np.zeros((7, 24))
+    np.add.at(heatmap, weekdays, per_hour)
+    return heatmap
+
+def weekly_load(occupancy: np.ndarray, slot_minutes: int = SLOT_MINUTES) -> np.ndarray:
+    # Horas ocupadas por bloco de 7 dias a partir do início do período
+    hours = busy_hours_per_day(occupancy, slot_minutes)
+    weeks = -(-len(hours) // 7)
+    return np.pad(hours, (0, weeks * 7 - len(hours))).reshape(weeks, 7).sum(axis=1)
+
+def fragmentation(occupancy: np.ndarray, slot_minutes: int = SLOT_MINUTES) -> tuple:
+    # Por dia: número de blocos ocupados e de intervalos livres curtos entre reuniões dentro da jornada
+    days, slots_per_day = occupancy.shape
+    blocks = (occupancy[:, 1:] & ~occupancy[:, :-1]).sum(axis=1) + occupancy[:, 0]
+
+    work = occupancy[:, WORK_START_HOUR * slots_per_day // 24:WORK_END_HOUR * slots_per_day // 24]
+    edges = np.diff(np.pad(~work, ((0, 0), (1, 1))).astype(np.int8), axis=1)
+    run_starts = np.argwhere(edges == 1)
+    run_ends = np.argwhere(edges == -1)
+    lengths = run_ends[:, 1] - run_starts[:, 1]
+    interior = (run_starts[:, 1] > 0) & (run_ends[:, 1] < work.shape[1])
+    short = interior & (lengths * slot_minutes < SHORT_GAP_MINUTES)
+    short_gaps = np.bincount(run_starts[short, 0], minlength=days)
+    return blocks, short_gaps
+
+def occupancy_report(starts: np.ndarray, ends: np.ndarray, range_start: datetime, days: int) -> str:
+    occupancy = occupancy_matrix(starts, ends, range_start, days)
+    hours = busy_hours_per_day(occupancy)
+    heatmap = weekday_hour_heatmap(occupancy, range_start)
+    weeks = weekly_load(occupancy)
+    blocks, short_gaps = fragmentation(occupancy)
+
+    weekday_names = ["seg", "ter", "qua", "qui", "sex", "sáb", "dom"]
+    range_end = range_start + timedelta(days=days - 1)
+    lines = [f"📊 Ocupação de {range_start.strftime('%d/%m/%Y')} a {range_end.strftime('%d/%m/%Y')}:"]
+    lines.append(f"Total: {hours.sum():.1f}h em reuniões ({hours[hours > 0].mean() if hours.any() else 0:.1f}h por dia com reuniões)")
+
+    lines.append("\nDias mais ocupados:")
+    for day in np.argsort(hours)[::-1][:3]:
+        if hours[day] == 0:
+            break
+        lines.append(f"- {(range_start + timedelta(days=int(day))).strftime('%d/%m')}: {hours[day]:.1f}h")
+
+    lines.append("\nHorários mais carregados:")
+    for cell in np.argsort(heatmap, axis=None)[::-1][:3]:
+        weekday, hour = divmod(int(cell), 24)
+        if heatmap[weekday, hour] == 0:
+            break
+        lines.append(f"- {weekday_names[weekday]} {hour:02d}h: {heatmap[weekday, hour]:.1f}h no período")
+
+    lines.append("\nCarga semanal:")
+    for week in range(max(0, len(weeks) - 8), len(weeks)):
+        lines.append(f"- {(range_start + timedelta(weeks=week)).strftime('%d/%m')}: {weeks[week]:.1f}h")
+
+    active = blocks > 0
+    lines.append("\nFragmentação:")
+    lines.append(f"- {blocks[active].mean() if active.any() else 0:.1f} blocos de reunião por dia com reuniões")
+    lines.append(f"- {int(short_gaps.sum())} intervalos livres de menos de {SHORT_GAP_MINUTES} min entre reuniões")
+    return "\n".join(lines)
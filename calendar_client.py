@@ -0,0 +1,166 @@
+import os
+import json
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import httplib2
+import google_auth_httplib2
+from google.oauth2 import service_account
+from googleapiclient.discovery import build_from_document
+from googleapiclient.discovery_cache import get_static_doc
+from dotenv import load_dotenv
+
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+
+SCOPES = ["https://www.googleapis.com/auth/calendar"]
+HTTP_TIMEOUT = float(os.getenv("CALENDAR_HTTP_TIMEOUT", "30"))
+NUM_RETRIES = int(os.getenv("CALENDAR_NUM_RETRIES", "2"))
+MAX_CONCURRENCY = int(os.getenv("CALENDAR_MAX_CONCURRENCY", "8"))
+CALL_TIMEOUT = float(os.getenv("CALENDAR_CALL_TIMEOUT", "20"))
+# Limite de chamadas por requisição batch da API do Calendar
+BATCH_LIMIT = 50
+
+class CalendarClient:
+    """Cliente do Google Calendar compartilhado entre todos os comandos.
+
+    As credenciais são lidas uma única vez e o token é reaproveitado até expirar.
+    O serviço é montado a partir do documento de descoberta empacotado com o
+    googleapiclient, e cada thread mantém sua própria conexão HTTP autorizada
+    (httplib2 não é thread-safe), reaproveitada entre as chamadas. As chamadas
+    assíncronas rodam em um pool de threads próprio com limite de concorrência.
+    """
+
+    def __init__(self, credentials=None, max_concurrency: int = MAX_CONCURRENCY):
+        self._credentials = credentials
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="calendar")
+        self._service = None
+        self._events = None
+        self._freebusy = None
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    @property
+    def credentials(self):
+        if self._credentials is None:
+            with self._lock:
+                if self._credentials is None:
+                    google_credentials = os.getenv("GOOGLE_CREDENTIALS")
+                    if not google_credentials:
+                        raise ValueError("GOOGLE_CREDENTIALS não está configurado no .env")
+                    self._credentials = service_account.Credentials.from_service_account_info(
+                        json.loads(google_credentials),
+                        scopes=SCOPES
+                    )
+        return self._credentials
+
+    @property
+    def http(self) -> google_auth_httplib2.AuthorizedHttp:
+        http = getattr(self._local, "http", None)
+        if http is None:
+            http = google_auth_httplib2.AuthorizedHttp(self.credentials, http=httplib2.Http(timeout=HTTP_TIMEOUT))
+            self._local.http = http
+        return http
+
+    @property
+    def service(self):
+        if self._service is None:
+            credentials = self.credentials
+            with self._lock:
+                if self._service is None:
+                    self._service = build_from_document(
+                        get_static_doc("calendar", "v3"),
+                        http=google_auth_httplib2.AuthorizedHttp(credentials, http=httplib2.Http(timeout=HTTP_TIMEOUT))
+                    )
+                    logger.info("Serviço do Google Calendar inicializado")
+        return self._service
+
+    def events(self):
+        # service.events() remonta o recurso a partir do documento a cada chamada
+        if self._events is None:
+            self._events = self.service.events()
+        return self._events
+
+    def freebusy(self):
+        if self._freebusy is None:
+            self._freebusy = self.service.freebusy()
+        return self._freebusy
+
+    def execute(self, request):
+        # Executa a requisição na conexão da thread atual em vez da conexão usada na criação do serviço
+        return request.execute(http=self.http, num_retries=NUM_RETRIES)
+
+    def execute_batch(self, requests: list) -> list:
+        results = [None] * len(requests)
+
+        def callback(request_id, response, exception):
+            results[int(request_id)] = (response, exception)
+
+        batch = self.service.new_batch_http_request(callback=callback)
+        for index, request in enumerate(requests):
+            batch.add(request, request_id=str(index))
+        batch.execute(http=self.http)
+        return results
+
+    async def run(self, request, timeout: float = CALL_TIMEOUT):
+        return await self._submit(self.execute, request, timeout)
+
+    async def run_batch(self, requests: list, timeout: float = CALL_TIMEOUT) -> list:
+        # Agrupa as chamadas em requisições batch de até BATCH_LIMIT itens, enviadas em paralelo.
+        # Devolve (resposta, exceção) para cada requisição, na ordem recebida.
+        chunks = [requests[i:i + BATCH_LIMIT] for i in range(0, len(requests), BATCH_LIMIT)]
+        responses = await asyncio.gather(*(self._submit(self.execute_batch, chunk, timeout) for chunk in chunks))
+        return [result for chunk in responses for result in chunk]
+
+    async def _submit(self, fn, argument, timeout: float):
+        # Executa a chamada bloqueante no pool dedicado para não travar o loop do bot.
+        # Se a coroutine for cancelada (update abandonado) ou estourar o tempo, a chamada
+        # ainda na fila do pool é descartada sem chegar a ser enviada.
+        future = self._executor.submit(fn, argument)
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+        except asyncio.TimeoutError:
+            future.cancel()
+            raise TimeoutError(f"O Google Calendar não respondeu em {timeout:g}s")
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+
+    async def iter_event_pages(self, calendar_id: str, fields: str = None, page_size: int = 250, **params):
+        # Segue os nextPageToken entregando cada página assim que chega
+        if fields:
+            fields = f"{fields},nextPageToken"
+        page_token = None
+        while True:
+            page = await self.run(self.events().list(
+                calendarId=calendar_id,
+                maxResults=page_size,
+                pageToken=page_token,
+                fields=fields,
+                **params
+            ))
+            yield page
+            page_token = page.get("nextPageToken")
+            if not page_token:
+                return
+
+    async def iter_events(self, calendar_id: str, fields: str = None, page_size: int = 250, **params):
+        async for page in self.iter_event_pages(calendar_id, fields=fields, page_size=page_size, **params):
+            for event in page.get("items", []):
+                yield event
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+_client = None
+_client_lock = threading.Lock()
+
+def get_calendar_client() -> CalendarClient:
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = CalendarClient()
+    return _client
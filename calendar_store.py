@@ -0,0 +1,178 @@
+import os
+import time
+import bisect
+import unicodedata
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from googleapiclient.errors import HttpError
+from calendar_client import get_calendar_client
+
+logger = logging.getLogger(__name__)
+
+# Fuso usado em todo o bot (America/Sao_Paulo, sem horário de verão)
+LOCAL_TZ = timezone(timedelta(hours=-3))
+SYNC_INTERVAL = float(os.getenv("CALENDAR_SYNC_INTERVAL", "30"))
+SYNC_WINDOW_DAYS = int(os.getenv("CALENDAR_SYNC_WINDOW_DAYS", "90"))
+PAGE_SIZE = 2500
+# Campos mantidos no espelho; o restante do payload do evento não é baixado
+STORE_FIELDS = "items(id,etag,status,summary,start,end,attendees,iCalUID),nextSyncToken"
+
+def parse_event_time(value: dict) -> datetime:
+    if "dateTime" in value:
+        return datetime.fromisoformat(value["dateTime"].replace("Z", "+00:00"))
+    # Eventos de dia inteiro só trazem a data
+    return datetime.strptime(value["date"], "%Y-%m-%d").replace(tzinfo=LOCAL_TZ)
+
+def normalize_title(title: str) -> str:
+    # Ignora maiúsculas, acentos e espaços repetidos ao comparar títulos de reuniões
+    decomposed = unicodedata.normalize("NFKD", title or "")
+    return " ".join("".join(c for c in decomposed if not unicodedata.combining(c)).casefold().split())
+
+class EventStore:
+    """Espelho local dos eventos de um calendário.
+
+    Faz uma sincronização completa a partir de SYNC_WINDOW_DAYS atrás e depois
+    só busca as mudanças via syncToken, no máximo a cada SYNC_INTERVAL segundos.
+    Mantém também um índice de título normalizado -> {id do evento: etag}.
+    """
+
+    def __init__(self, calendar_id: str):
+        self.calendar_id = calendar_id
+        self._events = {}
+        self._titles = {}
+        self._timeline = []
+        self._max_duration = timedelta(0)
+        self._dirty = False
+        self._sync_token = None
+        self._window_start = None
+        self._last_sync = 0.0
+        self._sync_task = None
+
+    async def refresh(self, force: bool = False):
+        # A sincronização roda numa tarefa própria: quem desiste de esperar (tempo limite da
+        # consulta) não a cancela, e uma sincronização completa lenta termina para os próximos
+        running = self._sync_task
+        if running is not None:
+            await asyncio.shield(running)
+            if not force:
+                return
+        if self._sync_task is None:
+            if not force and self._sync_token and time.monotonic() - self._last_sync < SYNC_INTERVAL:
+                return
+            self._sync_task = asyncio.create_task(self._sync())
+            self._sync_task.add_done_callback(self._synced)
+        await asyncio.shield(self._sync_task)
+
+    def _synced(self, task: asyncio.Task):
+        self._sync_task = None
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Erro ao sincronizar {self.calendar_id}: {task.exception()}")
+
+    async def _sync(self):
+        if self._sync_token is None:
+            await self._full_sync()
+            return
+        try:
+            await self._incremental_sync()
+        except HttpError as http_error:
+            if http_error.resp.status != 410:
+                raise
+            # Token expirado: o Google exige uma nova sincronização completa
+            logger.info(f"syncToken expirado para {self.calendar_id}, refazendo sincronização completa")
+            await self._full_sync()
+
+    async def _fetch(self, **params) -> str:
+        sync_token = None
+        async for page in get_calendar_client().iter_event_pages(
+            self.calendar_id,
+            fields=STORE_FIELDS,
+            page_size=PAGE_SIZE,
+            singleEvents=True,
+            **params
+        ):
+            for event in page.get("items", []):
+                self.apply(event)
+            sync_token = page.get("nextSyncToken", sync_token)
+        return sync_token
+
+    async def _full_sync(self):
+        window_start = datetime.now(LOCAL_TZ).replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=SYNC_WINDOW_DAYS)
+        self._events = {}
+        self._titles = {}
+        self._dirty = True
+        self._window_start = None
+        self._sync_token = await self._fetch(timeMin=window_start.isoformat())
+        self._window_start = window_start
+        self._last_sync = time.monotonic()
+        logger.info(f"Sincronização completa de {self.calendar_id}: {len(self._events)} eventos")
+
+    async def _incremental_sync(self):
+        self._sync_token = await self._fetch(syncToken=self._sync_token)
+        self._last_sync = time.monotonic()
+
+    def apply(self, event: dict):
+        if event.get("status") == "cancelled":
+            self.discard(event["id"])
+            return
+        self.discard(event["id"])
+        self._events[event["id"]] = event
+        self._titles.setdefault(normalize_title(event.get("summary")), {})[event["id"]] = event.get("etag")
+        self._dirty = True
+
+    def discard(self, event_id: str):
+        event = self._events.pop(event_id, None)
+        if event is None:
+            return
+        title = normalize_title(event.get("summary"))
+        ids = self._titles.get(title)
+        if ids is not None:
+            ids.pop(event_id, None)
+            if not ids:
+                del self._titles[title]
+        self._dirty = True
+
+    def get(self, event_id: str) -> dict:
+        return self._events.get(event_id)
+
+    def find(self, title: str) -> list:
+        # Eventos com o título informado, ordenados pelo início
+        ids = self._titles.get(normalize_title(title), {})
+        return sorted((self._events[event_id] for event_id in ids), key=lambda event: parse_event_time(event["start"]))
+
+    def covers(self, time_min: datetime) -> bool:
+        return self._window_start is not None and time_min >= self._window_start
+
+    def _rebuild_timeline(self):
+        timeline = []
+        max_duration = timedelta(0)
+        for event in self._events.values():
+            start = parse_event_time(event["start"])
+            end = parse_event_time(event["end"])
+            timeline.append((start, event["id"]))
+            max_duration = max(max_duration, end - start)
+        timeline.sort()
+        self._timeline = timeline
+        self._max_duration = max_duration
+        self._dirty = False
+
+    def events_between(self, time_min: datetime, time_max: datetime) -> list:
+        # Mesma semântica do timeMin/timeMax da API: eventos que se sobrepõem ao intervalo, ordenados pelo início
+        if self._dirty:
+            self._rebuild_timeline()
+        low = bisect.bisect_left(self._timeline, (time_min - self._max_duration,))
+        high = bisect.bisect_left(self._timeline, (time_max,))
+        events = []
+        for _, event_id in self._timeline[low:high]:
+            event = self._events[event_id]
+            if parse_event_time(event["end"]) > time_min:
+                events.append(event)
+        return events
+
+_stores = {}
+
+def get_event_store(calendar_id: str) -> EventStore:
+    store = _stores.get(calendar_id)
+    if store is None:
+        store = _stores[calendar_id] = EventStore(calendar_id)
+    return store
@@ -0,0 +1,289 @@
+# Modo com vários processos: um processo de entrada recebe os updates (polling ou webhook)
+# e os distribui entre BOT_PROCESSES workers pelo chat_id. Cada worker é um Application
+# completo; estados das conversas, user_data e tarefas ficam no SQLite compartilhado.
+# A entrega aos workers é no máximo uma vez: o que um worker já recebeu morre com ele.
+#
+# Uso: BOT_PROCESSES=4 python cluster.py
+import os
+import hmac
+import json
+import queue
+import signal
+import asyncio
+import logging
+import secrets
+import threading
+import multiprocessing
+from telegram import Update
+from telegram.error import RetryAfter, TelegramError
+import bot
+from monday_cache import monday_cache
+from monday_webhook import start_monday_webhook, MONDAY_WEBHOOK_PORT
+from sqlite_persistence import SQLitePersistence
+from webhook_server import WebhookServer
+from telegram_webhook import (
+    running, register_webhook, used_update_types, SECRET_HEADER, TELEGRAM_WEBHOOK_URL,
+    TELEGRAM_WEBHOOK_HOST, TELEGRAM_WEBHOOK_PORT, TELEGRAM_WEBHOOK_PATH, TELEGRAM_WEBHOOK_SECRET
+)
+
+logger = logging.getLogger(__name__)
+
+# Quantidade de workers; 0 usa um por núcleo
+BOT_PROCESSES = int(os.getenv("BOT_PROCESSES", "0")) or os.cpu_count() or 1
+POLL_TIMEOUT = 30
+# Intervalo de verificação dos workers; um worker que morreu sobe de novo no mesmo shard
+SUPERVISE_INTERVAL = 1.0
+STOP_TIMEOUT = 30
+# Quantas mensagens o worker tira da fila de uma vez
+RECEIVE_BATCH = 256
+
+def chat_key(data: dict):
+    # Chat do update direto do JSON, sem montar o objeto Update
+    for value in data.values():
+        if isinstance(value, dict):
+            chat = value.get("chat") or (value.get("message") or {}).get("chat")
+            if chat:
+                return chat["id"]
+            sender = value.get("from")
+            if sender:
+                return sender["id"]
+    return None
+
+def shard_of(data: dict, count: int) -> int:
+    key = chat_key(data)
+    return key % count if key is not None else 0
+
+def receive(connection, limit: int = RECEIVE_BATCH) -> list:
+    # Roda numa thread: espera até 1s pela primeira mensagem e leva as que já chegaram.
+    # EOFError quer dizer que o processo de entrada fechou o canal
+    if not connection.poll(1):
+        return []
+    messages = []
+    while len(messages) < limit and connection.poll():
+        messages.append(connection.recv())
+    return messages
+
+async def serve_shard(index: int, count: int, connection):
+    application = bot.build_application(persistence=SQLitePersistence(), shard=(index, count))
+    # A cota do Gemini é da chave, não do processo
+    bot.rate_limiter.share(count)
+    loop = asyncio.get_running_loop()
+    async with running(application):
+        logger.info(f"Worker {index + 1}/{count} pronto")
+        while True:
+            try:
+                messages = await loop.run_in_executor(None, receive, connection)
+            except EOFError:
+                logger.warning(f"Worker {index + 1}/{count}: processo de entrada sumiu, encerrando")
+                return
+            for kind, payload in messages:
+                if kind == "stop":
+                    return
+                if kind == "update":
+                    await application.update_queue.put(Update.de_json(payload, application.bot))
+                elif kind == "monday":
+                    monday_cache.invalidate(payload)
+
+def worker_main(index: int, count: int, connection):
+    # Ctrl+C e SIGTERM chegam ao grupo todo; quem encerra os workers é o processo de entrada,
+    # depois de parar de receber updates, para que nada fique pela metade
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    asyncio.run(serve_shard(index, count, connection))
+
+class Shard:
+    """Um worker e a fila dos seus updates, no processo de entrada.
+
+    A fila é local e uma thread a esvazia no pipe do worker. Se o worker
+    morre, a mensagem cujo envio falhou e as seguintes esperam até o
+    supervisor subir outro processo com um pipe novo. As que já tinham sido
+    escritas no pipe antigo não são reenviadas: não há confirmação do worker,
+    então a entrega é no máximo uma vez. (Uma multiprocessing.Queue não serve
+    aqui: um worker morto no meio do get deixa a trava dela presa.)
+    """
+
+    def __init__(self, index: int, count: int, context, target):
+        self.index = index
+        self.count = count
+        self.routed = 0
+        self.process = None
+        self.pending = queue.Queue()
+        self._context = context
+        self._target = target
+        self._connection = None
+        self._condition = threading.Condition()
+        threading.Thread(target=self._feed, name=f"bot-shard-{index + 1}", daemon=True).start()
+
+    def spawn(self):
+        reader, writer = self._context.Pipe(duplex=False)
+        process = self._context.Process(target=self._target, args=(self.index, self.count, reader), name=f"bot-worker-{self.index + 1}")
+        process.start()
+        # Sem a ponta de leitura aberta aqui, escrever para um worker morto falha na hora
+        reader.close()
+        with self._condition:
+            if self._connection is not None:
+                self._connection.close()
+            self._connection = writer
+            self.process = process
+            self._condition.notify_all()
+
+    def put(self, message: tuple):
+        self.pending.put(message)
+
+    def _feed(self):
+        while True:
+            message = self.pending.get()
+            while True:
+                with self._condition:
+                    while self._connection is None:
+                        self._condition.wait()
+                    connection = self._connection
+                try:
+                    connection.send(message)
+                    break
+                except OSError:
+                    # Worker morreu: espera o próximo
+                    with self._condition:
+                        if self._connection is connection:
+                            self._connection = None
+
+class Cluster:
+    """Processo de entrada: distribui os updates entre `count` workers por chat_id.
+
+    Os updates do mesmo chat vão sempre para o mesmo worker, em ordem; um
+    worker que morre sobe de novo no mesmo shard e retoma as conversas do
+    SQLite compartilhado, mas os updates que ele já tinha recebido e não
+    terminou de tratar se perdem.
+    """
+
+    def __init__(self, count: int = BOT_PROCESSES, target=worker_main):
+        self.count = count
+        self.restarts = 0
+        self.offset = None
+        context = multiprocessing.get_context("spawn")
+        self.shards = [Shard(index, count, context, target) for index in range(count)]
+        self._stopping = False
+
+    @property
+    def routed(self) -> list:
+        return [shard.routed for shard in self.shards]
+
+    def start(self):
+        for shard in self.shards:
+            shard.spawn()
+        logger.info(f"Cluster com {self.count} workers")
+
+    def route(self, data: dict):
+        shard = self.shards[shard_of(data, self.count)]
+        shard.put(("update", data))
+        shard.routed += 1
+
+    def broadcast(self, kind: str, payload):
+        for shard in self.shards:
+            shard.put((kind, payload))
+
+    async def supervise(self):
+        while not self._stopping:
+            await asyncio.sleep(SUPERVISE_INTERVAL)
+            for shard in self.shards:
+                if not self._stopping and not shard.process.is_alive():
+                    logger.warning(f"Worker {shard.index + 1} saiu com código {shard.process.exitcode}; reiniciando")
+                    self.restarts += 1
+                    shard.spawn()
+
+    async def stop(self):
+        # Cada worker termina o que já está na sua fila antes de ler o "stop"
+        self._stopping = True
+        self.broadcast("stop", None)
+        loop = asyncio.get_running_loop()
+        for shard in self.shards:
+            await loop.run_in_executor(None, shard.process.join, STOP_TIMEOUT)
+            if shard.process.is_alive():
+                logger.warning(f"Worker {shard.index + 1} não parou em {STOP_TIMEOUT}s; encerrando à força")
+                shard.process.terminate()
+        logger.info(f"Updates por worker: {self.routed}; reinícios: {self.restarts}")
+
+    async def poll(self, bot_api, allowed_updates: list):
+        await bot_api.delete_webhook()
+        while True:
+            try:
+                updates = await bot_api.get_updates(offset=self.offset, timeout=POLL_TIMEOUT, allowed_updates=allowed_updates)
+            except RetryAfter as e:
+                await asyncio.sleep(e.retry_after)
+                continue
+            except TelegramError as e:
+                logger.warning(f"Erro ao buscar updates: {e}")
+                await asyncio.sleep(SUPERVISE_INTERVAL)
+                continue
+            for update in updates:
+                self.route(update.to_dict())
+            if updates:
+                self.offset = updates[-1].update_id + 1
+
+    async def confirm(self, bot_api):
+        # Confirma ao Telegram os updates já distribuídos, para não recebê-los de novo
+        if self.offset is None:
+            return
+        try:
+            await bot_api.get_updates(offset=self.offset, timeout=0, limit=1)
+        except TelegramError as e:
+            logger.warning(f"Não foi possível confirmar os updates: {e}")
+
+def ingress_handler(cluster: Cluster, secret_token: str):
+    async def handle(body: bytes, headers: dict) -> tuple:
+        if not hmac.compare_digest(headers.get(SECRET_HEADER, ""), secret_token):
+            logger.warning("Webhook do Telegram com segredo inválido")
+            return 403, {"error": "Segredo inválido"}
+        data = json.loads(body)
+        if not isinstance(data, dict) or "update_id" not in data:
+            return 400, {"error": "Update vazio"}
+        cluster.route(data)
+        return 200, {}
+    return handle
+
+async def run_cluster(count: int = BOT_PROCESSES):
+    # O Application daqui só fornece o Bot e a lista de handlers; quem trata os updates são os workers
+    application = bot.build_application()
+    bot_api = application.bot
+    allowed_updates = used_update_types(application)
+    cluster = Cluster(count)
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, stop.set)
+
+    cluster.start()
+    supervisor = asyncio.create_task(cluster.supervise())
+    servers = []
+    poller = None
+    await bot_api.initialize()
+    try:
+        if MONDAY_WEBHOOK_PORT:
+            monday_server = await start_monday_webhook(invalidate=lambda board_id: cluster.broadcast("monday", board_id))
+            if monday_server is not None:
+                servers.append(monday_server)
+        if TELEGRAM_WEBHOOK_URL:
+            secret_token = TELEGRAM_WEBHOOK_SECRET or secrets.token_urlsafe(32)
+            server = WebhookServer(TELEGRAM_WEBHOOK_HOST, TELEGRAM_WEBHOOK_PORT, {TELEGRAM_WEBHOOK_PATH: ingress_handler(cluster, secret_token)})
+            await server.start()
+            servers.append(server)
+            await register_webhook(bot_api, TELEGRAM_WEBHOOK_URL, allowed_updates, secret_token)
+        else:
+            poller = asyncio.create_task(cluster.poll(bot_api, allowed_updates))
+        await stop.wait()
+    finally:
+        if poller is not None:
+            poller.cancel()
+            await asyncio.gather(poller, return_exceptions=True)
+            await cluster.confirm(bot_api)
+        for server in servers:
+            await server.stop()
+        supervisor.cancel()
+        await cluster.stop()
+        await bot_api.shutdown()
+
+def main():
+    asyncio.run(run_cluster())
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+from collections import OrderedDict, deque
+
+def estimate_tokens(text: str) -> int:
+    # Aproximação usada pelo Gemini para português/inglês: ~4 caracteres por token
+    return len(text) // 4 + 1
+
+class ConversationMemory:
+    """Histórico por chat com janela limitada em tokens.
+
+    As mensagens mais antigas que saem da janela são devolvidas por `record`
+    para serem resumidas; o resumo acompanha as próximas requisições.
+    """
+
+    def __init__(self, max_tokens: int = 2000, max_chats: int = 10000):
+        self.max_tokens = max_tokens
+        self.max_chats = max_chats
+        self._chats = OrderedDict()
+
+    def _chat(self, chat_id: int) -> dict:
+        chat = self._chats.get(chat_id)
+        if chat is None:
+            chat = self._chats[chat_id] = {"turns": deque(), "tokens": 0, "summary": ""}
+            # Esquece os chats inativos há mais tempo
+            while len(self._chats) > self.max_chats:
+                self._chats.popitem(last=False)
+        self._chats.move_to_end(chat_id)
+        return chat
+
+    def history(self, chat_id: int) -> tuple:
+        chat = self._chats.get(chat_id)
+        if chat is None:
+            return [], ""
+        return list(chat["turns"]), chat["summary"]
+
+    def record(self, chat_id: int, message: str, reply: str) -> list:
+        chat = self._chat(chat_id)
+        for role, text in (("user", message), ("model", reply)):
+            chat["turns"].append((role, text))
+            chat["tokens"] += estimate_tokens(text)
+
+        overflow = []
+        # Remove pares pergunta/resposta inteiros para a janela sempre começar com o usuário
+        while chat["tokens"] > self.max_tokens and len(chat["turns"]) > 2:
+            for _ in range(2):
+                role, text = chat["turns"].popleft()
+                chat["tokens"] -= estimate_tokens(text)
+                overflow.append((role, text))
+        return overflow
+
+    def set_summary(self, chat_id: int, summary: str):
+        if chat_id in self._chats:
+            self._chats[chat_id]["summary"] = summary
+
+    def clear(self, chat_id: int):
+        self._chats.pop(chat_id, None)
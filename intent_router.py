@@ -0,0 +1,231 @@
+import os
+import re
+import unicodedata
+from datetime import datetime, timedelta
+
+# Abaixo desta confiança a mensagem segue para o Gemini
+MIN_CONFIDENCE = float(os.getenv("ROUTER_MIN_CONFIDENCE", "0.75"))
+DEFAULT_DURATION_MINUTES = 60
+
+WEEKDAYS = {"segunda": 0, "terca": 1, "quarta": 2, "quinta": 3, "sexta": 4, "sabado": 5, "domingo": 6}
+PERIOD_OFFSET = {"manha": 0, "tarde": 12, "noite": 12}
+
+_TIME = r"(\d{1,2})(?:[:h](\d{2})|\s*h(?:oras?|rs)?\b)?(?:\s+da\s+(manha|tarde|noite))?"
+
+_DATE_PATTERNS = [
+    (re.compile(r"\bdepois de amanha\b"), lambda m, now: now.date() + timedelta(days=2)),
+    (re.compile(r"\bamanha\b"), lambda m, now: now.date() + timedelta(days=1)),
+    (re.compile(r"\bhoje\b"), lambda m, now: now.date()),
+    (re.compile(r"\b(\d{1,2})/(\d{1,2})(?:/(\d{2,4}))?\b"), lambda m, now: _explicit_date(m, now)),
+    (re.compile(r"\bdia (\d{1,2})\b"), lambda m, now: _day_of_month(int(m.group(1)), now)),
+    (re.compile(r"\b(?:(?:na|no|nesta|neste|essa|esse|proxima|proximo)\s+)?(segunda|terca|quarta|quinta|sexta|sabado|domingo)(?:[- ]feira)?\b"),
+     lambda m, now: _next_weekday(m, now)),
+]
+_RANGE = re.compile(r"\b(das|de)\s+" + _TIME + r"(\s+)(?:as|a|ate)\s+" + _TIME)
+_SINGLE_TIME = re.compile(r"(?:\b(as|a partir das|para as)\s+)?\b" + _TIME)
+_NOON = re.compile(r"\b(?:ao )?meio[- ]dia\b")
+_DURATION = re.compile(r"\b(?:(?:por|durante|de)\s+)?(?:(\d+)\s*(?:min|minutos)|(\d+)\s*(?:h|horas?)|(meia hora|uma hora))\b")
+_QUOTED = re.compile(r"[\"'“”‘’](.+?)[\"'“”‘’]")
+_SUBJECT = re.compile(r"\b(com|sobre)\s+(.+)")
+
+_SCHEDULE_VERB = re.compile(r"^(?:\w+,\s*)?(?:(?:por favor|pode|podes|voce pode)\s+)?(?:me\s+)?(marca|marcar|marque|agenda|agendar|agende|cria|criar|crie)\b")
+_MEETING_NOUN = re.compile(r"\b(reuniao|reunioes|call|evento|compromisso|encontro|conversa)\b")
+_TASKS = re.compile(r"\btarefas?\b")
+_TASKS_LIST = re.compile(r"\b(quais|minhas|meus|lista|listar|liste|mostra|mostrar|mostre|ver|pendentes|tenho)\b")
+_TASKS_CHANGE = re.compile(r"\b(adiciona|adicionar|adicione|remove|remover|remova|cria|criar|crie|apaga|apagar|prioriza|priorizar)\b")
+_FREE_TIME = re.compile(r"\b(horarios?|tempo|janelas?|espacos?)\s+(livres?|disponive(?:l|is)|vagos?)\b|\bestou livre\b|\b(?:tenho|estou com) tempo livre\b|\bquando (?:eu )?(?:estou|fico) livre\b")
+_AGENDA = re.compile(r"\b(minha agenda|meus compromissos|minhas reunioes|meus eventos)\b")
+_AGENDA_QUESTION = re.compile(r"\b(o que (?:eu )?tenho|(?:reunioes|compromissos|eventos) (?:de|para|marcad[oa]s))\b")
+# Pedidos de conselho soam como comando ("como organizo minha agenda?") mas são para o assistente
+_ADVICE = re.compile(r"\b(como|por que|porque|dica|dicas|ajuda|ajudar|devo|deveria|melhor|organizar|organizo|produtiv\w*|sugere|sugestao)\b")
+
+def _fold(text: str) -> str:
+    # Minúsculas sem acento, caractere a caractere, para os índices baterem com o texto original
+    folded = []
+    for char in text:
+        base = unicodedata.normalize("NFKD", char)[:1] or char
+        folded.append(base.lower() if len(base.lower()) == 1 else base)
+    return "".join(folded)
+
+def _mask(text: str, span: tuple) -> str:
+    return text[:span[0]] + " " * (span[1] - span[0]) + text[span[1]:]
+
+def _explicit_date(match, now: datetime):
+    day, month = int(match.group(1)), int(match.group(2))
+    year = match.group(3)
+    if year:
+        year = int(year) + (2000 if len(year) == 2 else 0)
+        return datetime(year, month, day).date()
+    candidate = datetime(now.year, month, day).date()
+    # Sem ano, uma data que já passou é do ano seguinte
+    return candidate if candidate >= now.date() else datetime(now.year + 1, month, day).date()
+
+def _day_of_month(day: int, now: datetime):
+    candidate = now.replace(day=day).date()
+    if candidate >= now.date():
+        return candidate
+    next_month = (now.replace(day=1) + timedelta(days=32)).replace(day=day)
+    return next_month.date()
+
+def _next_weekday(match, now: datetime):
+    ahead = (WEEKDAYS[match.group(1)] - now.weekday()) % 7
+    if ahead == 0 and match.group(0).startswith("proxim"):
+        ahead = 7
+    return now.date() + timedelta(days=ahead)
+
+def _clock(hour: str, minute: str, period: str) -> tuple:
+    hour, minute = int(hour), int(minute or 0)
+    if period and hour < 12:
+        hour += PERIOD_OFFSET[period]
+    if hour > 23 or minute > 59:
+        raise ValueError("Horário inválido")
+    return hour, minute
+
+def parse_date(folded: str, now: datetime) -> tuple:
+    # Devolve (data, span) da primeira expressão de data encontrada
+    for pattern, resolve in _DATE_PATTERNS:
+        match = pattern.search(folded)
+        if match:
+            try:
+                return resolve(match, now), match.span()
+            except ValueError:
+                continue
+    return None, None
+
+def _is_range(match, original: str) -> bool:
+    # "de 2 horas às 10h" é duração seguida de horário, e "de 2h amanhã às 9h" só encosta
+    # no "às" porque a data foi mascarada; nos dois casos não é um intervalo
+    if match.group(1) == "de" and "hora" in match.group(0)[:match.start(5) - match.start()]:
+        return False
+    return original[match.start(5):match.end(5)].isspace()
+
+def _prefixed_durations(folded: str) -> list:
+    # Spans de "por 30 min", "de 2 horas", "durante 1h": o número ali não é horário
+    return [match.span() for match in _DURATION.finditer(folded) if match.group(0).split()[0] in ("por", "durante", "de")]
+
+def parse_times(folded: str, original: str = None) -> tuple:
+    # Devolve ((hora, minuto) de início, (hora, minuto) de fim ou None, spans usados).
+    # original: o mesmo texto antes de mascarar a data, com os mesmos índices
+    original = original if original is not None else folded
+    match = _RANGE.search(folded)
+    if match and _is_range(match, original):
+        try:
+            start, end = _clock(*match.group(2, 3, 4)), _clock(*match.group(6, 7, 8))
+            if end > start:
+                return start, end, [match.span()]
+        except ValueError:
+            pass
+    match = _NOON.search(folded)
+    if match:
+        return (12, 0), None, [match.span()]
+    durations = _prefixed_durations(folded)
+    for match in _SINGLE_TIME.finditer(folded):
+        if any(start < match.end() and match.start() < end for start, end in durations):
+            continue
+        prefix, hour, minute, period = match.group(1, 2, 3, 4)
+        # Um número solto só conta como horário com "às", "h", ":MM" ou "da tarde"
+        if not (prefix or minute or period or "h" in match.group(0)[len(prefix or ""):]):
+            continue
+        try:
+            return _clock(hour, minute, period), None, [match.span()]
+        except ValueError:
+            continue
+    return None, None, []
+
+def parse_duration(folded: str) -> tuple:
+    match = _DURATION.search(folded)
+    if not match:
+        return None, None
+    minutes, hours, words = match.groups()
+    if minutes:
+        return int(minutes), match.span()
+    if hours:
+        return int(hours) * 60, match.span()
+    return (30 if words == "meia hora" else 60), match.span()
+
+# Conectivos que sobram no fim do assunto quando a data ou o horário são removidos
+_TRAILING_WORDS = {"para", "pra", "de", "do", "da", "no", "na", "em", "e", "as", "a", "por", "ate"}
+
+def _meeting_summary(text: str, masked: str) -> str:
+    quoted = _QUOTED.search(text)
+    if quoted:
+        return quoted.group(1).strip()
+    subject = _SUBJECT.search(masked)
+    if subject:
+        # Mesmas máscaras no texto original, para data, horário e duração não irem para o título;
+        # cada trecho entre as partes removidas perde os conectivos que ficaram soltos no fim
+        original = "".join("\0" if kept == " " and not char.isspace() else char for char, kept in zip(text, masked))
+        pieces = []
+        for piece in original[subject.start(2):subject.end(2)].split("\0"):
+            words = piece.split()
+            while words and _fold(words[-1]).strip(" .,!?;:") in _TRAILING_WORDS:
+                words.pop()
+            pieces.extend(words)
+        words = " ".join(pieces).strip(" .,!?;:")
+        if words:
+            return f"Reunião {subject.group(1)} {words}"
+    return "Reunião"
+
+def route_message(text: str, now: datetime = None) -> dict:
+    """Reconhece pedidos diretos (agendar, tarefas, horários livres, agenda).
+
+    Devolve um dicionário com "intent", "confidence" e os campos extraídos,
+    ou None quando a mensagem deve ir para o Gemini.
+    """
+    now = now or datetime.now()
+    text = text.strip()
+    folded = _fold(text)
+    date, date_span = parse_date(folded, now)
+    masked = _mask(folded, date_span) if date_span else folded
+
+    penalty = 0.5 if _ADVICE.search(masked) else 0.0
+    if len(masked.split()) > 20:
+        penalty += 0.3
+
+    candidates = []
+    if _SCHEDULE_VERB.search(masked):
+        start, end, time_spans = parse_times(masked, folded)
+        for span in time_spans:
+            masked = _mask(masked, span)
+        duration, duration_span = parse_duration(masked)
+        if duration_span:
+            masked = _mask(masked, duration_span)
+        confidence = 0.5 + (0.2 if _MEETING_NOUN.search(masked) else 0) + (0.3 if start else -0.2) - (0 if date else 0.1)
+        if start:
+            day = date or now.date()
+            start_dt = datetime(day.year, day.month, day.day, *start)
+            if not date and start_dt < now:
+                # "marca às 9h" depois das 9h é para amanhã
+                start_dt += timedelta(days=1)
+            if end:
+                end_dt = start_dt.replace(hour=end[0], minute=end[1])
+            else:
+                end_dt = start_dt + timedelta(minutes=duration or DEFAULT_DURATION_MINUTES)
+            if end_dt <= start_dt:
+                confidence -= 0.5
+            candidates.append((confidence, {
+                "intent": "schedule",
+                "start": start_dt,
+                "end": end_dt,
+                "summary": _meeting_summary(text, masked)
+            }))
+        else:
+            candidates.append((confidence, {"intent": "schedule"}))
+
+    if _TASKS.search(masked) and not _TASKS_CHANGE.search(masked):
+        candidates.append((0.9 if _TASKS_LIST.search(masked) else 0.6, {"intent": "tasks"}))
+
+    if _FREE_TIME.search(masked):
+        candidates.append((0.9, {"intent": "free_time", "date": date}))
+
+    if _AGENDA.search(masked) or (_AGENDA_QUESTION.search(masked) and date):
+        candidates.append((0.9 if date or _AGENDA_QUESTION.search(masked) else 0.8, {"intent": "agenda", "date": date}))
+
+    if not candidates:
+        return None
+    confidence, intent = max(candidates, key=lambda candidate: candidate[0])
+    confidence = round(confidence - penalty, 2)
+    if confidence < MIN_CONFIDENCE:
+        return None
+    intent["confidence"] = confidence
+    return intent
@@ -0,0 +1,71 @@
+import os
+import time
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Tempo máximo que um board fica sem ser relido, mesmo sem webhook avisando mudança
+MONDAY_CACHE_TTL = float(os.getenv("MONDAY_CACHE_TTL", "300"))
+
+class MondayCache:
+    """Boards e itens do Monday.com em memória.
+
+    A lista de boards e os itens de cada board expiram após `ttl` segundos; um
+    webhook do board (invalidate) força a releitura só daquele board na próxima
+    consulta. Consultas simultâneas esperam a mesma atualização.
+    """
+
+    def __init__(self, ttl: float = MONDAY_CACHE_TTL):
+        self.ttl = ttl
+        self.refreshed_boards = 0
+        self._boards = None
+        self._boards_at = 0.0
+        self._items = {}
+        self._items_at = {}
+        self._dirty = set()
+        self._lock = asyncio.Lock()
+
+    def invalidate(self, board_id):
+        self._dirty.add(str(board_id))
+
+    def _stale(self, board_id: str, now: float) -> bool:
+        return board_id in self._dirty or now - self._items_at.get(board_id, float("-inf")) > self.ttl
+
+    async def snapshot(self, client, skip: set = frozenset(), columns=None) -> list:
+        # Boards com seus itens, relendo da API só o que expirou ou mudou
+        async with self._lock:
+            now = time.monotonic()
+            if self._boards is None or now - self._boards_at > self.ttl:
+                boards = {board["id"]: board for board in await client.fetch_boards() if board["name"] not in skip}
+                for board_id, board in boards.items():
+                    previous = (self._boards or {}).get(board_id)
+                    # Colunas novas ou renomeadas mudam o que precisa ser buscado nos itens
+                    if previous is not None and previous.get("columns") != board.get("columns"):
+                        self._dirty.add(board_id)
+                for board_id in set(self._items) - set(boards):
+                    self._items.pop(board_id, None)
+                    self._items_at.pop(board_id, None)
+                self._boards = boards
+                self._boards_at = now
+
+            stale = [board_id for board_id in self._boards if self._stale(board_id, now)]
+            if stale:
+                # Webhooks que chegarem durante a busca marcam o board de novo
+                self._dirty.difference_update(stale)
+                try:
+                    results = await asyncio.gather(*(
+                        client.fetch_items(board_id, columns(self._boards[board_id]) if columns else None) for board_id in stale
+                    ))
+                except BaseException:
+                    self._dirty.update(stale)
+                    raise
+                for board_id, items in zip(stale, results):
+                    self._items[board_id] = items
+                    self._items_at[board_id] = now
+                self.refreshed_boards += len(stale)
+                logger.info(f"Cache do Monday.com: {len(stale)} de {len(self._boards)} boards atualizados")
+
+            return [dict(board, items=self._items.get(board_id, [])) for board_id, board in self._boards.items()]
+
+monday_cache = MondayCache()
@@ -0,0 +1,231 @@
+import os
+import re
+import time
+import httpx
+import asyncio
+import logging
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+MONDAY_API_KEY = os.getenv("MONDAY_API_KEY")
+MONDAY_API_URL = "https://api.monday.com/v2"
+# A paginação por cursor (items_page/next_items_page) exige a API 2023-10 ou mais nova
+MONDAY_API_VERSION = os.getenv("MONDAY_API_VERSION", "2024-10")
+MONDAY_MAX_CONCURRENCY = int(os.getenv("MONDAY_MAX_CONCURRENCY", "4"))
+MONDAY_TIMEOUT = float(os.getenv("MONDAY_TIMEOUT", "30"))
+MONDAY_MAX_RETRIES = int(os.getenv("MONDAY_MAX_RETRIES", "3"))
+# Orçamento de complexidade por minuto da conta (10M para chaves pessoais)
+MONDAY_COMPLEXITY_BUDGET = int(os.getenv("MONDAY_COMPLEXITY_BUDGET", "10000000"))
+BOARDS_PAGE_SIZE = 100
+ITEMS_PAGE_SIZE = 500
+
+BOARDS_QUERY = """
+query ($page: Int!, $limit: Int!) {
+    complexity { before after query reset_in_x_seconds }
+    boards(limit: $limit, page: $page, state: active) {
+        id
+        name
+        columns { id title }
+    }
+}
+"""
+
+ITEMS_QUERY = """
+query ($boardId: ID!, $limit: Int!, $columnIds: [String!]) {
+    complexity { before after query reset_in_x_seconds }
+    boards(ids: [$boardId]) {
+        items_page(limit: $limit) {
+            cursor
+            items { id name column_values(ids: $columnIds) { id text } }
+        }
+    }
+}
+"""
+
+NEXT_ITEMS_QUERY = """
+query ($cursor: String!, $limit: Int!, $columnIds: [String!]) {
+    complexity { before after query reset_in_x_seconds }
+    next_items_page(limit: $limit, cursor: $cursor) {
+        cursor
+        items { id name column_values(ids: $columnIds) { id text } }
+    }
+}
+"""
+
+class MondayError(Exception):
+    pass
+
+class ComplexityBudget:
+    """Acompanha o orçamento de complexidade informado pelo Monday em cada resposta
+    e segura novas consultas quando o custo esperado não cabe no que resta."""
+
+    def __init__(self, budget: int = MONDAY_COMPLEXITY_BUDGET):
+        self.remaining = budget
+        self.reset_at = 0.0
+        self._costs = {}
+        self._reserved = 0
+        self._condition = asyncio.Condition()
+
+    def estimate(self, kind: str) -> int:
+        return self._costs.get(kind, 0)
+
+    async def reserve(self, kind: str) -> int:
+        cost = self.estimate(kind)
+        async with self._condition:
+            while self.remaining - self._reserved < cost and time.monotonic() < self.reset_at:
+                delay = self.reset_at - time.monotonic()
+                logger.info(f"Orçamento de complexidade do Monday quase no fim, aguardando {delay:.1f}s")
+                try:
+                    await asyncio.wait_for(self._condition.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+            self._reserved += cost
+        return cost
+
+    async def release(self, kind: str, reserved: int, complexity: dict = None):
+        async with self._condition:
+            self._reserved -= reserved
+            if complexity:
+                self._costs[kind] = max(self._costs.get(kind, 0), complexity.get("query") or 0)
+                self.remaining = complexity.get("after", self.remaining)
+                self.reset_at = time.monotonic() + (complexity.get("reset_in_x_seconds") or 60)
+            self._condition.notify_all()
+
+    async def exhausted(self, delay: float):
+        async with self._condition:
+            self.remaining = 0
+            self.reset_at = time.monotonic() + delay
+
+class MondayClient:
+    """Cliente assíncrono da API GraphQL do Monday.com.
+
+    Percorre os cursores de items_page, busca vários boards em paralelo (até
+    `max_concurrency` consultas de cada vez) e respeita o orçamento de complexidade.
+    """
+
+    def __init__(self, api_key: str = None, max_concurrency: int = MONDAY_MAX_CONCURRENCY):
+        self.api_key = api_key or MONDAY_API_KEY
+        self.budget = ComplexityBudget()
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._client = None
+
+    @property
+    def http(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                headers={
+                    "Authorization": self.api_key or "",
+                    "API-Version": MONDAY_API_VERSION,
+                    "Content-Type": "application/json"
+                },
+                timeout=MONDAY_TIMEOUT
+            )
+        return self._client
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def query(self, query: str, variables: dict = None, kind: str = None) -> dict:
+        if not self.api_key:
+            raise ValueError("MONDAY_API_KEY não está configurado no .env")
+        kind = kind or query
+        for attempt in range(MONDAY_MAX_RETRIES + 1):
+            reserved = await self.budget.reserve(kind)
+            complexity = None
+            try:
+                async with self._semaphore:
+                    response = await self.http.post(MONDAY_API_URL, json={"query": query, "variables": variables or {}})
+                retry_delay = self._retry_delay(response)
+                if retry_delay is None:
+                    response.raise_for_status()
+                    data = response.json()
+                    errors = data.get("errors") or ([{"message": data["error_message"]}] if data.get("error_message") else None)
+                    if errors:
+                        raise MondayError("; ".join(error.get("message", str(error)) for error in errors))
+                    complexity = data.get("data", {}).get("complexity")
+                    return data["data"]
+            finally:
+                await self.budget.release(kind, reserved, complexity)
+
+            if attempt == MONDAY_MAX_RETRIES:
+                break
+            logger.warning(f"Monday.com pediu para esperar {retry_delay:g}s (tentativa {attempt + 1})")
+            await self.budget.exhausted(retry_delay)
+        raise MondayError("Limite de complexidade do Monday.com esgotado")
+
+    def _retry_delay(self, response: httpx.Response):
+        # Limite de taxa (429) ou orçamento de complexidade esgotado: devolve quanto esperar
+        if response.status_code == 429:
+            return float(response.headers.get("Retry-After", "60"))
+        if response.status_code != 200:
+            return None
+        try:
+            data = response.json()
+        except ValueError:
+            return None
+        messages = [data.get("error_message") or ""] + [error.get("message", "") for error in data.get("errors") or []]
+        codes = [data.get("error_code") or ""] + [(error.get("extensions") or {}).get("code") or "" for error in data.get("errors") or []]
+        if not any("Complexity" in code or "complexity budget" in message.lower() for code, message in zip(codes, messages)):
+            return None
+        for message in messages:
+            match = re.search(r"reset in (\d+) seconds?", message)
+            if match:
+                return float(match.group(1)) + 1
+        for error in data.get("errors") or []:
+            retry_in = (error.get("extensions") or {}).get("retry_in_seconds")
+            if retry_in:
+                return float(retry_in) + 1
+        return 60.0
+
+    async def fetch_boards(self) -> list:
+        boards = []
+        page = 1
+        while True:
+            data = await self.query(BOARDS_QUERY, {"page": page, "limit": BOARDS_PAGE_SIZE}, kind="boards")
+            boards.extend(data.get("boards") or [])
+            if len(data.get("boards") or []) < BOARDS_PAGE_SIZE:
+                return boards
+            page += 1
+
+    async def fetch_items(self, board_id: str, column_ids: list = None) -> list:
+        # column_ids limita as colunas trazidas em cada item; None traz todas
+        data = await self.query(ITEMS_QUERY, {"boardId": board_id, "limit": ITEMS_PAGE_SIZE, "columnIds": column_ids}, kind="items")
+        pages = data.get("boards") or []
+        if not pages:
+            return []
+        page = pages[0].get("items_page") or {}
+        items = list(page.get("items") or [])
+        cursor = page.get("cursor")
+        while cursor:
+            data = await self.query(NEXT_ITEMS_QUERY, {"cursor": cursor, "limit": ITEMS_PAGE_SIZE, "columnIds": column_ids}, kind="next_items")
+            page = data.get("next_items_page") or {}
+            items.extend(page.get("items") or [])
+            cursor = page.get("cursor")
+        return items
+
+    async def fetch_all(self, skip: set = frozenset(), columns=None) -> list:
+        # Boards com todos os itens; os cursores de cada board andam em paralelo com os dos outros.
+        # columns(board) devolve os IDs de coluna a buscar naquele board
+        boards = [board for board in await self.fetch_boards() if board["name"] not in skip]
+        results = await asyncio.gather(*(
+            self.fetch_items(board["id"], columns(board) if columns else None) for board in boards
+        ))
+        for board, items in zip(boards, results):
+            board["items"] = items
+        return boards
+
+_monday_client = None
+
+def get_monday_client() -> MondayClient:
+    global _monday_client
+    if _monday_client is None:
+        _monday_client = MondayClient()
+    return _monday_client
+
+async def close_monday_client():
+    if _monday_client is not None:
+        await _monday_client.close()
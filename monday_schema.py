@@ -0,0 +1,41 @@
+from collections import namedtuple
+
+# Uma coluna exibida no resumo: rótulo, títulos aceitos no Monday e texto quando não há valor
+Field = namedtuple("Field", "label titles default")
+
+BOARD_SCHEMAS = {
+    "Sprints": [
+        Field("Cronograma", ("Timeline",), "Sem cronograma"),
+        Field("Meta", ("Goal", "Meta"), "Sem meta")
+    ],
+    "Épicos": [
+        Field("Responsável", ("Person", "Owner"), "Sem proprietário"),
+        Field("Fase", ("Phase", "Fase"), "Sem fase")
+    ],
+    "Retrospectivas": [
+        Field("Recorrente", ("Recurring", "Recorrente"), "Não especificado"),
+        Field("Tipo", ("Type", "Tipo"), "Sem tipo")
+    ]
+}
+DEFAULT_SCHEMA = [Field("Status", ("Status",), "Sem status")]
+IGNORED_BOARDS = {"Introdução"}
+
+def resolve_schema(board: dict) -> list:
+    # Troca os títulos pelos IDs das colunas do board: [(rótulo, id ou None, padrão)]
+    fields = BOARD_SCHEMAS.get(board["name"], DEFAULT_SCHEMA)
+    ids_by_title = {}
+    for column in board.get("columns") or []:
+        ids_by_title.setdefault(column["title"], column["id"])
+    resolved = []
+    for field in fields:
+        column_id = next((ids_by_title[title] for title in field.titles if title in ids_by_title), None)
+        resolved.append((field.label, column_id, field.default))
+    return resolved
+
+def column_ids(resolved: list) -> list:
+    return [column_id for _, column_id, _ in resolved if column_id]
+
+def render_item(item: dict, resolved: list) -> str:
+    values = {column["id"]: column["text"] for column in item.get("column_values") or []}
+    details = ", ".join(f"{label}: {values.get(column_id) or default}" for label, column_id, default in resolved)
+    return f"   - {item['name']} ({details})"
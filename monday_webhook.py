@@ -0,0 +1,61 @@
+import os
+import hmac
+import json
+import base64
+import hashlib
+import logging
+from webhook_server import WebhookServer
+from monday_cache import monday_cache
+
+logger = logging.getLogger(__name__)
+
+MONDAY_WEBHOOK_HOST = os.getenv("MONDAY_WEBHOOK_HOST", "0.0.0.0")
+MONDAY_WEBHOOK_PORT = os.getenv("MONDAY_WEBHOOK_PORT")
+MONDAY_WEBHOOK_PATH = os.getenv("MONDAY_WEBHOOK_PATH", "/monday/webhook")
+# Signing secret do app no Monday; sem ele o endpoint não sobe, já que qualquer um poderia invalidar o cache
+MONDAY_SIGNING_SECRET = os.getenv("MONDAY_SIGNING_SECRET")
+
+def _b64decode(segment: str) -> bytes:
+    return base64.urlsafe_b64decode(segment + "=" * (-len(segment) % 4))
+
+def verify_signature(authorization: str, secret: str) -> bool:
+    # O Monday assina os webhooks com um JWT HS256 no cabeçalho Authorization
+    try:
+        header, payload, signature = authorization.removeprefix("Bearer ").split(".")
+        if json.loads(_b64decode(header)).get("alg") != "HS256":
+            return False
+        expected = hmac.new(secret.encode(), f"{header}.{payload}".encode(), hashlib.sha256).digest()
+        return hmac.compare_digest(expected, _b64decode(signature))
+    except ValueError:
+        return False
+
+def monday_webhook_handler(invalidate=monday_cache.invalidate):
+    # `invalidate` recebe o id do board alterado; por padrão, o cache deste processo
+    async def handle(body: bytes, headers: dict) -> tuple:
+        payload = json.loads(body or b"{}")
+        # Ao cadastrar o webhook, o Monday manda um desafio que deve ser devolvido igual
+        if "challenge" in payload:
+            return 200, {"challenge": payload["challenge"]}
+
+        if not MONDAY_SIGNING_SECRET or not verify_signature(headers.get("authorization", ""), MONDAY_SIGNING_SECRET):
+            logger.warning("Webhook do Monday.com com assinatura inválida")
+            return 401, {"error": "Assinatura inválida"}
+
+        event = payload.get("event") or {}
+        board_id = event.get("boardId")
+        if board_id is None:
+            return 400, {"error": "Evento sem boardId"}
+        invalidate(board_id)
+        logger.info(f"Webhook do Monday.com: {event.get('type')} no board {board_id}")
+        return 200, {}
+    return handle
+
+async def start_monday_webhook(host: str = MONDAY_WEBHOOK_HOST, port: int = None, invalidate=monday_cache.invalidate) -> WebhookServer:
+    # Devolve None (e o /monday segue só com o TTL do cache) quando não há segredo configurado
+    if not MONDAY_SIGNING_SECRET:
+        logger.error("MONDAY_WEBHOOK_PORT definido sem MONDAY_SIGNING_SECRET: webhook do Monday.com não iniciado")
+        return None
+    port = port if port is not None else int(MONDAY_WEBHOOK_PORT)
+    server = WebhookServer(host, port, {MONDAY_WEBHOOK_PATH: monday_webhook_handler(invalidate)})
+    await server.start()
+    return server
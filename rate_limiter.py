@@ -0,0 +1,90 @@
+import time
+import heapq
+import asyncio
+import itertools
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Prioridades: quanto menor, antes sai da fila
+PRIORITY_ASK = 0
+PRIORITY_CHAT = 1
+PRIORITY_BACKGROUND = 2
+
+class Overloaded(Exception):
+    pass
+
+class PriorityRateLimiter:
+    """Token bucket compartilhado com fila de prioridade.
+
+    Cada chamada consome um token; os tokens voltam a uma taxa fixa, com até
+    `burst` acumulados. Quem não encontra token espera na fila por prioridade,
+    e a fila recusa novos pedidos (Overloaded) quando cheia ou quando a espera
+    passaria de `max_wait` segundos.
+    """
+
+    def __init__(self, rate_per_minute: float, burst: int, max_queue: int = 100, max_wait: float = 30):
+        self.rate = rate_per_minute / 60
+        self.burst = burst
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._waiters = []
+        self._counter = itertools.count()
+        self._dispatcher = None
+
+    def _refill(self, now: float):
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def share(self, parts: int):
+        # A cota da chave é dividida entre `parts` processos do bot
+        self.rate /= parts
+        self.burst = max(1, self.burst // parts)
+        self._tokens = min(self._tokens, float(self.burst))
+
+    def pause(self, delay: float):
+        # O servidor pediu para esperar (Retry-After): ninguém recebe token até lá
+        self._paused_until = max(self._paused_until, time.monotonic() + delay)
+        self._tokens = 0.0
+
+    async def acquire(self, priority: int = PRIORITY_CHAT):
+        now = time.monotonic()
+        self._refill(now)
+        if not self._waiters and now >= self._paused_until and self._tokens >= 1:
+            self._tokens -= 1
+            return
+
+        if len(self._waiters) >= self.max_queue:
+            raise Overloaded("Fila de requisições cheia")
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._counter), future))
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.create_task(self._dispatch())
+        try:
+            await asyncio.wait_for(future, self.max_wait)
+        except asyncio.TimeoutError:
+            raise Overloaded(f"Espera na fila passou de {self.max_wait:g}s")
+
+    async def _dispatch(self):
+        while self._waiters:
+            now = time.monotonic()
+            self._refill(now)
+            # Descarta quem desistiu (tempo esgotado ou cancelado)
+            while self._waiters and self._waiters[0][2].done():
+                heapq.heappop(self._waiters)
+            if not self._waiters:
+                break
+            if now < self._paused_until:
+                await asyncio.sleep(self._paused_until - now)
+                continue
+            if self._tokens >= 1:
+                self._tokens -= 1
+                heapq.heappop(self._waiters)[2].set_result(None)
+                continue
+            await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    def queue_depth(self) -> int:
+        return sum(1 for _, _, future in self._waiters if not future.done())
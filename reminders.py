@@ -0,0 +1,197 @@
+import os
+import time
+import heapq
+import asyncio
+import logging
+from datetime import datetime, date, time as day_time, timedelta
+from telegram.error import Forbidden, BadRequest, RetryAfter
+from telegram.ext import Application, ContextTypes
+from calendar_store import LOCAL_TZ, parse_event_time
+from task_store import task_store
+from telegram_streaming import MAX_MESSAGE_LENGTH
+
+logger = logging.getLogger(__name__)
+
+# Hora do dia do prazo em que a tarefa é lembrada
+TASK_REMINDER_HOUR = int(os.getenv("TASK_REMINDER_HOUR", "9"))
+# Antecedência do lembrete de reuniões marcadas pelo bot
+EVENT_REMINDER_MINUTES = int(os.getenv("EVENT_REMINDER_MINUTES", "10"))
+# Só os lembretes dentro desta janela ficam em memória; o resto espera no SQLite
+REMINDER_HORIZON = float(os.getenv("REMINDER_HORIZON_HOURS", "6")) * 3600
+# O Telegram aceita cerca de 30 mensagens por segundo no total
+REMINDER_BATCH_SIZE = int(os.getenv("REMINDER_BATCH_SIZE", "25"))
+REMINDER_BATCH_INTERVAL = 1.0
+
+class ReminderScheduler:
+    """Lembretes de prazos de tarefas e de reuniões.
+
+    Mantém um heap só com os lembretes das próximas REMINDER_HORIZON horas e
+    um único job no JobQueue, armado para o primeiro deles. Um job periódico
+    traz do banco a próxima janela, então memória e CPU não crescem com o
+    total de tarefas.
+    """
+
+    def __init__(self, store=task_store, horizon: float = REMINDER_HORIZON):
+        self.store = store
+        self.horizon = horizon
+        self.sent = 0
+        self._heap = []
+        # (tipo, id) -> vencimento atual; entradas do heap com outro vencimento estão obsoletas
+        self._scheduled = {}
+        self._loaded_until = 0.0
+        self._application = None
+        self._job = None
+        self._job_due = None
+        self._shard = None
+        self._batch_size = REMINDER_BATCH_SIZE
+
+    def start(self, application: Application, shard: tuple = None):
+        # Com vários processos, cada um lembra só os chats do seu shard (índice, total)
+        self._application = application
+        self._shard = shard
+        if shard is not None:
+            self._batch_size = max(1, REMINDER_BATCH_SIZE // shard[1])
+        # Recarrega na metade da janela para nunca deixar um lembrete de fora
+        application.job_queue.run_repeating(self._refill, interval=self.horizon / 2, first=1, name="reminders-refill")
+
+    def _push(self, due: float, kind: str, key, chat_id: int, text: str):
+        if self._scheduled.get((kind, key)) == due or due >= self._loaded_until:
+            return
+        if self._shard is not None and chat_id % self._shard[1] != self._shard[0]:
+            return
+        self._scheduled[(kind, key)] = due
+        heapq.heappush(self._heap, (due, kind, key, chat_id, text))
+        self._arm()
+
+    def _arm(self):
+        # Um job só, sempre no vencimento do topo do heap
+        if not self._heap or self._application is None:
+            return
+        due = self._heap[0][0]
+        if self._job is not None and self._job_due is not None and self._job_due <= due:
+            return
+        if self._job is not None:
+            self._job.schedule_removal()
+        self._job_due = due
+        self._job = self._application.job_queue.run_once(self._fire, when=max(0.0, due - time.time()), name="reminders")
+
+    @staticmethod
+    def task_due_at(deadline: date) -> float:
+        return datetime.combine(deadline, day_time(TASK_REMINDER_HOUR), tzinfo=LOCAL_TZ).timestamp()
+
+    def task_added(self, task_id: int, chat_id: int, description: str, deadline: date) -> bool:
+        # False quando o horário do lembrete já passou e a tarefa não será lembrada
+        due = self.task_due_at(deadline)
+        if due <= time.time():
+            return False
+        self._push(due, "task", task_id, chat_id, f"⏰ A tarefa \"{description}\" vence hoje ({deadline.strftime('%d/%m/%Y')}).")
+        return True
+
+    async def event_scheduled(self, chat_id: int, event_id: str, summary: str, start: datetime):
+        remind_at = (start - timedelta(minutes=EVENT_REMINDER_MINUTES)).timestamp()
+        if remind_at <= time.time():
+            return
+        reminder_id = await self.store.add_event_reminder(chat_id, event_id, summary, start.timestamp(), remind_at)
+        self._push(remind_at, "event", reminder_id, chat_id, self._event_text(summary, start.timestamp()))
+
+    async def event_changed(self, event_id: str, event: dict = None):
+        # Reunião cancelada ou reagendada pelo bot: o lembrete some ou acompanha o novo horário
+        reminders = await self.store.event_reminders_of(event_id)
+        if not reminders:
+            return
+        start = parse_event_time(event["start"]) if event is not None else None
+        remind_at = (start - timedelta(minutes=EVENT_REMINDER_MINUTES)).timestamp() if start is not None else 0.0
+        if remind_at <= time.time():
+            await self.store.remove_event_reminders(event_id)
+            for reminder in reminders:
+                self._scheduled.pop(("event", reminder["id"]), None)
+            return
+        await self.store.move_event_reminders(event_id, start.timestamp(), remind_at)
+        for reminder in reminders:
+            self._scheduled.pop(("event", reminder["id"]), None)
+            self._push(remind_at, "event", reminder["id"], reminder["chat_id"], self._event_text(reminder["summary"], start.timestamp()))
+
+    @staticmethod
+    def _event_text(summary: str, starts_at: float) -> str:
+        start = datetime.fromtimestamp(starts_at, LOCAL_TZ)
+        return f"📅 A reunião \"{summary}\" começa às {start.strftime('%H:%M')}."
+
+    async def _refill(self, context: ContextTypes.DEFAULT_TYPE):
+        now = time.time()
+        until = now + self.horizon
+        first_day = datetime.fromtimestamp(now, LOCAL_TZ).date()
+        last_day = datetime.fromtimestamp(until, LOCAL_TZ).date()
+        self._loaded_until = until
+        for task in await self.store.tasks_due(first_day.isoformat(), last_day.isoformat()):
+            deadline = date.fromisoformat(task["deadline"])
+            due = self.task_due_at(deadline)
+            if now <= due:
+                self._push(due, "task", task["id"], task["chat_id"], f"⏰ A tarefa \"{task['description']}\" vence hoje ({deadline.strftime('%d/%m/%Y')}).")
+        for reminder in await self.store.event_reminders_between(now, until):
+            self._push(reminder["remind_at"], "event", reminder["id"], reminder["chat_id"], self._event_text(reminder["summary"], reminder["starts_at"]))
+        await self.store.purge_event_reminders(now - 86400)
+        logger.info(f"Lembretes: {len(self._heap)} nas próximas {self.horizon / 3600:g}h")
+
+    async def _fire(self, context: ContextTypes.DEFAULT_TYPE):
+        self._job = None
+        self._job_due = None
+        now = time.time()
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            when, kind, key, chat_id, text = heapq.heappop(self._heap)
+            if self._scheduled.get((kind, key)) != when:
+                continue
+            del self._scheduled[(kind, key)]
+            due.append((when, kind, key, chat_id, text))
+        self._arm()
+
+        # Tarefas removidas depois de entrar no heap não são lembradas; reuniões canceladas ou
+        # reagendadas (talvez por outro processo) também não, e as reagendadas voltam ao heap
+        existing = await self.store.existing_ids([key for _, kind, key, _, _ in due if kind == "task"])
+        reminders = await self.store.event_reminders_by_id([key for _, kind, key, _, _ in due if kind == "event"])
+        by_chat = {}
+        for when, kind, key, chat_id, text in due:
+            if kind == "task" and key not in existing:
+                continue
+            if kind == "event":
+                reminder = reminders.get(key)
+                if reminder is None:
+                    continue
+                if reminder["remind_at"] != when:
+                    if reminder["remind_at"] > now:
+                        self._push(reminder["remind_at"], "event", key, chat_id, self._event_text(reminder["summary"], reminder["starts_at"]))
+                    continue
+            by_chat.setdefault(chat_id, []).append(text)
+
+        # Lembretes do mesmo chat vão juntos, respeitando o limite de tamanho da mensagem
+        messages = []
+        for chat_id, texts in by_chat.items():
+            current = ""
+            for text in texts:
+                if current and len(current) + len(text) + 1 > MAX_MESSAGE_LENGTH:
+                    messages.append((chat_id, current))
+                    current = ""
+                current = f"{current}\n{text}" if current else text
+            messages.append((chat_id, current))
+        await self._send_batches(context.bot, messages)
+
+    async def _send_batches(self, bot, messages: list):
+        # Uma mensagem por chat, em lotes de REMINDER_BATCH_SIZE por segundo (somando os processos)
+        for offset in range(0, len(messages), self._batch_size):
+            if offset:
+                await asyncio.sleep(REMINDER_BATCH_INTERVAL)
+            batch = messages[offset:offset + self._batch_size]
+            await asyncio.gather(*(self._send(bot, chat_id, text) for chat_id, text in batch))
+
+    async def _send(self, bot, chat_id: int, text: str):
+        try:
+            await bot.send_message(chat_id=chat_id, text=text)
+            self.sent += 1
+        except RetryAfter as e:
+            await asyncio.sleep(e.retry_after)
+            await self._send(bot, chat_id, text)
+        except (Forbidden, BadRequest) as e:
+            # Chat bloqueou o bot ou deixou de existir
+            logger.warning(f"Lembrete não entregue ao chat {chat_id}: {e}")
+
+reminder_scheduler = ReminderScheduler()
@@ -0,0 +1,137 @@
+import os
+import glob
+import json
+import time
+import asyncio
+import hashlib
+import logging
+import tempfile
+import unicodedata
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+def normalize_message(text: str) -> str:
+    # "Como organizo meu dia?" e "como organizo  meu dia" caem na mesma chave
+    decomposed = unicodedata.normalize("NFKD", text or "")
+    without_accents = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return " ".join(without_accents.casefold().split()).strip(" ?!.,;:")
+
+def cache_key(message: str, prompt: str, temperature: float) -> str:
+    prompt_hash = hashlib.sha256(prompt.encode()).hexdigest()[:16]
+    return f"{prompt_hash}:{temperature}:{normalize_message(message)}"
+
+class Abandoned(RuntimeError):
+    """A chamada em andamento terminou sem uma resposta para compartilhar."""
+
+class ResponseCache:
+    """Cache LRU com TTL para respostas do assistente.
+
+    Requisições idênticas simultâneas esperam pela mesma chamada em andamento
+    em vez de irem ao Gemini de novo.
+    """
+
+    def __init__(self, max_entries: int = 1000, ttl: float = 3600, path: str = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self._entries = OrderedDict()
+        self._inflight = {}
+
+    def get(self, key: str):
+        entry = self._entries.get(key)
+        if entry is None or entry[0] < time.time():
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, key: str, value: str):
+        self._entries[key] = (time.time() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def pending(self, key: str):
+        future = self._inflight.get(key)
+        if future is not None:
+            self.coalesced += 1
+        return future
+
+    def begin(self, key: str) -> asyncio.Future:
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        return future
+
+    def resolve(self, key: str, value: str):
+        self.put(key, value)
+        future = self._inflight.pop(key, None)
+        if future is not None and not future.done():
+            future.set_result(value)
+
+    def abandon(self, key: str, error: BaseException):
+        future = self._inflight.pop(key, None)
+        if future is not None and not future.done():
+            future.set_exception(error)
+            # Evita o aviso de exceção não lida quando ninguém estava esperando
+            future.exception()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hit_rate": self.hits / total if total else 0.0
+        }
+
+    def _files(self) -> list:
+        # O arquivo do processo único e os de cada worker do cluster
+        return [self.path] + sorted(glob.glob(f"{glob.escape(self.path)}.shard*[0-9]"))
+
+    def load(self):
+        if not self.path:
+            return
+        now = time.time()
+        entries = {}
+        for path in self._files():
+            if not os.path.exists(path):
+                continue
+            try:
+                with open(path, encoding="utf-8") as f:
+                    saved = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.error(f"Erro ao carregar cache de respostas de {path}: {e}")
+                continue
+            for key, expires_at, value in saved:
+                if expires_at > now and expires_at > entries.get(key, (0.0,))[0]:
+                    entries[key] = (expires_at, value)
+        # Os que vencem por último ficam no fim, como os mais recentes do LRU
+        for key, entry in sorted(entries.items(), key=lambda item: item[1][0])[-self.max_entries:]:
+            self._entries[key] = entry
+        logger.info(f"Cache de respostas carregado com {len(self._entries)} itens")
+
+    def save(self, shard: int = None):
+        # No cluster cada worker grava o seu arquivo; o load junta todos
+        if not self.path:
+            return
+        path = f"{self.path}.shard{shard}" if shard is not None else self.path
+        # Arquivo temporário próprio do processo, trocado pelo definitivo de uma vez
+        tmp = tempfile.NamedTemporaryFile(
+            "w", encoding="utf-8", dir=os.path.dirname(os.path.abspath(path)),
+            prefix=f"{os.path.basename(path)}.", suffix=".tmp", delete=False
+        )
+        try:
+            with tmp:
+                json.dump([[key, expires_at, value] for key, (expires_at, value) in self._entries.items()], tmp, ensure_ascii=False)
+            os.replace(tmp.name, path)
+        except BaseException:
+            os.unlink(tmp.name)
+            raise
@@ -1,29 +1,210 @@
-import os
-from google.oauth2 import service_account
-from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 from dotenv import load_dotenv
+import os
 import json
+import heapq
+import asyncio
 import logging
+import numpy as np
 from datetime import datetime, timedelta
+from calendar_client import get_calendar_client
+from calendar_store import get_event_store, parse_event_time, normalize_title, LOCAL_TZ
+from calendar_analytics import occupancy_report
+from slot_suggestions import day_bitset, rank_slots, WORK_START_HOUR, WORK_END_HOUR
+from availability import DEFAULT_WORK_DAYS
 
 logging.basicConfig(format='%(asctime)s - %(name)s - %(levelname)s - %(message)s', level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 load_dotenv()
 
+# Tempo máximo para carregar cada calendário nas consultas com vários calendários
+CALENDAR_FETCH_TIMEOUT = float(os.getenv("CALENDAR_FETCH_TIMEOUT", "10"))
+
+# Campos pedidos à API em cada consulta de eventos
+AGENDA_FIELDS = "items(id,etag,iCalUID,summary,start,end)"
+INTERVAL_FIELDS = "items(iCalUID,start,end)"
+START_FIELDS = "items(start)"
+LOOKUP_FIELDS = "items(id,etag,summary,start,end,attendees)"
+# Até quantos dias à frente o "sugerir" procura horários
+MAX_SUGGEST_DAYS = 60
+
+# Chamados a cada reunião alterada ou cancelada pelo bot, com o id e o evento novo (None se cancelada)
+_change_listeners = []
+
+def on_event_changed(listener):
+    _change_listeners.append(listener)
+
+async def _notify_change(event_id: str, event: dict = None):
+    for listener in _change_listeners:
+        try:
+            await listener(event_id, event)
+        except Exception as e:
+            logger.error(f"Erro ao propagar alteração do evento {event_id}: {e}")
+
+def _day_bounds(target_date: datetime) -> tuple:
+    day_start = target_date.replace(hour=0, minute=0, second=0, microsecond=0, tzinfo=LOCAL_TZ)
+    return day_start, day_start + timedelta(days=1)
+
+def _format_time(value: dict) -> str:
+    if "dateTime" not in value:
+        return "dia todo"
+    return parse_event_time(value).astimezone(LOCAL_TZ).strftime("%H:%M")
+
+async def _iter_events(calendar_id: str, time_min: datetime, time_max: datetime, fields: str, ordered: bool = True):
+    # Responde a partir do espelho local; só consulta a API para períodos anteriores à janela sincronizada,
+    # seguindo a paginação e baixando apenas os campos pedidos
+    store = get_event_store(calendar_id)
+    await store.refresh()
+    if store.covers(time_min):
+        for event in store.events_between(time_min, time_max):
+            yield event
+        return
+
+    async for event in get_calendar_client().iter_events(
+        calendar_id,
+        fields=fields,
+        timeMin=time_min.isoformat(),
+        timeMax=time_max.isoformat(),
+        singleEvents=True,
+        orderBy="startTime" if ordered else None
+    ):
+        yield event
+
+async def _gather_events(calendar_ids: list, time_min: datetime, time_max: datetime, fields: str) -> tuple:
+    # Carrega os calendários em paralelo, cada um com seu próprio tempo limite, e intercala as
+    # listas já ordenadas em uma única linha do tempo. Eventos compartilhados (mesmo iCalUID e
+    # início) aparecem uma vez só, com todos os calendários onde estão.
+    async def collect(calendar_id):
+        events = [event async for event in _iter_events(calendar_id, time_min, time_max, fields)]
+        return [(parse_event_time(event["start"]), index, calendar_id, event) for index, event in enumerate(events)]
+
+    results = await asyncio.gather(
+        *(asyncio.wait_for(collect(calendar_id), CALENDAR_FETCH_TIMEOUT) for calendar_id in calendar_ids),
+        return_exceptions=True
+    )
+
+    failures = {}
+    timelines = []
+    for calendar_id, result in zip(calendar_ids, results):
+        if isinstance(result, BaseException):
+            failures[calendar_id] = "tempo esgotado" if isinstance(result, asyncio.TimeoutError) else str(result)
+        else:
+            timelines.append(result)
+    if failures and not timelines:
+        raise RuntimeError("; ".join(f"{calendar_id}: {error}" for calendar_id, error in failures.items()))
+
+    merged = []
+    seen = {}
+    for start, _, calendar_id, event in heapq.merge(*timelines, key=lambda item: (item[0], item[1])):
+        key = (event.get("iCalUID") or event.get("id"), start)
+        if key in seen:
+            seen[key].append(calendar_id)
+            continue
+        seen[key] = [calendar_id]
+        merged.append((event, seen[key]))
+    return merged, failures
+
+def _failures_note(failures: dict) -> str:
+    if not failures:
+        return ""
+    return "\n⚠️ Não consegui carregar: " + ", ".join(f"{calendar_id} ({error})" for calendar_id, error in failures.items())
+
+async def _find_event(calendar_id: str, summary: str, date_str: str = None) -> tuple:
+    # Resolve o título pelo índice do espelho local; devolve (evento, erro)
+    store = get_event_store(calendar_id)
+    await store.refresh()
+    matches = store.find(summary)
+    if not matches:
+        # Reuniões anteriores à janela sincronizada não estão no índice
+        async for event in get_calendar_client().iter_events(calendar_id, fields=LOOKUP_FIELDS, q=summary):
+            if event.get("summary") == summary:
+                matches.append(event)
+
+    if date_str:
+        target_day = datetime.strptime(date_str, "%d/%m/%Y").date()
+        matches = [e for e in matches if parse_event_time(e["start"]).astimezone(LOCAL_TZ).date() == target_day]
+    else:
+        now = datetime.now(LOCAL_TZ)
+        upcoming = [e for e in matches if parse_event_time(e["end"]) > now]
+        matches = upcoming or matches
+
+    if not matches:
+        return None, f"Reunião \"{summary}\" não encontrada."
+    if len(matches) > 1:
+        options = "\n".join(
+            f"- {parse_event_time(e['start']).astimezone(LOCAL_TZ).strftime('%d/%m/%Y')} às {_format_time(e['start'])}"
+            for e in matches[:5]
+        )
+        return None, (
+            f"Há {len(matches)} reuniões chamadas \"{summary}\":\n{options}\n"
+            "Informe também a data (DD/MM/YYYY) da reunião desejada."
+        )
+    return matches[0], None
+
+async def _mutate(calendar_id: str, event: dict, make_request, delete: bool = False) -> dict:
+    # Envia direto o patch/delete com If-Match no etag conhecido; se o evento mudou desde a
+    # última sincronização (412), atualiza o espelho e tenta mais uma vez com a versão nova
+    client = get_calendar_client()
+    store = get_event_store(calendar_id)
+    for attempt in range(2):
+        request = make_request(event)
+        if event.get("etag"):
+            request.headers["If-Match"] = event["etag"]
+        try:
+            result = await client.run(request)
+        except HttpError as http_error:
+            if http_error.resp.status != 412 or attempt:
+                raise
+            await store.refresh(force=True)
+            event = store.get(event["id"])
+            if event is None:
+                raise ValueError("A reunião foi removida do calendário.")
+            continue
+        if delete:
+            store.discard(event["id"])
+        else:
+            store.apply(result)
+        await _notify_change(event["id"], None if delete else result)
+        return result
+
+async def _batch_mutate(calendar_id: str, events: list, make_request, delete: bool = False) -> str:
+    # Envia todas as alterações em requisições batch e monta o relatório item a item
+    client = get_calendar_client()
+    store = get_event_store(calendar_id)
+    requests = []
+    for event in events:
+        request = make_request(event)
+        if event.get("etag"):
+            request.headers["If-Match"] = event["etag"]
+        requests.append(request)
+
+    lines = []
+    for event, (result, exception) in zip(events, await client.run_batch(requests)):
+        label = f"{event.get('summary', '(sem título)')} ({_format_time(event['start'])})"
+        if exception is not None:
+            if isinstance(exception, HttpError) and exception.resp.status == 412:
+                lines.append(f"❌ {label}: alterada por outra pessoa, tente novamente")
+            else:
+                lines.append(f"❌ {label}: {exception}")
+            continue
+        if delete:
+            store.discard(event["id"])
+        else:
+            store.apply(result)
+        await _notify_change(event["id"], None if delete else result)
+        lines.append(f"✅ {label}")
+    return "\n".join(lines)
+
+def _select_events(events: list, summaries: list = None) -> list:
+    if not summaries:
+        return events
+    wanted = {normalize_title(summary) for summary in summaries}
+    return [event for event in events if normalize_title(event.get("summary")) in wanted]
+
 async def schedule_event(summary: str, start: dict, end: dict, calendar_id: str, attendees: list = None) -> dict:
     try:
-        google_credentials = os.getenv("GOOGLE_CREDENTIALS")
-        if not google_credentials:
-            raise ValueError("GOOGLE_CREDENTIALS não está configurado no .env")
-
-        credentials_dict = json.loads(google_credentials)
-        credentials = service_account.Credentials.from_service_account_info(
-            credentials_dict,
-            scopes=["https://www.googleapis.com/auth/calendar"]
-        )
-        service = build("calendar", "v3", credentials=credentials)
+        client = get_calendar_client()
 
         event = {
             "summary": summary,
@@ -34,8 +215,9 @@ async def schedule_event(summary: str, start: dict, end: dict, calendar_id: str,
             event["attendees"] = [{"email": attendee} for attendee in attendees]
 
         logger.info(f"Dados do evento a serem enviados para {calendar_id}: {json.dumps(event, indent=2)}")
-        event_result = service.events().insert(calendarId=calendar_id, body=event).execute()
+        event_result = await client.run(client.events().insert(calendarId=calendar_id, body=event))
         logger.info(f"Evento criado com sucesso: {event_result.get('id')}")
+        get_event_store(calendar_id).apply(event_result)
         return {
             "message": f"A reunião \"{summary}\" foi marcada para às {start['dateTime'].split('T')[1][:5]}. Indique os participantes.",
             "eventId": event_result.get("id")
@@ -47,46 +229,29 @@ async def schedule_event(summary: str, start: dict, end: dict, calendar_id: str,
         logger.error(f"Erro ao agendar evento no Google Calendar: {e}")
         return {"error": str(e) or "Falha ao agendar evento"}
 
-async def get_event(calendar_id: str, date_str: str = None) -> dict:
+async def get_event(calendar_ids, date_str: str = None) -> dict:
     try:
-        google_credentials = os.getenv("GOOGLE_CREDENTIALS")
-        if not google_credentials:
-            raise ValueError("GOOGLE_CREDENTIALS não está configurado no .env")
-
-        credentials_dict = json.loads(google_credentials)
-        credentials = service_account.Credentials.from_service_account_info(
-            credentials_dict,
-            scopes=["https://www.googleapis.com/auth/calendar"]
-        )
-        service = build("calendar", "v3", credentials=credentials)
-
+        if isinstance(calendar_ids, str):
+            calendar_ids = [calendar_ids]
         if date_str:
             target_date = datetime.strptime(date_str, "%d/%m/%Y")
         else:
             target_date = datetime.now()
 
-        time_min = target_date.replace(hour=0, minute=0, second=0, microsecond=0).isoformat() + "-03:00"
-        time_max = (target_date + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0).isoformat() + "-03:00"
-
-        events_result = service.events().list(
-            calendarId=calendar_id,
-            timeMin=time_min,
-            timeMax=time_max,
-            singleEvents=True,
-            orderBy="startTime"
-        ).execute()
-
-        events = events_result.get("items", [])
+        time_min, time_max = _day_bounds(target_date)
+        events, failures = await _gather_events(calendar_ids, time_min, time_max, AGENDA_FIELDS)
         if not events:
-            return {"message": f"Nenhum evento planejado para {target_date.strftime('%d/%m/%Y')}!"}
+            return {"message": f"Nenhum evento planejado para {target_date.strftime('%d/%m/%Y')}!{_failures_note(failures)}"}
 
         response = f"Eventos planejados para {target_date.strftime('%d/%m/%Y')}:\n\n"
-        for event in events:
-            start_time = datetime.fromisoformat(event['start']['dateTime'].replace("Z", "+00:00")).strftime("%H:%M")
-            end_time = datetime.fromisoformat(event['end']['dateTime'].replace("Z", "+00:00")).strftime("%H:%M")
-            response += f"- {event['summary']} ({start_time} - {end_time})\n"
-
-        logger.info(f"Eventos encontrados para {calendar_id} em {target_date.strftime('%d/%m/%Y')}")
+        for event, sources in events:
+            start_time = _format_time(event['start'])
+            end_time = _format_time(event['end'])
+            response += f"- {event.get('summary', '(sem título)')} ({start_time} - {end_time})"
+            response += f" [{', '.join(sources)}]\n" if len(calendar_ids) > 1 else "\n"
+        response += _failures_note(failures)
+
+        logger.info(f"Eventos encontrados para {', '.join(calendar_ids)} em {target_date.strftime('%d/%m/%Y')}")
         return {"message": response}
     except HttpError as http_error:
         logger.error(f"Erro HTTP ao buscar eventos: {http_error}")
@@ -95,94 +260,71 @@ async def get_event(calendar_id: str, date_str: str = None) -> dict:
         logger.error(f"Erro ao buscar eventos: {e}")
         return {"error": str(e)}
 
-async def add_participant(calendar_id: str, summary: str, participant: str) -> dict:
+async def add_participant(calendar_id: str, summary: str, participant: str, date_str: str = None) -> dict:
     try:
-        credentials_dict = json.loads(os.getenv("GOOGLE_CREDENTIALS"))
-        credentials = service_account.Credentials.from_service_account_info(
-            credentials_dict,
-            scopes=["https://www.googleapis.com/auth/calendar"]
-        )
-        service = build("calendar", "v3", credentials=credentials)
+        client = get_calendar_client()
 
-        events_result = service.events().list(calendarId=calendar_id, q=summary).execute()
-        event = next((e for e in events_result.get("items", []) if e["summary"] == summary), None)
-        if not event:
-            return {"error": f"Reunião \"{summary}\" não encontrada."}
+        event, error = await _find_event(calendar_id, summary, date_str)
+        if error:
+            return {"error": error}
 
-        event_id = event["id"]
-        attendees = event.get("attendees", [])
-        attendees.append({"email": participant})
-        updated_event = {"attendees": attendees}
+        def make_request(event):
+            attendees = event.get("attendees", []) + [{"email": participant}]
+            return client.events().patch(calendarId=calendar_id, eventId=event["id"], body={"attendees": attendees})
 
-        service.events().patch(calendarId=calendar_id, eventId=event_id, body=updated_event).execute()
+        await _mutate(calendar_id, event, make_request)
         return {"message": f"Os participantes foram adicionados à reunião \"{summary}\"."}
     except Exception as e:
         logger.error(f"Erro ao adicionar participante: {e}")
         return {"error": str(e)}
 
-async def remove_participant(calendar_id: str, summary: str, participant: str) -> dict:
+async def remove_participant(calendar_id: str, summary: str, participant: str, date_str: str = None) -> dict:
     try:
-        credentials_dict = json.loads(os.getenv("GOOGLE_CREDENTIALS"))
-        credentials = service_account.Credentials.from_service_account_info(
-            credentials_dict,
-            scopes=["https://www.googleapis.com/auth/calendar"]
-        )
-        service = build("calendar", "v3", credentials=credentials)
+        client = get_calendar_client()
 
-        events_result = service.events().list(calendarId=calendar_id, q=summary).execute()
-        event = next((e for e in events_result.get("items", []) if e["summary"] == summary), None)
-        if not event:
-            return {"error": f"Reunião \"{summary}\" não encontrada."}
+        event, error = await _find_event(calendar_id, summary, date_str)
+        if error:
+            return {"error": error}
 
-        event_id = event["id"]
-        attendees = event.get("attendees", [])
-        updated_attendees = [a for a in attendees if a["email"] != participant]
-        updated_event = {"attendees": updated_attendees}
+        def make_request(event):
+            attendees = [a for a in event.get("attendees", []) if a["email"] != participant]
+            return client.events().patch(calendarId=calendar_id, eventId=event["id"], body={"attendees": attendees})
 
-        service.events().patch(calendarId=calendar_id, eventId=event_id, body=updated_event).execute()
+        await _mutate(calendar_id, event, make_request)
         return {"message": f"O participante foi removido da reunião \"{summary}\"."}
     except Exception as e:
         logger.error(f"Erro ao remover participante: {e}")
         return {"error": str(e)}
 
-async def cancel_meeting(calendar_id: str, summary: str) -> dict:
+async def cancel_meeting(calendar_id: str, summary: str, date_str: str = None) -> dict:
     try:
-        credentials_dict = json.loads(os.getenv("GOOGLE_CREDENTIALS"))
-        credentials = service_account.Credentials.from_service_account_info(
-            credentials_dict,
-            scopes=["https://www.googleapis.com/auth/calendar"]
-        )
-        service = build("calendar", "v3", credentials=credentials)
+        client = get_calendar_client()
 
-        events_result = service.events().list(calendarId=calendar_id, q=summary).execute()
-        event = next((e for e in events_result.get("items", []) if e["summary"] == summary), None)
-        if not event:
-            return {"error": f"Reunião \"{summary}\" não encontrada."}
+        event, error = await _find_event(calendar_id, summary, date_str)
+        if error:
+            return {"error": error}
 
-        event_id = event["id"]
-        service.events().delete(calendarId=calendar_id, eventId=event_id).execute()
+        await _mutate(
+            calendar_id,
+            event,
+            lambda event: client.events().delete(calendarId=calendar_id, eventId=event["id"]),
+            delete=True
+        )
         return {"message": f"A reunião \"{summary}\" foi cancelada com sucesso."}
     except Exception as e:
         logger.error(f"Erro ao cancelar reunião: {e}")
         return {"error": str(e)}
 
-async def edit_meeting(calendar_id: str, summary: str, new_date: str, new_time: str) -> dict:
+async def edit_meeting(calendar_id: str, summary: str, new_date: str, new_time: str, date_str: str = None) -> dict:
     try:
-        credentials_dict = json.loads(os.getenv("GOOGLE_CREDENTIALS"))
-        credentials = service_account.Credentials.from_service_account_info(
-            credentials_dict,
-            scopes=["https://www.googleapis.com/auth/calendar"]
-        )
-        service = build("calendar", "v3", credentials=credentials)
+        client = get_calendar_client()
 
-        events_result = service.events().list(calendarId=calendar_id, q=summary).execute()
-        event = next((e for e in events_result.get("items", []) if e["summary"] == summary), None)
-        if not event:
-            return {"error": f"Reunião \"{summary}\" não encontrada."}
+        event, error = await _find_event(calendar_id, summary, date_str)
+        if error:
+            return {"error": error}
 
-        event_id = event["id"]
         new_dt = datetime.strptime(f"{new_date} {new_time}", "%d/%m/%Y %H:%M")
-        duration = datetime.fromisoformat(event['end']['dateTime'].replace("Z", "+00:00")) - datetime.fromisoformat(event['start']['dateTime'].replace("Z", "+00:00"))
+        duration = parse_event_time(event['end']) - parse_event_time(event['start'])
         new_end_dt = new_dt + duration
 
         updated_event = {
@@ -190,90 +332,105 @@ async def edit_meeting(calendar_id: str, summary: str, new_date: str, new_time:
             "end": {"dateTime": new_end_dt.isoformat() + "-03:00", "timeZone": "America/Sao_Paulo"}
         }
 
-        service.events().patch(calendarId=calendar_id, eventId=event_id, body=updated_event).execute()
+        await _mutate(
+            calendar_id,
+            event,
+            lambda event: client.events().patch(calendarId=calendar_id, eventId=event["id"], body=updated_event)
+        )
         return {"message": f"A reunião \"{summary}\" foi reagendada para {new_date} às {new_time}."}
     except Exception as e:
         logger.error(f"Erro ao editar reunião: {e}")
         return {"error": str(e)}
 
-async def get_free_time(calendar_id: str, date_str: str = None) -> dict:
+async def get_free_time(calendar_ids, date_str: str = None) -> dict:
     try:
-        credentials_dict = json.loads(os.getenv("GOOGLE_CREDENTIALS"))
-        credentials = service_account.Credentials.from_service_account_info(
-            credentials_dict,
-            scopes=["https://www.googleapis.com/auth/calendar"]
-        )
-        service = build("calendar", "v3", credentials=credentials)
-
+        if isinstance(calendar_ids, str):
+            calendar_ids = [calendar_ids]
         target_date = datetime.strptime(date_str, "%d/%m/%Y") if date_str else datetime.now() + timedelta(days=1)  # Amanhã por padrão
-        time_min = target_date.replace(hour=0, minute=0, second=0, microsecond=0).isoformat() + "-03:00"
-        time_max = (target_date + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0).isoformat() + "-03:00"
-
-        events_result = service.events().list(
-            calendarId=calendar_id,
-            timeMin=time_min,
-            timeMax=time_max,
-            singleEvents=True,
-            orderBy="startTime"
-        ).execute()
-
-        events = events_result.get("items", [])
+        time_min, time_max = _day_bounds(target_date)
+
+        # Com vários calendários, só conta como livre o horário livre em todos eles
+        events, failures = await _gather_events(calendar_ids, time_min, time_max, INTERVAL_FIELDS)
         busy_times = []
-        for event in events:
-            start = datetime.fromisoformat(event['start']['dateTime'].replace("Z", "+00:00"))
-            end = datetime.fromisoformat(event['end']['dateTime'].replace("Z", "+00:00"))
+        for event, _ in events:
+            start = parse_event_time(event['start'])
+            end = parse_event_time(event['end'])
             busy_times.append((start, end))
 
         # Horário de trabalho padrão: 08:00 às 18:00
-        day_start = target_date.replace(hour=8, minute=0)
-        day_end = target_date.replace(hour=18, minute=0)
+        day_start = time_min.replace(hour=8)
+        day_end = time_min.replace(hour=18)
         free_times = []
         current_time = day_start
 
         for start, end in sorted(busy_times, key=lambda x: x[0]):
-            if current_time < start:
-                free_times.append((current_time, start))
+            if current_time < min(start, day_end):
+                free_times.append((current_time, min(start, day_end)))
             current_time = max(current_time, end)
 
         if current_time < day_end:
             free_times.append((current_time, day_end))
 
         if not free_times:
-            return {"message": f"Nenhum horário livre em {target_date.strftime('%d/%m/%Y')} entre 08:00 e 18:00!"}
+            return {"message": f"Nenhum horário livre em {target_date.strftime('%d/%m/%Y')} entre 08:00 e 18:00!{_failures_note(failures)}"}
 
         response = f"Horários Livres em {target_date.strftime('%d/%m/%Y')}:\n"
         for start, end in free_times:
-            response += f"{start.strftime('%H:%M')} às {end.strftime('%H:%M')}\n"
+            response += f"{start.astimezone(LOCAL_TZ).strftime('%H:%M')} às {end.astimezone(LOCAL_TZ).strftime('%H:%M')}\n"
+        response += _failures_note(failures)
         return {"message": response}
     except Exception as e:
         logger.error(f"Erro ao buscar horários livres: {e}")
         return {"error": str(e)}
 
-async def get_busy_days(calendar_id: str, month: str = None) -> dict:
+async def suggest_slots(calendar_id: str, duration_minutes: int, days: int = 14, limit: int = 3) -> dict:
+    if duration_minutes <= 0:
+        return {"error": "A duração da reunião deve ser maior que zero."}
+    if duration_minutes > (WORK_END_HOUR - WORK_START_HOUR) * 60:
+        return {"error": f"A duração da reunião deve caber no expediente ({WORK_START_HOUR}h às {WORK_END_HOUR}h)."}
+    if not 0 < days <= MAX_SUGGEST_DAYS:
+        return {"error": f"O número de dias deve estar entre 1 e {MAX_SUGGEST_DAYS}."}
     try:
-        credentials_dict = json.loads(os.getenv("GOOGLE_CREDENTIALS"))
-        credentials = service_account.Credentials.from_service_account_info(
-            credentials_dict,
-            scopes=["https://www.googleapis.com/auth/calendar"]
-        )
-        service = build("calendar", "v3", credentials=credentials)
+        now = datetime.now(LOCAL_TZ)
+        time_min, _ = _day_bounds(now)
+        time_max = time_min + timedelta(days=days)
+
+        intervals = {}
+        async for event in _iter_events(calendar_id, time_min, time_max, INTERVAL_FIELDS, ordered=False):
+            start = parse_event_time(event["start"])
+            end = parse_event_time(event["end"])
+            day = max(start, time_min).astimezone(LOCAL_TZ).date()
+            # Eventos que atravessam a meia-noite ocupam todos os dias que tocam
+            while day < end.astimezone(LOCAL_TZ).date() + timedelta(days=1) and (day - time_min.date()).days < days:
+                intervals.setdefault(day, []).append((start, end))
+                day += timedelta(days=1)
+
+        bitsets = []
+        for offset in range(days):
+            day_start = time_min + timedelta(days=offset)
+            # Fins de semana (fora de DEFAULT_WORK_DAYS) não entram nas sugestões
+            if day_start.weekday() not in DEFAULT_WORK_DAYS:
+                continue
+            bitsets.append((day_start, day_bitset(intervals.get(day_start.date(), []), day_start)))
+
+        slots = rank_slots(bitsets, duration_minutes, limit, not_before=now)
+        if not slots:
+            return {"error": f"Nenhum horário livre de {duration_minutes} min nos próximos {days} dias."}
+        return {"slots": slots}
+    except Exception as e:
+        logger.error(f"Erro ao sugerir horários: {e}")
+        return {"error": str(e)}
 
+async def get_busy_days(calendar_id: str, month: str = None) -> dict:
+    try:
         now = datetime.now()
         target_month = datetime.strptime(month, "%m/%Y") if month else now.replace(day=1)
-        time_min = target_month.replace(day=1, hour=0, minute=0, second=0, microsecond=0).isoformat() + "-03:00"
-        time_max = (target_month.replace(day=1) + timedelta(days=31)).replace(hour=0, minute=0, second=0, microsecond=0).isoformat() + "-03:00"
-
-        events_result = service.events().list(
-            calendarId=calendar_id,
-            timeMin=time_min,
-            timeMax=time_max,
-            singleEvents=True
-        ).execute()
+        time_min, _ = _day_bounds(target_month.replace(day=1))
+        time_max = time_min + timedelta(days=31)
 
-        events = events_result.get("items", [])
         day_counts = {}
-        for event in events:
-            start = datetime.fromisoformat(event['start']['dateTime'].replace("Z", "+00:00"))
+        async for event in _iter_events(calendar_id, time_min, time_max, START_FIELDS, ordered=False):
+            start = parse_event_time(event['start']).astimezone(LOCAL_TZ)
             day_key = start.strftime("%d/%m")
             day_counts[day_key] = day_counts.get(day_key, 0) + 1
 
@@ -290,37 +447,84 @@ async def get_busy_days(calendar_id: str, month: str = None) -> dict:
         logger.error(f"Erro ao buscar dias ocupados: {e}")
         return {"error": str(e)}
 
-async def clear_calendar(calendar_id: str, date_str: str = None) -> dict:
+async def get_occupancy_analytics(calendar_id: str, start_str: str, end_str: str) -> dict:
     try:
-        credentials_dict = json.loads(os.getenv("GOOGLE_CREDENTIALS"))
-        credentials = service_account.Credentials.from_service_account_info(
-            credentials_dict,
-            scopes=["https://www.googleapis.com/auth/calendar"]
-        )
-        service = build("calendar", "v3", credentials=credentials)
+        time_min, _ = _day_bounds(datetime.strptime(start_str, "%d/%m/%Y"))
+        _, time_max = _day_bounds(datetime.strptime(end_str, "%d/%m/%Y"))
+        days = (time_max - time_min).days
+        if days <= 0:
+            return {"error": "A data final deve ser igual ou posterior à inicial."}
+
+        starts = []
+        ends = []
+        async for event in _iter_events(calendar_id, time_min, time_max, INTERVAL_FIELDS, ordered=False):
+            # Eventos de dia inteiro não contam como tempo em reunião
+            if "dateTime" in event["start"]:
+                starts.append(parse_event_time(event["start"]).timestamp())
+                ends.append(parse_event_time(event["end"]).timestamp())
+
+        if not starts:
+            return {"message": f"Nenhum evento entre {start_str} e {end_str}!"}
+        return {"message": occupancy_report(np.array(starts), np.array(ends), time_min, days)}
+    except Exception as e:
+        logger.error(f"Erro ao analisar ocupação: {e}")
+        return {"error": str(e)}
 
+async def clear_calendar(calendar_id: str, date_str: str = None, confirm: bool = False, summaries: list = None) -> dict:
+    try:
         target_date = datetime.strptime(date_str, "%d/%m/%Y") if date_str else datetime.now()
-        time_min = target_date.replace(hour=0, minute=0, second=0, microsecond=0).isoformat() + "-03:00"
-        time_max = (target_date + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0).isoformat() + "-03:00"
-
-        events_result = service.events().list(
-            calendarId=calendar_id,
-            timeMin=time_min,
-            timeMax=time_max,
-            singleEvents=True,
-            orderBy="startTime"
-        ).execute()
-
-        events = events_result.get("items", [])
+        time_min, time_max = _day_bounds(target_date)
+
+        events = [event async for event in _iter_events(calendar_id, time_min, time_max, AGENDA_FIELDS)]
+        events = _select_events(events, summaries)
         if not events:
             return {"message": f"Nenhum evento para cancelar em {target_date.strftime('%d/%m/%Y')}!"}
 
+        if confirm:
+            client = get_calendar_client()
+            report = await _batch_mutate(
+                calendar_id,
+                events,
+                lambda event: client.events().delete(calendarId=calendar_id, eventId=event["id"]),
+                delete=True
+            )
+            return {"message": f"🗑️ Cancelamento das reuniões de {target_date.strftime('%d/%m/%Y')}:\n{report}"}
+
         response = f"🗑️ Cancelar Todas as Reuniões de {target_date.strftime('%d/%m/%Y')}:\n"
         for event in events:
-            start_time = datetime.fromisoformat(event['start']['dateTime'].replace("Z", "+00:00")).strftime("%H:%M")
-            response += f"{event['summary']} ({start_time})\n"
-        response += "Use /cancelmeeting <título> para confirmar."
+            start_time = _format_time(event['start'])
+            response += f"{event.get('summary', '(sem título)')} ({start_time})\n"
+        response += (
+            f"Use /clearcalendar {target_date.strftime('%d/%m/%Y')} confirmar para cancelar todas, "
+            "ou acrescente os títulos separados por vírgula para cancelar só algumas."
+        )
         return {"message": response}
     except Exception as e:
         logger.error(f"Erro ao listar eventos para cancelamento: {e}")
-        return {"error": str(e)}
\ No newline at end of file
+        return {"error": str(e)}
+
+async def shift_meetings(calendar_id: str, date_str: str, offset: timedelta, summaries: list = None) -> dict:
+    try:
+        target_date = datetime.strptime(date_str, "%d/%m/%Y")
+        time_min, time_max = _day_bounds(target_date)
+
+        events = [event async for event in _iter_events(calendar_id, time_min, time_max, AGENDA_FIELDS)]
+        # Eventos de dia inteiro não são deslocados
+        events = [event for event in _select_events(events, summaries) if "dateTime" in event["start"]]
+        if not events:
+            return {"message": f"Nenhuma reunião para reagendar em {target_date.strftime('%d/%m/%Y')}!"}
+
+        client = get_calendar_client()
+
+        def make_request(event):
+            updated_event = {
+                "start": {"dateTime": (parse_event_time(event["start"]) + offset).isoformat(), "timeZone": "America/Sao_Paulo"},
+                "end": {"dateTime": (parse_event_time(event["end"]) + offset).isoformat(), "timeZone": "America/Sao_Paulo"}
+            }
+            return client.events().patch(calendarId=calendar_id, eventId=event["id"], body=updated_event)
+
+        report = await _batch_mutate(calendar_id, events, make_request)
+        return {"message": f"📆 Reagendamento das reuniões de {target_date.strftime('%d/%m/%Y')}:\n{report}"}
+    except Exception as e:
+        logger.error(f"Erro ao reagendar reuniões: {e}")
+        return {"error": str(e)}
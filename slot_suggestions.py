@@ -0,0 +1,63 @@
+from datetime import datetime, timedelta
+
+SLOT_MINUTES = 15
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES
+WORK_START_HOUR = 8
+WORK_END_HOUR = 18
+# Folga desejada antes e depois de cada reunião
+BUFFER_SLOTS = 1
+# Blocos livres a partir deste tamanho contam como tempo de foco
+FOCUS_SLOTS = 8
+
+WORK_MASK = ((1 << ((WORK_END_HOUR - WORK_START_HOUR) * 60 // SLOT_MINUTES)) - 1) << (WORK_START_HOUR * 60 // SLOT_MINUTES)
+DAY_MASK = (1 << SLOTS_PER_DAY) - 1
+
+def day_bitset(intervals: list, day_start: datetime) -> int:
+    # Um bit por slot de SLOT_MINUTES do dia; bit ligado = ocupado
+    occupied = 0
+    for start, end in intervals:
+        first = max(0, int((start - day_start).total_seconds() // (SLOT_MINUTES * 60)))
+        last = min(SLOTS_PER_DAY, -int(-(end - day_start).total_seconds() // (SLOT_MINUTES * 60)))
+        if last > first:
+            occupied |= ((1 << (last - first)) - 1) << first
+    return occupied
+
+def _focus_starts(free: int) -> int:
+    # Bits onde começa uma sequência livre de pelo menos FOCUS_SLOTS slots
+    runs = free
+    for _ in range(FOCUS_SLOTS - 1):
+        runs &= runs >> 1
+    return runs
+
+def rank_slots(days: list, duration_minutes: int, limit: int = 3, not_before: datetime = None) -> list:
+    # days: lista de (início do dia, bitset de ocupação). Devolve os melhores (início, fim).
+    if duration_minutes <= 0:
+        raise ValueError("A duração da reunião deve ser maior que zero.")
+    length = -(-duration_minutes // SLOT_MINUTES)
+    meeting = (1 << length) - 1
+    buffer = (1 << (length + 2 * BUFFER_SLOTS)) - 1
+    candidates = []
+    for day_index, (day_start, occupied) in enumerate(days):
+        free = ~occupied & WORK_MASK
+        focus_before = bin(_focus_starts(free)).count("1")
+        for slot in range(SLOTS_PER_DAY - length + 1):
+            mask = meeting << slot
+            if mask & ~free:
+                continue
+            start = day_start + timedelta(minutes=slot * SLOT_MINUTES)
+            if not_before and start < not_before:
+                continue
+            surroundings = (buffer << slot >> BUFFER_SLOTS) & DAY_MASK & ~mask
+            back_to_back = bin(occupied & surroundings).count("1")
+            focus_lost = focus_before - bin(_focus_starts(free & ~mask)).count("1")
+            score = 4 * back_to_back + focus_lost + day_index + (0 if slot % (60 // SLOT_MINUTES) == 0 else 1)
+            candidates.append((score, start))
+
+    best = []
+    for score, start in sorted(candidates, key=lambda candidate: (candidate[0], candidate[1])):
+        # Evita sugerir horários quase iguais
+        if all(abs(start - other) >= timedelta(minutes=duration_minutes) for other, _ in best):
+            best.append((start, start + timedelta(minutes=duration_minutes)))
+        if len(best) == limit:
+            break
+    return best
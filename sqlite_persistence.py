@@ -0,0 +1,331 @@
+import os
+import json
+import time
+import pickle
+import sqlite3
+import asyncio
+import hashlib
+import logging
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from telegram.ext import BasePersistence, PersistenceInput
+
+logger = logging.getLogger(__name__)
+
+# Banco compartilhado por todos os processos do bot (estados das conversas e user_data)
+STATE_DB_PATH = os.getenv("STATE_DB_PATH", "state.db")
+# De quanto em quanto tempo os estados e o user_data/chat_data alterados são gravados
+STATE_FLUSH_INTERVAL = float(os.getenv("STATE_FLUSH_INTERVAL", "1"))
+# Usuários e chats sem updates há este tempo (segundos) saem da memória e são relidos do banco se voltarem
+STATE_IDLE_SECONDS = float(os.getenv("STATE_IDLE_SECONDS", "3600"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS user_data (
+    user_id INTEGER PRIMARY KEY,
+    data BLOB NOT NULL,
+    version INTEGER NOT NULL DEFAULT 1
+);
+CREATE TABLE IF NOT EXISTS chat_data (
+    chat_id INTEGER PRIMARY KEY,
+    data BLOB NOT NULL,
+    version INTEGER NOT NULL DEFAULT 1
+);
+CREATE TABLE IF NOT EXISTS conversations (
+    name TEXT NOT NULL,
+    key TEXT NOT NULL,
+    state BLOB NOT NULL,
+    PRIMARY KEY (name, key)
+);
+"""
+
+# (gravação, remoção) de cada tipo de dado; os parâmetros são a chave seguida do blob
+STATEMENTS = {
+    "user": (
+        "INSERT OR REPLACE INTO user_data (user_id, data) VALUES (?, ?)",
+        "DELETE FROM user_data WHERE user_id = ?"
+    ),
+    "chat": (
+        "INSERT OR REPLACE INTO chat_data (chat_id, data) VALUES (?, ?)",
+        "DELETE FROM chat_data WHERE chat_id = ?"
+    ),
+    "conversation": (
+        "INSERT OR REPLACE INTO conversations (name, key, state) VALUES (?, ?, ?)",
+        "DELETE FROM conversations WHERE name = ? AND key = ?"
+    )
+}
+# Gravação condicionada à versão lida (a linha ainda não existe, ou ainda está na versão
+# conhecida); se outro processo gravou antes, nada muda. Parâmetros: blob, chave e versão
+SWAPS = {
+    "user": (
+        "INSERT OR IGNORE INTO user_data (data, user_id) VALUES (?, ?)",
+        "UPDATE user_data SET data = ?, version = version + 1 WHERE user_id = ? AND version = ?"
+    ),
+    "chat": (
+        "INSERT OR IGNORE INTO chat_data (data, chat_id) VALUES (?, ?)",
+        "UPDATE chat_data SET data = ?, version = version + 1 WHERE chat_id = ? AND version = ?"
+    )
+}
+# Versão atual da linha, e o blob só se ela for diferente da informada
+LOAD = {
+    "user": "SELECT version, CASE WHEN version = ? THEN NULL ELSE data END FROM user_data WHERE user_id = ?",
+    "chat": "SELECT version, CASE WHEN version = ? THEN NULL ELSE data END FROM chat_data WHERE chat_id = ?"
+}
+
+def _digest(blob: bytes) -> bytes:
+    return hashlib.blake2b(blob, digest_size=16).digest() if blob is not None else None
+
+class SQLitePersistence(BasePersistence):
+    """Persistência do Application em SQLite (modo WAL), segura entre processos.
+
+    Guarda os estados dos ConversationHandler persistentes, o user_data e o
+    chat_data (pickle); bot_data e callback_data não são usados pelo bot.
+
+    Na inicialização só os estados das conversas em andamento são lidos; o
+    user_data/chat_data de cada usuário e chat é carregado no primeiro update
+    dele. A cada STATE_FLUSH_INTERVAL segundos o Application entrega o que foi
+    usado; só o que de fato mudou é gravado, tudo numa transação.
+
+    Um usuário em dois chats é atendido por dois workers do cluster, então cada
+    linha tem uma versão: a cada update a versão é conferida e a linha relida se
+    outro processo gravou, e a gravação só vale se a versão não mudou desde a
+    leitura. Se mudou, a gravação é descartada e o dado é relido no próximo update.
+    """
+
+    def __init__(self, path: str = STATE_DB_PATH, update_interval: float = STATE_FLUSH_INTERVAL, idle_seconds: float = STATE_IDLE_SECONDS):
+        super().__init__(store_data=PersistenceInput(bot_data=False, callback_data=False), update_interval=update_interval)
+        self.path = path
+        self.idle_seconds = idle_seconds
+        self.writes = 0
+        self.conflicts = 0
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="state-store")
+        self._connection = None
+        # (tipo, id) já carregado -> (digest do que está no banco, versão da linha; 0 se não há linha)
+        self._stored = {}
+        # (tipo, id) -> último update, do mais antigo para o mais recente
+        self._used = OrderedDict()
+        # Conexão da thread do loop, só para conferir a versão de linhas já carregadas
+        self._watch = None
+        # (tipo, id) -> gravações ainda não confirmadas; enquanto houver, a cópia em memória é a mais nova
+        self._writing = {}
+        self._pending = {}
+        self._flush_handle = None
+        self._commits = set()
+
+    def _conn(self) -> sqlite3.Connection:
+        # Só chamado na thread do executor
+        if self._connection is None:
+            self._connection = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("PRAGMA synchronous=NORMAL")
+            self._connection.executescript(SCHEMA)
+            for table in ("user_data", "chat_data"):
+                columns = {row[1] for row in self._connection.execute(f"PRAGMA table_info({table})")}
+                if "version" not in columns:
+                    # Banco criado antes das versões
+                    self._connection.execute(f"ALTER TABLE {table} ADD COLUMN version INTEGER NOT NULL DEFAULT 1")
+        return self._connection
+
+    def _check(self, sql: str, params: tuple) -> list:
+        # Consulta pontual pela chave primária, direto na thread do loop: passar pelo executor
+        # custaria mais que a própria leitura, e no modo WAL ela não espera por gravações
+        if self._watch is None:
+            self._watch = sqlite3.connect(self.path, isolation_level=None)
+        return self._watch.execute(sql, params).fetchall()
+
+    async def _read(self, sql: str, params: tuple = ()) -> list:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, lambda: self._conn().execute(sql, params).fetchall())
+
+    def _commit(self, batch: dict) -> list:
+        # Devolve as chaves cuja gravação condicionada não valeu
+        groups = {}
+        swaps = []
+        for (kind, *key), (blob, version) in batch.items():
+            upsert, delete = STATEMENTS[kind]
+            if version is not None:
+                insert, update = SWAPS[kind]
+                swaps.append(((kind, *key), insert, (blob, *key)) if not version else ((kind, *key), update, (blob, *key, version)))
+            elif blob is None:
+                groups.setdefault(delete, []).append(tuple(key))
+            else:
+                groups.setdefault(upsert, []).append((*key, blob))
+        connection = self._conn()
+        conflicts = []
+        connection.execute("BEGIN")
+        try:
+            for sql, rows in groups.items():
+                connection.executemany(sql, rows)
+            for key, sql, params in swaps:
+                if connection.execute(sql, params).rowcount == 0:
+                    conflicts.append(key)
+            connection.execute("COMMIT")
+        except sqlite3.Error:
+            connection.execute("ROLLBACK")
+            raise
+        return conflicts
+
+    def _stage(self, key: tuple, blob: bytes, version: int = None):
+        # version: versão da linha em que a gravação se baseia; None grava sem conferir
+        if key in self._pending:
+            version = self._pending[key][1] if version is not None else None
+        else:
+            self._writing[key] = self._writing.get(key, 0) + 1
+        self._pending[key] = (blob, version)
+        # As chamadas de uma mesma rodada do Application chegam juntas e vão na mesma transação
+        if self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_soon(self._flush)
+
+    def _flush(self):
+        self._flush_handle = None
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, {}
+        self.writes += len(batch)
+        commit = asyncio.get_running_loop().run_in_executor(self._executor, self._commit, batch)
+        self._commits.add(commit)
+        commit.add_done_callback(lambda done: self._committed(batch, done))
+
+    def _committed(self, batch: dict, commit: asyncio.Future):
+        self._commits.discard(commit)
+        for key in batch:
+            if self._writing.get(key, 0) > 1:
+                self._writing[key] -= 1
+            else:
+                self._writing.pop(key, None)
+        if commit.cancelled():
+            return
+        if commit.exception() is not None:
+            logger.error(f"Erro ao gravar o estado das conversas: {commit.exception()}")
+            # O que não foi gravado é relido do banco no próximo update
+            conflicts = [key for key, (_, version) in batch.items() if version is not None]
+        else:
+            conflicts = commit.result()
+            if conflicts:
+                self.conflicts += len(conflicts)
+                logger.warning(f"{len(conflicts)} gravações de user_data/chat_data descartadas: outro processo gravou antes")
+        for key in conflicts:
+            self._forget(key)
+
+    def _forget(self, key: tuple):
+        self._stored.pop(key, None)
+        self._used.pop(key, None)
+
+    def _touch(self, key: tuple):
+        # Tira da memória os que ficaram parados, do mais antigo para o mais recente
+        now = time.monotonic()
+        while self._used:
+            oldest, used = next(iter(self._used.items()))
+            if oldest == key or now - used < self.idle_seconds:
+                break
+            self._forget(oldest)
+        self._used[key] = now
+        self._used.move_to_end(key)
+
+    async def _hydrate(self, kind: str, key: int, data: dict):
+        # Nossa gravação ainda não confirmada é mais nova que o banco
+        if self._writing.get((kind, key)):
+            self._touch((kind, key))
+            return
+        known = self._stored.get((kind, key))
+        if known is not None:
+            # Já carregado: só a versão, e o blob se outro processo gravou
+            rows = self._check(LOAD[kind], (known[1], key))
+        else:
+            rows = await self._read(LOAD[kind], (-1, key))
+        # Outro update do mesmo usuário carregou ou gravou enquanto líamos
+        if self._stored.get((kind, key)) is not known or self._writing.get((kind, key)):
+            return
+        version, blob = rows[0] if rows else (0, None)
+        if known is None or version != known[1]:
+            data.clear()
+            if blob is not None:
+                data.update(pickle.loads(blob))
+            self._stored[(kind, key)] = (_digest(blob), version)
+        self._touch((kind, key))
+
+    def _update(self, kind: str, key: int, data: dict):
+        # Nunca carregado: o bot não teve acesso ao que está no banco, então nada mudou
+        known = self._stored.get((kind, key))
+        if known is None:
+            return
+        digest, version = known
+        # Sem linha no banco e nada a guardar
+        if not data and not version:
+            return
+        blob = pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL)
+        new_digest = _digest(blob)
+        if new_digest == digest:
+            return
+        self._stored[(kind, key)] = (new_digest, version + 1)
+        self._stage((kind, key), blob, version)
+
+    def _drop(self, kind: str, key: int):
+        self._stored[(kind, key)] = (None, 0)
+        self._stage((kind, key), None)
+
+    async def get_user_data(self) -> dict:
+        # Carregado por usuário, no primeiro update (refresh_user_data)
+        return {}
+
+    async def get_chat_data(self) -> dict:
+        return {}
+
+    async def get_bot_data(self) -> dict:
+        return {}
+
+    async def get_callback_data(self):
+        return None
+
+    async def get_conversations(self, name: str) -> dict:
+        # Só as conversas em andamento ficam no banco, então esta leitura é pequena
+        rows = await self._read("SELECT key, state FROM conversations WHERE name = ?", (name,))
+        return {tuple(json.loads(key)): pickle.loads(state) for key, state in rows}
+
+    async def update_conversation(self, name: str, key: tuple, new_state) -> None:
+        # Conversa encerrada (estado None) não precisa ocupar espaço
+        blob = pickle.dumps(new_state, protocol=pickle.HIGHEST_PROTOCOL) if new_state is not None else None
+        self._stage(("conversation", name, json.dumps(key)), blob)
+
+    async def update_user_data(self, user_id: int, data: dict) -> None:
+        self._update("user", user_id, data)
+
+    async def update_chat_data(self, chat_id: int, data: dict) -> None:
+        self._update("chat", chat_id, data)
+
+    async def update_bot_data(self, data) -> None:
+        pass
+
+    async def update_callback_data(self, data) -> None:
+        pass
+
+    async def drop_user_data(self, user_id: int) -> None:
+        self._drop("user", user_id)
+
+    async def drop_chat_data(self, chat_id: int) -> None:
+        self._drop("chat", chat_id)
+
+    async def refresh_user_data(self, user_id: int, user_data: dict) -> None:
+        await self._hydrate("user", user_id, user_data)
+
+    async def refresh_chat_data(self, chat_id: int, chat_data: dict) -> None:
+        await self._hydrate("chat", chat_id, chat_data)
+
+    async def refresh_bot_data(self, bot_data) -> None:
+        pass
+
+    async def flush(self) -> None:
+        # Chamado pelo Application ao parar, depois da última rodada de gravação
+        self._flush()
+        if self._commits:
+            await asyncio.gather(*self._commits, return_exceptions=True)
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._executor, self._close)
+        self._executor.shutdown(wait=False)
+        if self._watch is not None:
+            self._watch.close()
+            self._watch = None
+
+    def _close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
@@ -0,0 +1,210 @@
+import os
+import time
+import sqlite3
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+TASKS_DB_PATH = os.getenv("TASKS_DB_PATH", "tasks.db")
+# Escritas que chegam dentro desta janela vão juntas na mesma transação
+TASKS_BATCH_DELAY = float(os.getenv("TASKS_BATCH_DELAY", "0.05"))
+TASKS_BATCH_SIZE = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY,
+    chat_id INTEGER NOT NULL,
+    description TEXT NOT NULL,
+    deadline TEXT NOT NULL,
+    responsible TEXT,
+    priority TEXT NOT NULL DEFAULT 'Normal',
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_tasks_chat_description ON tasks (chat_id, description);
+CREATE INDEX IF NOT EXISTS idx_tasks_chat_deadline ON tasks (chat_id, deadline);
+CREATE INDEX IF NOT EXISTS idx_tasks_chat_priority ON tasks (chat_id, priority);
+CREATE INDEX IF NOT EXISTS idx_tasks_deadline ON tasks (deadline);
+CREATE TABLE IF NOT EXISTS event_reminders (
+    id INTEGER PRIMARY KEY,
+    chat_id INTEGER NOT NULL,
+    event_id TEXT,
+    summary TEXT NOT NULL,
+    starts_at REAL NOT NULL,
+    remind_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_event_reminders_remind_at ON event_reminders (remind_at);
+CREATE INDEX IF NOT EXISTS idx_event_reminders_event ON event_reminders (event_id);
+"""
+
+TASK_COLUMNS = ("id", "chat_id", "description", "deadline", "responsible", "priority")
+REMINDER_COLUMNS = ("id", "chat_id", "event_id", "summary", "starts_at", "remind_at")
+
+class TaskStore:
+    """Tarefas de cada chat em SQLite (modo WAL).
+
+    A conexão vive numa única thread; as escritas são agrupadas em lotes de uma
+    transação só e as leituras entram na fila depois delas, então sempre veem o
+    que já foi escrito.
+    """
+
+    def __init__(self, path: str = TASKS_DB_PATH, batch_delay: float = TASKS_BATCH_DELAY, batch_size: int = TASKS_BATCH_SIZE):
+        self.path = path
+        self.batch_delay = batch_delay
+        self.batch_size = batch_size
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="task-store")
+        self._connection = None
+        self._pending = []
+        self._flush_handle = None
+        self._flushing = set()
+
+    def _conn(self) -> sqlite3.Connection:
+        # Só chamado na thread do executor
+        if self._connection is None:
+            self._connection = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("PRAGMA synchronous=NORMAL")
+            self._connection.executescript(SCHEMA)
+        return self._connection
+
+    def _commit(self, batch: list) -> list:
+        connection = self._conn()
+        results = []
+        connection.execute("BEGIN")
+        try:
+            for sql, params, _ in batch:
+                try:
+                    cursor = connection.execute(sql, params)
+                    results.append((cursor.lastrowid if sql.startswith("INSERT") else cursor.rowcount, None))
+                except sqlite3.Error as e:
+                    results.append((None, e))
+            connection.execute("COMMIT")
+        except sqlite3.Error as e:
+            connection.execute("ROLLBACK")
+            return [(None, e)] * len(batch)
+        return results
+
+    async def _apply(self, batch: list, committed: asyncio.Future):
+        try:
+            results = await committed
+        except Exception as e:
+            results = [(None, e)] * len(batch)
+        for (_, _, future), (result, error) in zip(batch, results):
+            if future.done():
+                continue
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+    def _flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, []
+        # Entra na fila da thread já, antes de qualquer leitura feita depois
+        committed = asyncio.get_running_loop().run_in_executor(self._executor, self._commit, batch)
+        task = asyncio.ensure_future(self._apply(batch, committed))
+        self._flushing.add(task)
+        task.add_done_callback(self._flushing.discard)
+
+    def _write(self, sql: str, params: tuple) -> asyncio.Future:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((sql, params, future))
+        if len(self._pending) >= self.batch_size:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.batch_delay, self._flush)
+        return future
+
+    async def _read(self, sql: str, params: tuple) -> list:
+        # Escritas pendentes entram na fila da thread antes da leitura
+        self._flush()
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, lambda: self._conn().execute(sql, params).fetchall())
+
+    async def add(self, chat_id: int, description: str, deadline: str, responsible: str, priority: str = "Normal") -> int:
+        # deadline em ISO (AAAA-MM-DD) para ordenar e comparar direto no índice
+        return await self._write(
+            "INSERT INTO tasks (chat_id, description, deadline, responsible, priority, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+            (chat_id, description, deadline, responsible, priority, time.time())
+        )
+
+    async def remove(self, chat_id: int, description: str) -> int:
+        return await self._write("DELETE FROM tasks WHERE chat_id = ? AND description = ?", (chat_id, description))
+
+    async def set_priority(self, chat_id: int, description: str, priority: str) -> int:
+        return await self._write("UPDATE tasks SET priority = ? WHERE chat_id = ? AND description = ?", (priority, chat_id, description))
+
+    async def list_tasks(self, chat_id: int, limit: int = 100) -> list:
+        rows = await self._read(
+            f"SELECT {', '.join(TASK_COLUMNS)} FROM tasks WHERE chat_id = ? ORDER BY deadline, id LIMIT ?",
+            (chat_id, limit)
+        )
+        return [dict(zip(TASK_COLUMNS, row)) for row in rows]
+
+    async def count(self, chat_id: int) -> int:
+        rows = await self._read("SELECT COUNT(*) FROM tasks WHERE chat_id = ?", (chat_id,))
+        return rows[0][0]
+
+    async def tasks_due(self, first_day: str, last_day: str) -> list:
+        # Tarefas de todos os chats com prazo entre as duas datas (ISO), pelo índice de prazo
+        rows = await self._read(
+            f"SELECT {', '.join(TASK_COLUMNS)} FROM tasks WHERE deadline BETWEEN ? AND ?",
+            (first_day, last_day)
+        )
+        return [dict(zip(TASK_COLUMNS, row)) for row in rows]
+
+    async def existing_ids(self, ids: list) -> set:
+        if not ids:
+            return set()
+        rows = await self._read(f"SELECT id FROM tasks WHERE id IN ({', '.join('?' * len(ids))})", tuple(ids))
+        return {row[0] for row in rows}
+
+    async def add_event_reminder(self, chat_id: int, event_id: str, summary: str, starts_at: float, remind_at: float) -> int:
+        return await self._write(
+            "INSERT INTO event_reminders (chat_id, event_id, summary, starts_at, remind_at) VALUES (?, ?, ?, ?, ?)",
+            (chat_id, event_id, summary, starts_at, remind_at)
+        )
+
+    async def event_reminders_between(self, start: float, end: float) -> list:
+        rows = await self._read(
+            f"SELECT {', '.join(REMINDER_COLUMNS)} FROM event_reminders WHERE remind_at >= ? AND remind_at < ?",
+            (start, end)
+        )
+        return [dict(zip(REMINDER_COLUMNS, row)) for row in rows]
+
+    async def event_reminders_by_id(self, ids: list) -> dict:
+        if not ids:
+            return {}
+        rows = await self._read(f"SELECT {', '.join(REMINDER_COLUMNS)} FROM event_reminders WHERE id IN ({', '.join('?' * len(ids))})", tuple(ids))
+        return {row[0]: dict(zip(REMINDER_COLUMNS, row)) for row in rows}
+
+    async def event_reminders_of(self, event_id: str) -> list:
+        rows = await self._read(f"SELECT {', '.join(REMINDER_COLUMNS)} FROM event_reminders WHERE event_id = ?", (event_id,))
+        return [dict(zip(REMINDER_COLUMNS, row)) for row in rows]
+
+    async def move_event_reminders(self, event_id: str, starts_at: float, remind_at: float) -> int:
+        return await self._write("UPDATE event_reminders SET starts_at = ?, remind_at = ? WHERE event_id = ?", (starts_at, remind_at, event_id))
+
+    async def remove_event_reminders(self, event_id: str) -> int:
+        return await self._write("DELETE FROM event_reminders WHERE event_id = ?", (event_id,))
+
+    async def purge_event_reminders(self, before: float) -> int:
+        return await self._write("DELETE FROM event_reminders WHERE remind_at < ?", (before,))
+
+    async def close(self):
+        self._flush()
+        if self._flushing:
+            await asyncio.gather(*self._flushing, return_exceptions=True)
+        loop = asyncio.get_running_loop()
+        if self._connection is not None:
+            await loop.run_in_executor(self._executor, self._connection.close)
+            self._connection = None
+        self._executor.shutdown(wait=True)
+
+task_store = TaskStore()
@@ -0,0 +1,105 @@
+import os
+import time
+import asyncio
+import logging
+from telegram import Message
+from telegram.error import BadRequest, RetryAfter
+
+logger = logging.getLogger(__name__)
+
+# O Telegram tolera cerca de uma edição por segundo em cada chat
+EDIT_INTERVAL = float(os.getenv("STREAM_EDIT_INTERVAL", "1.5"))
+MAX_MESSAGE_LENGTH = 4096
+
+def split_message(text: str, limit: int = MAX_MESSAGE_LENGTH) -> list:
+    # Quebra o texto em mensagens de até `limit` caracteres, nas quebras de linha
+    chunks = []
+    current = ""
+    for line in text.split("\n"):
+        while len(line) > limit:
+            # Linha maior que uma mensagem inteira: corta no limite
+            if current:
+                chunks.append(current)
+                current = ""
+            chunks.append(line[:limit])
+            line = line[limit:]
+        if current and len(current) + len(line) + 1 > limit:
+            chunks.append(current)
+            current = line
+        else:
+            current = f"{current}\n{line}" if current else line
+    if current.strip():
+        chunks.append(current)
+    return chunks
+
+class ProgressiveReply:
+    """Resposta que aparece aos poucos: a primeira mensagem sai com os primeiros
+    tokens e depois é editada no máximo a cada EDIT_INTERVAL segundos."""
+
+    def __init__(self, reply_to: Message, edit_interval: float = EDIT_INTERVAL):
+        self._reply_to = reply_to
+        self._edit_interval = edit_interval
+        self._message = None
+        self._text = ""
+        self._sent_text = ""
+        self._next_edit = 0.0
+
+    @property
+    def text(self) -> str:
+        return self._text
+
+    async def append(self, chunk: str):
+        self._text += chunk
+        await self._close_full_messages()
+        if self._message is None:
+            if self._text.strip():
+                await self._send_new()
+            return
+        await self._edit()
+
+    async def finish(self):
+        await self._close_full_messages()
+        if self._message is None:
+            if self._text.strip():
+                await self._send_new()
+            return
+        await self._edit(force=True)
+
+    async def _close_full_messages(self):
+        # Texto maior que uma mensagem (uma resposta do cache chega inteira de uma vez):
+        # fecha a mensagem atual com o que cabe, cortando numa quebra de linha, e continua
+        # o resto em novas mensagens até sobrar menos que o limite
+        while len(self._text.strip()) > MAX_MESSAGE_LENGTH:
+            head = split_message(self._text)[0]
+            rest = self._text[self._text.index(head) + len(head):]
+            self._text = head
+            if self._message is None:
+                await self._send_new()
+            else:
+                await self._edit(force=True)
+            self._text = rest
+            self._message = None
+
+    async def _send_new(self):
+        self._message = await self._reply_to.reply_text(self._text.strip())
+        self._sent_text = self._text
+        self._next_edit = time.monotonic() + self._edit_interval
+
+    async def _edit(self, force: bool = False):
+        if self._text == self._sent_text or (not force and time.monotonic() < self._next_edit):
+            return
+        try:
+            await self._message.edit_text(self._text.strip())
+            self._sent_text = self._text
+            self._next_edit = time.monotonic() + self._edit_interval
+        except RetryAfter as e:
+            logger.warning(f"Limite de edições do Telegram atingido, aguardando {e.retry_after}s")
+            self._next_edit = time.monotonic() + e.retry_after
+            if force:
+                # A última edição não pode ser perdida: envia o restante depois da espera
+                await asyncio.sleep(e.retry_after)
+                await self._message.edit_text(self._text.strip())
+                self._sent_text = self._text
+        except BadRequest as e:
+            if "not modified" not in str(e).lower():
+                raise
@@ -0,0 +1,100 @@
+import os
+import hmac
+import json
+import signal
+import asyncio
+import secrets
+import logging
+from contextlib import asynccontextmanager
+from telegram import Update
+from telegram.ext import Application, CallbackQueryHandler, CommandHandler, ConversationHandler, MessageHandler
+from webhook_server import WebhookServer
+
+logger = logging.getLogger(__name__)
+
+# URL pública que o Telegram vai chamar (ex.: https://bot.exemplo.com/telegram); sem ela o bot usa polling
+TELEGRAM_WEBHOOK_URL = os.getenv("TELEGRAM_WEBHOOK_URL")
+TELEGRAM_WEBHOOK_HOST = os.getenv("TELEGRAM_WEBHOOK_HOST", "0.0.0.0")
+TELEGRAM_WEBHOOK_PORT = int(os.getenv("TELEGRAM_WEBHOOK_PORT", "8443"))
+TELEGRAM_WEBHOOK_PATH = os.getenv("TELEGRAM_WEBHOOK_PATH", "/telegram")
+# Sem segredo fixo, um novo é gerado a cada início e registrado junto com o webhook
+TELEGRAM_WEBHOOK_SECRET = os.getenv("TELEGRAM_WEBHOOK_SECRET")
+TELEGRAM_WEBHOOK_MAX_CONNECTIONS = int(os.getenv("TELEGRAM_WEBHOOK_MAX_CONNECTIONS", "40"))
+SECRET_HEADER = "x-telegram-bot-api-secret-token"
+
+def used_update_types(application: Application) -> list:
+    # Tipos de update que algum handler registrado trata; o Telegram não envia os demais
+    types = set()
+
+    def visit(handler):
+        if isinstance(handler, ConversationHandler):
+            for child in handler.entry_points + handler.fallbacks:
+                visit(child)
+            for children in handler.states.values():
+                for child in children:
+                    visit(child)
+        elif isinstance(handler, CallbackQueryHandler):
+            types.add(Update.CALLBACK_QUERY)
+        elif isinstance(handler, (CommandHandler, MessageHandler)):
+            types.add(Update.MESSAGE)
+
+    for handlers in application.handlers.values():
+        for handler in handlers:
+            visit(handler)
+    return sorted(types)
+
+def webhook_handler(application: Application, secret_token: str):
+    async def handle(body: bytes, headers: dict) -> tuple:
+        if not hmac.compare_digest(headers.get(SECRET_HEADER, ""), secret_token):
+            logger.warning("Webhook do Telegram com segredo inválido")
+            return 403, {"error": "Segredo inválido"}
+        update = Update.de_json(json.loads(body), application.bot)
+        if update is None:
+            return 400, {"error": "Update vazio"}
+        # Responde na hora; o update segue pela mesma fila usada no polling
+        await application.update_queue.put(update)
+        return 200, {}
+    return handle
+
+async def register_webhook(bot, url: str, allowed_updates: list, secret_token: str):
+    await bot.set_webhook(
+        url=url,
+        allowed_updates=allowed_updates,
+        secret_token=secret_token,
+        max_connections=TELEGRAM_WEBHOOK_MAX_CONNECTIONS
+    )
+    logger.info(f"Webhook registrado em {url} para {', '.join(allowed_updates)}")
+
+@asynccontextmanager
+async def running(application: Application):
+    # Ciclo de vida do Application sem o Updater, com os mesmos hooks do run_polling
+    await application.initialize()
+    try:
+        if application.post_init:
+            await application.post_init(application)
+        await application.start()
+        yield application
+    finally:
+        if application.running:
+            await application.stop()
+        if application.post_stop:
+            await application.post_stop(application)
+        await application.shutdown()
+        if application.post_shutdown:
+            await application.post_shutdown(application)
+
+async def run_webhook(application: Application, url: str = TELEGRAM_WEBHOOK_URL, host: str = TELEGRAM_WEBHOOK_HOST, port: int = TELEGRAM_WEBHOOK_PORT):
+    secret_token = TELEGRAM_WEBHOOK_SECRET or secrets.token_urlsafe(32)
+    server = WebhookServer(host, port, {TELEGRAM_WEBHOOK_PATH: webhook_handler(application, secret_token)})
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, stop.set)
+
+    async with running(application):
+        try:
+            await server.start()
+            await register_webhook(application.bot, url, used_update_types(application), secret_token)
+            await stop.wait()
+        finally:
+            await server.stop()
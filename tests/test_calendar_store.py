@@ -0,0 +1,52 @@
+import asyncio
+from datetime import datetime
+import calendar_store
+import schedule_calendar
+
+class SlowClient:
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.syncs = 0
+
+    async def iter_event_pages(self, calendar_id, **params):
+        self.syncs += 1
+        await asyncio.sleep(self.delay)
+        # Meio-dia de hoje, dentro do dia consultado
+        noon = datetime.now().replace(hour=12, minute=0, second=0, microsecond=0, tzinfo=calendar_store.LOCAL_TZ)
+        event = {"id": "1", "summary": "Planejamento", "start": {"dateTime": noon.isoformat()}, "end": {"dateTime": noon.replace(hour=13).isoformat()}}
+        yield {"items": [event], "nextSyncToken": "token"}
+
+def test_slow_full_sync_survives_the_query_timeout(monkeypatch):
+    client = SlowClient(0.3)
+    monkeypatch.setattr(calendar_store, "get_calendar_client", lambda: client)
+    monkeypatch.setattr(calendar_store, "_stores", {})
+    monkeypatch.setattr(schedule_calendar, "CALENDAR_FETCH_TIMEOUT", 0.1)
+
+    async def scenario():
+        day_start, day_end = schedule_calendar._day_bounds(datetime.now())
+        results = []
+        for _ in range(3):
+            try:
+                events, failures = await schedule_calendar._gather_events(["sala@empresa.com"], day_start, day_end, "")
+                results.append(len(events))
+            except RuntimeError:
+                results.append("erro")
+            await asyncio.sleep(0.15)
+        return results
+
+    results = asyncio.run(scenario())
+    assert results[0] == "erro"
+    assert results[-1] == 1
+    assert client.syncs == 1
+
+def test_concurrent_refreshes_share_one_sync(monkeypatch):
+    client = SlowClient(0.05)
+    monkeypatch.setattr(calendar_store, "get_calendar_client", lambda: client)
+    store = calendar_store.EventStore("sala@empresa.com")
+
+    async def scenario():
+        await asyncio.gather(*(store.refresh() for _ in range(5)))
+
+    asyncio.run(scenario())
+    assert client.syncs == 1
+    assert store.get("1")["summary"] == "Planejamento"
@@ -0,0 +1,64 @@
+import asyncio
+import functools
+from cluster import Cluster, chat_key, shard_of, receive
+
+def message_update(update_id: int, chat_id: int, user_id: int = 1) -> dict:
+    return {
+        "update_id": update_id,
+        "message": {"message_id": 1, "date": 0, "chat": {"id": chat_id, "type": "group"}, "from": {"id": user_id, "is_bot": False, "first_name": "A"}, "text": "oi"}
+    }
+
+def test_chat_key_reads_message_callback_and_sender():
+    assert chat_key(message_update(1, -100123)) == -100123
+    callback = {"update_id": 2, "callback_query": {"id": "1", "from": {"id": 7}, "message": {"chat": {"id": -55}}}}
+    assert chat_key(callback) == -55
+    inline = {"update_id": 3, "inline_query": {"id": "1", "from": {"id": 9}, "query": ""}}
+    assert chat_key(inline) == 9
+    assert chat_key({"update_id": 4}) is None
+
+def test_shard_of_is_in_range_for_negative_group_ids():
+    for chat_id in (-1, -4, -100123456789, -1001987654321):
+        for count in (1, 2, 3, 4, 7):
+            shard = shard_of(message_update(1, chat_id), count)
+            assert 0 <= shard < count
+            assert shard == chat_id % count
+
+def test_shard_of_is_stable_for_the_same_chat():
+    shards = {shard_of(message_update(n, -100777), 4) for n in range(50)}
+    assert len(shards) == 1
+
+def record_worker(log_path: str, index: int, count: int, connection):
+    with open(f"{log_path}.{index}", "a") as log:
+        while True:
+            try:
+                messages = receive(connection)
+            except EOFError:
+                return
+            for kind, payload in messages:
+                if kind == "stop":
+                    return
+                log.write(f"{payload['update_id']} {payload['message']['chat']['id']}\n")
+                log.flush()
+
+def test_updates_of_a_chat_reach_one_worker_in_order(tmp_path):
+    log_path = str(tmp_path / "log")
+    cluster = Cluster(3, target=functools.partial(record_worker, log_path))
+    cluster.start()
+    chats = [-100001, -100002, -3, 4, 5]
+    for update_id in range(100):
+        cluster.route(message_update(update_id, chats[update_id % len(chats)]))
+    asyncio.run(cluster.stop())
+
+    seen = {}
+    for index in range(3):
+        try:
+            lines = open(f"{log_path}.{index}").read().split()
+        except FileNotFoundError:
+            continue
+        for update_id, chat_id in zip(lines[::2], lines[1::2]):
+            seen.setdefault(int(chat_id), []).append((index, int(update_id)))
+    assert sorted(seen) == sorted(chats)
+    for chat_id, entries in seen.items():
+        assert {index for index, _ in entries} == {chat_id % 3}
+        ids = [update_id for _, update_id in entries]
+        assert ids == sorted(ids) and len(ids) == 20
@@ -0,0 +1,45 @@
+from datetime import datetime
+import pytest
+from intent_router import route_message
+
+# Segunda-feira, 8h
+NOW = datetime(2025, 3, 10, 8, 0)
+
+@pytest.mark.parametrize("text, start, end, summary", [
+    ("marca reunião de 2 horas amanhã às 10h com equipe", (11, 10, 0), (11, 12, 0), "Reunião com equipe"),
+    ("marca reunião de 1 hora amanhã às 14h com o cliente", (11, 14, 0), (11, 15, 0), "Reunião com o cliente"),
+    ("agenda call de 2h amanhã às 9h com a diretoria", (11, 9, 0), (11, 11, 0), "Reunião com a diretoria"),
+    ("marca reunião de 2 horas às 10h com equipe", (10, 10, 0), (10, 12, 0), "Reunião com equipe"),
+    ("marca reunião com o time por 30 min amanhã às 9h", (11, 9, 0), (11, 9, 30), "Reunião com o time"),
+    ("marca reunião das 14h às 15h amanhã com o time", (11, 14, 0), (11, 15, 0), "Reunião com o time"),
+    ("marca reunião amanhã de 10h às 11h com o time", (11, 10, 0), (11, 11, 0), "Reunião com o time"),
+    ("marca reunião com a equipe amanhã às 10h", (11, 10, 0), (11, 11, 0), "Reunião com a equipe"),
+    ("marca reunião amanhã às 10 horas com o time", (11, 10, 0), (11, 11, 0), "Reunião com o time"),
+    ("marca reunião com o time para amanhã às 15h para revisar o sprint", (11, 15, 0), (11, 16, 0), "Reunião com o time para revisar o sprint"),
+    ("marca reunião com o cliente amanhã ao meio-dia", (11, 12, 0), (11, 13, 0), "Reunião com o cliente"),
+    ("agenda reunião com o time às 3 da tarde", (10, 15, 0), (10, 16, 0), "Reunião com o time"),
+])
+def test_schedule_times_durations_and_titles(text, start, end, summary):
+    intent = route_message(text, NOW)
+    assert intent["intent"] == "schedule"
+    assert (intent["start"].day, intent["start"].hour, intent["start"].minute) == start
+    assert (intent["end"].day, intent["end"].hour, intent["end"].minute) == end
+    assert intent["summary"] == summary
+
+def test_time_already_passed_today_moves_to_tomorrow():
+    intent = route_message("marca reunião às 7h com o time", NOW)
+    assert intent["start"] == datetime(2025, 3, 11, 7, 0)
+
+def test_schedule_without_time_is_not_confident():
+    assert route_message("marca reunião com o time", NOW) is None
+
+@pytest.mark.parametrize("text, intent", [
+    ("quais são minhas tarefas?", "tasks"),
+    ("tenho horários livres sexta?", "free_time"),
+    ("o que tenho hoje?", "agenda"),
+])
+def test_other_intents(text, intent):
+    assert route_message(text, NOW)["intent"] == intent
+
+def test_advice_goes_to_the_assistant():
+    assert route_message("como organizo minha agenda da semana?", NOW) is None
@@ -0,0 +1,86 @@
+import time
+import asyncio
+from datetime import datetime, date, timedelta
+from types import SimpleNamespace
+from calendar_store import LOCAL_TZ
+from reminders import ReminderScheduler, EVENT_REMINDER_MINUTES
+from task_store import TaskStore
+
+class FakeJobQueue:
+    def run_once(self, callback, when, name=None):
+        return SimpleNamespace(schedule_removal=lambda: None)
+
+class FakeBot:
+    def __init__(self):
+        self.sent = []
+
+    async def send_message(self, chat_id, text):
+        self.sent.append((chat_id, text))
+
+def make_scheduler(tmp_path):
+    scheduler = ReminderScheduler(store=TaskStore(str(tmp_path / "tasks.db")))
+    scheduler._application = SimpleNamespace(job_queue=FakeJobQueue())
+    scheduler._loaded_until = time.time() + 86400
+    return scheduler
+
+def starting_in(seconds: float) -> datetime:
+    return datetime.now(LOCAL_TZ) + timedelta(minutes=EVENT_REMINDER_MINUTES, seconds=seconds)
+
+def event_at(start: datetime) -> dict:
+    return {"start": {"dateTime": start.isoformat()}, "end": {"dateTime": (start + timedelta(hours=1)).isoformat()}}
+
+def test_cancelled_meeting_is_not_reminded(tmp_path):
+    async def scenario():
+        scheduler = make_scheduler(tmp_path)
+        bot = FakeBot()
+        await scheduler.event_scheduled(1, "evt", "Planejamento", starting_in(0.2))
+        await scheduler.event_changed("evt", None)
+        await asyncio.sleep(0.3)
+        await scheduler._fire(SimpleNamespace(bot=bot))
+        remaining = await scheduler.store.event_reminders_of("evt")
+        await scheduler.store.close()
+        return bot.sent, remaining
+
+    sent, remaining = asyncio.run(scenario())
+    assert sent == []
+    assert remaining == []
+
+def test_rescheduled_meeting_is_reminded_at_the_new_time(tmp_path):
+    async def scenario():
+        scheduler = make_scheduler(tmp_path)
+        bot = FakeBot()
+        await scheduler.event_scheduled(1, "evt", "Planejamento", starting_in(0.2))
+        await scheduler.event_changed("evt", event_at(starting_in(0.6)))
+        await asyncio.sleep(0.3)
+        await scheduler._fire(SimpleNamespace(bot=bot))
+        early = list(bot.sent)
+        await asyncio.sleep(0.4)
+        await scheduler._fire(SimpleNamespace(bot=bot))
+        await scheduler.store.close()
+        return early, bot.sent
+
+    early, sent = asyncio.run(scenario())
+    assert early == []
+    assert len(sent) == 1 and "Planejamento" in sent[0][1]
+
+def test_meeting_moved_by_another_process_is_not_reminded_at_the_old_time(tmp_path):
+    async def scenario():
+        scheduler = make_scheduler(tmp_path)
+        bot = FakeBot()
+        await scheduler.event_scheduled(1, "evt", "Planejamento", starting_in(0.2))
+        # Outro worker só atualiza o banco; o heap deste processo continua com o horário antigo
+        start = starting_in(3600)
+        await scheduler.store.move_event_reminders("evt", start.timestamp(), start.timestamp() - EVENT_REMINDER_MINUTES * 60)
+        await asyncio.sleep(0.3)
+        await scheduler._fire(SimpleNamespace(bot=bot))
+        await scheduler.store.close()
+        return bot.sent, scheduler._heap
+
+    sent, heap = asyncio.run(scenario())
+    assert sent == []
+    assert len(heap) == 1
+
+def test_task_due_today_after_the_reminder_hour_reports_no_reminder(tmp_path):
+    scheduler = make_scheduler(tmp_path)
+    assert scheduler.task_added(1, 1, "Ontem", date.today() - timedelta(days=1)) is False
+    assert scheduler.task_added(2, 1, "Amanhã", date.today() + timedelta(days=2)) is True
@@ -0,0 +1,54 @@
+import os
+import time
+import multiprocessing
+from response_cache import ResponseCache
+
+def save_shard(path: str, shard: int):
+    cache = ResponseCache(path=path)
+    for n in range(200):
+        cache.put(f"shard{shard}:{n}", "x" * 100)
+    cache.save(shard=shard)
+
+def test_each_shard_keeps_its_entries_when_workers_save_together(tmp_path):
+    path = str(tmp_path / "cache.json")
+    context = multiprocessing.get_context("spawn")
+    processes = [context.Process(target=save_shard, args=(path, shard)) for shard in range(4)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(30)
+        assert process.exitcode == 0
+
+    cache = ResponseCache(path=path)
+    cache.load()
+    assert len(cache._entries) == 800
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".tmp")]
+
+def test_load_merges_files_and_keeps_the_latest_expiry(tmp_path):
+    path = str(tmp_path / "cache.json")
+    old = ResponseCache(path=path, ttl=60)
+    old.put("a", "antiga")
+    old.save()
+    new = ResponseCache(path=path, ttl=120)
+    new.put("a", "nova")
+    new.save(shard=1)
+    expired = ResponseCache(path=path, ttl=-1)
+    expired.put("b", "vencida")
+    expired.save(shard=2)
+
+    cache = ResponseCache(path=path)
+    cache.load()
+    assert cache.get("a") == "nova"
+    assert cache.get("b") is None
+
+def test_load_keeps_only_max_entries(tmp_path):
+    path = str(tmp_path / "cache.json")
+    saved = ResponseCache(path=path, max_entries=10)
+    for n in range(10):
+        saved.put(str(n), "x")
+        time.sleep(0.001)
+    saved.save()
+
+    cache = ResponseCache(path=path, max_entries=3)
+    cache.load()
+    assert list(cache._entries) == ["7", "8", "9"]
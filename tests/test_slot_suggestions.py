@@ -0,0 +1,36 @@
+import asyncio
+from datetime import datetime, timedelta
+import pytest
+import schedule_calendar
+from calendar_store import LOCAL_TZ
+from slot_suggestions import day_bitset, rank_slots, WORK_START_HOUR, WORK_END_HOUR
+
+DAY = datetime(2025, 3, 10, tzinfo=LOCAL_TZ)
+
+def test_ranked_slots_stay_inside_working_hours_and_avoid_meetings():
+    busy = [(DAY.replace(hour=9), DAY.replace(hour=12))]
+    slots = rank_slots([(DAY, day_bitset(busy, DAY))], 60, limit=3)
+    assert len(slots) == 3
+    for start, end in slots:
+        assert end - start == timedelta(hours=1)
+        assert WORK_START_HOUR <= start.hour and end.hour <= WORK_END_HOUR
+        assert end <= busy[0][0] or start >= busy[0][1]
+
+def test_rank_slots_rejects_non_positive_durations():
+    with pytest.raises(ValueError):
+        rank_slots([(DAY, 0)], 0)
+
+@pytest.mark.parametrize("duration, days", [(0, 14), (-30, 14), (60, 0), (60, 365), (11 * 60, 14)])
+def test_suggest_slots_validates_input(duration, days):
+    result = asyncio.run(schedule_calendar.suggest_slots("sala@empresa.com", duration, days))
+    assert "error" in result
+
+def test_suggest_slots_skips_weekends(monkeypatch):
+    async def no_events(*args, **kwargs):
+        return
+        yield
+
+    monkeypatch.setattr(schedule_calendar, "_iter_events", no_events)
+    result = asyncio.run(schedule_calendar.suggest_slots("sala@empresa.com", 60, 14, limit=20))
+    assert result["slots"]
+    assert all(start.weekday() < 5 for start, _ in result["slots"])
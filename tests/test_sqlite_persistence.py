@@ -0,0 +1,162 @@
+import pickle
+import sqlite3
+import asyncio
+from sqlite_persistence import SQLitePersistence
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+async def settle(persistence):
+    # Deixa o call_soon montar o lote e espera a transação
+    await asyncio.sleep(0)
+    if persistence._commits:
+        await asyncio.gather(*persistence._commits)
+
+def test_user_and_chat_data_round_trip(tmp_path):
+    path = str(tmp_path / "state.db")
+
+    async def write():
+        persistence = SQLitePersistence(path)
+        user_data, chat_data = {}, {}
+        await persistence.refresh_user_data(1, user_data)
+        await persistence.refresh_chat_data(-100, chat_data)
+        user_data["calendar_id"] = "ana@empresa.com"
+        chat_data["board"] = 42
+        await persistence.update_user_data(1, user_data)
+        await persistence.update_chat_data(-100, chat_data)
+        await persistence.update_conversation("schedule", (-100, 1), 2)
+        await persistence.flush()
+        return persistence.writes
+
+    async def read():
+        persistence = SQLitePersistence(path)
+        user_data, chat_data = {}, {}
+        await persistence.refresh_user_data(1, user_data)
+        await persistence.refresh_chat_data(-100, chat_data)
+        conversations = await persistence.get_conversations("schedule")
+        await persistence.flush()
+        return user_data, chat_data, conversations
+
+    assert run(write()) == 3
+    assert run(read()) == ({"calendar_id": "ana@empresa.com"}, {"board": 42}, {(-100, 1): 2})
+
+def test_unchanged_and_never_loaded_data_is_not_written(tmp_path):
+    async def scenario():
+        persistence = SQLitePersistence(str(tmp_path / "state.db"))
+        data = {}
+        await persistence.refresh_user_data(1, data)
+        # Vazio e sem linha no banco, nunca carregado, e igual ao que já está gravado
+        await persistence.update_user_data(1, data)
+        await persistence.update_user_data(2, {"x": 1})
+        data["x"] = 1
+        await persistence.update_user_data(1, data)
+        await settle(persistence)
+        await persistence.update_user_data(1, data)
+        await persistence.flush()
+        return persistence.writes
+
+    assert run(scenario()) == 1
+
+def test_drop_removes_the_row_and_ended_conversations_are_deleted(tmp_path):
+    path = str(tmp_path / "state.db")
+
+    async def scenario():
+        persistence = SQLitePersistence(path)
+        data = {}
+        await persistence.refresh_user_data(1, data)
+        data["x"] = 1
+        await persistence.update_user_data(1, data)
+        await persistence.update_conversation("schedule", (5, 1), 1)
+        await settle(persistence)
+        await persistence.drop_user_data(1)
+        await persistence.update_conversation("schedule", (5, 1), None)
+        await settle(persistence)
+        # Depois de removido, o usuário pode voltar a ter dados
+        data = {"y": 2}
+        await persistence.update_user_data(1, data)
+        await persistence.flush()
+
+    run(scenario())
+    connection = sqlite3.connect(path)
+    rows = connection.execute("SELECT user_id, data, version FROM user_data").fetchall()
+    assert [(user_id, pickle.loads(data), version) for user_id, data, version in rows] == [(1, {"y": 2}, 1)]
+    assert connection.execute("SELECT COUNT(*) FROM conversations").fetchone()[0] == 0
+
+def test_refresh_rereads_a_row_changed_by_another_process(tmp_path):
+    path = str(tmp_path / "state.db")
+
+    async def scenario():
+        first, second = SQLitePersistence(path), SQLitePersistence(path)
+        first_data, second_data = {}, {}
+        await first.refresh_user_data(1, first_data)
+        await second.refresh_user_data(1, second_data)
+        first_data["calendar_id"] = "novo@empresa.com"
+        await first.update_user_data(1, first_data)
+        await settle(first)
+        await second.refresh_user_data(1, second_data)
+        await first.flush()
+        await second.flush()
+        return second_data
+
+    assert run(scenario()) == {"calendar_id": "novo@empresa.com"}
+
+def test_stale_write_is_discarded_instead_of_overwriting(tmp_path):
+    path = str(tmp_path / "state.db")
+
+    async def scenario():
+        first, second = SQLitePersistence(path), SQLitePersistence(path)
+        first_data, second_data = {}, {}
+        await first.refresh_user_data(1, first_data)
+        await second.refresh_user_data(1, second_data)
+        first_data["a"] = 1
+        await first.update_user_data(1, first_data)
+        await settle(first)
+        # O segundo processo grava sem ter visto a mudança do primeiro
+        second_data["b"] = 2
+        await second.update_user_data(1, second_data)
+        await settle(second)
+        conflicts = second.conflicts
+        await second.refresh_user_data(1, second_data)
+        await first.flush()
+        await second.flush()
+        return conflicts, second_data
+
+    conflicts, second_data = run(scenario())
+    assert conflicts == 1
+    assert second_data == {"a": 1}
+
+def test_idle_keys_are_evicted_and_reloaded(tmp_path):
+    async def scenario():
+        persistence = SQLitePersistence(str(tmp_path / "state.db"), idle_seconds=0)
+        data = {}
+        await persistence.refresh_user_data(1, data)
+        data["x"] = 1
+        await persistence.update_user_data(1, data)
+        await settle(persistence)
+        await persistence.refresh_user_data(2, {})
+        evicted = ("user", 1) not in persistence._stored
+        reloaded = {}
+        await persistence.refresh_user_data(1, reloaded)
+        await persistence.flush()
+        return evicted, reloaded, len(persistence._stored)
+
+    assert run(scenario()) == (True, {"x": 1}, 1)
+
+def test_database_without_versions_is_migrated(tmp_path):
+    path = str(tmp_path / "state.db")
+    connection = sqlite3.connect(path)
+    connection.execute("CREATE TABLE user_data (user_id INTEGER PRIMARY KEY, data BLOB NOT NULL)")
+    connection.execute("INSERT INTO user_data VALUES (1, ?)", (pickle.dumps({"x": 1}),))
+    connection.commit()
+    connection.close()
+
+    async def scenario():
+        persistence = SQLitePersistence(path)
+        data = {}
+        await persistence.refresh_user_data(1, data)
+        data["x"] = 2
+        await persistence.update_user_data(1, data)
+        await persistence.flush()
+        return data, persistence.conflicts
+
+    assert run(scenario()) == ({"x": 2}, 0)
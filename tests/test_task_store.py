@@ -0,0 +1,91 @@
+import asyncio
+import sqlite3
+import pytest
+from task_store import TaskStore
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+def test_writes_in_one_batch_are_visible_to_the_next_read(tmp_path):
+    async def scenario():
+        store = TaskStore(str(tmp_path / "tasks.db"), batch_delay=10)
+        # Nada é aguardado antes da leitura: as escritas ainda estão no lote pendente
+        adds = [
+            asyncio.ensure_future(store.add(1, "Relatório", "2025-03-10", "Ana")),
+            asyncio.ensure_future(store.add(1, "Orçamento", "2025-03-05", "Bruno")),
+            asyncio.ensure_future(store.add(2, "Outro chat", "2025-03-01", "Caio")),
+        ]
+        removed = asyncio.ensure_future(store.remove(1, "Relatório"))
+        await asyncio.sleep(0)
+        tasks = await store.list_tasks(1)
+        ids = await asyncio.gather(*adds)
+        result = (tasks, await removed, ids)
+        await store.close()
+        return result
+
+    tasks, removed, ids = run(scenario())
+    assert removed == 1
+    assert [task["description"] for task in tasks] == ["Orçamento"]
+    assert tasks[0]["id"] == ids[1]
+    assert len(set(ids)) == 3
+
+def test_batch_size_flushes_without_waiting_for_the_delay(tmp_path):
+    async def scenario():
+        store = TaskStore(str(tmp_path / "tasks.db"), batch_delay=60, batch_size=2)
+        ids = await asyncio.wait_for(asyncio.gather(*(store.add(1, f"T{n}", "2025-03-01", None) for n in range(4))), 5)
+        await store.close()
+        return ids
+
+    assert len(run(scenario())) == 4
+
+def test_failed_statement_does_not_fail_the_rest_of_the_batch(tmp_path):
+    async def scenario():
+        store = TaskStore(str(tmp_path / "tasks.db"))
+        good = asyncio.ensure_future(store.add(1, "Boa", "2025-03-01", None))
+        bad = asyncio.ensure_future(store.add(1, None, "2025-03-01", None))
+        results = await asyncio.gather(good, bad, return_exceptions=True)
+        count = await store.count(1)
+        await store.close()
+        return results, count
+
+    (good, bad), count = run(scenario())
+    assert isinstance(good, int)
+    assert isinstance(bad, sqlite3.IntegrityError)
+    assert count == 1
+
+def test_priority_due_dates_and_existing_ids(tmp_path):
+    async def scenario():
+        store = TaskStore(str(tmp_path / "tasks.db"))
+        first = await store.add(1, "A", "2025-03-01", None)
+        second = await store.add(2, "B", "2025-03-03", None)
+        await store.add(2, "C", "2025-04-01", None)
+        changed = await store.set_priority(1, "A", "Alta")
+        tasks = await store.list_tasks(1)
+        due = await store.tasks_due("2025-03-01", "2025-03-05")
+        await store.remove(2, "B")
+        existing = await store.existing_ids([first, second])
+        await store.close()
+        return changed, tasks, due, existing, first
+
+    changed, tasks, due, existing, first = run(scenario())
+    assert changed == 1
+    assert tasks[0]["priority"] == "Alta"
+    assert sorted(task["description"] for task in due) == ["A", "B"]
+    assert existing == {first}
+
+def test_tasks_survive_reopening_the_database(tmp_path):
+    path = str(tmp_path / "tasks.db")
+
+    async def write():
+        store = TaskStore(path)
+        await store.add(7, "Persistente", "2025-05-01", "Ana")
+        await store.close()
+
+    async def read():
+        store = TaskStore(path)
+        tasks = await store.list_tasks(7)
+        await store.close()
+        return tasks
+
+    run(write())
+    assert [task["description"] for task in run(read())] == ["Persistente"]
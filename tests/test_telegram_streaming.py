@@ -0,0 +1,47 @@
+import asyncio
+from telegram_streaming import ProgressiveReply, split_message, MAX_MESSAGE_LENGTH
+
+class FakeMessage:
+    def __init__(self, chat: list, text: str = ""):
+        self.chat = chat
+        self.text = text
+
+    async def reply_text(self, text: str):
+        assert len(text) <= MAX_MESSAGE_LENGTH
+        message = FakeMessage(self.chat, text)
+        self.chat.append(message)
+        return message
+
+    async def edit_text(self, text: str):
+        assert len(text) <= MAX_MESSAGE_LENGTH
+        self.text = text
+
+def stream(chunks: list) -> list:
+    async def scenario():
+        chat = []
+        reply = ProgressiveReply(FakeMessage(chat), edit_interval=0)
+        for chunk in chunks:
+            await reply.append(chunk)
+        await reply.finish()
+        return [message.text for message in chat]
+
+    return asyncio.run(scenario())
+
+def test_split_message_breaks_on_lines_and_cuts_long_lines():
+    text = "\n".join(["a" * 3000, "b" * 3000, "c" * 9000])
+    chunks = split_message(text)
+    assert all(len(chunk) <= MAX_MESSAGE_LENGTH for chunk in chunks)
+    assert "".join(chunks) == text.replace("\n", "")
+    assert chunks[0] == "a" * 3000
+
+def test_long_first_chunk_is_split_across_messages():
+    text = "\n".join(f"Linha {n} " + "x" * 90 for n in range(200))
+    messages = stream([text])
+    assert len(messages) > 1
+    assert "\n".join(messages) == text
+
+def test_streamed_overflow_continues_in_new_messages():
+    text = "y" * 10000
+    messages = stream([text[n:n + 700] for n in range(0, len(text), 700)])
+    assert "".join(messages) == text
+    assert len(messages) == 3
@@ -0,0 +1,35 @@
+import asyncio
+from update_processor import ChatOrderedUpdateProcessor
+
+def test_updates_waiting_for_admission_count_as_queued():
+    async def scenario():
+        processor = ChatOrderedUpdateProcessor(workers=1, max_pending=1)
+        release = asyncio.Event()
+        tasks = [asyncio.create_task(processor.process_update(object(), release.wait())) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        depth = processor.queue_depth()
+        release.set()
+        await asyncio.gather(*tasks)
+        return depth, processor.queue_depth(), processor.processed
+
+    depth, after, processed = asyncio.run(scenario())
+    # Um rodando, dois esperando a admissão
+    assert depth == 2
+    assert after == 0
+    assert processed == 3
+
+def test_cancelled_while_waiting_for_admission_leaves_no_queue():
+    async def scenario():
+        processor = ChatOrderedUpdateProcessor(workers=1, max_pending=1)
+        release = asyncio.Event()
+        running = asyncio.create_task(processor.process_update(object(), release.wait()))
+        waiting = asyncio.create_task(processor.process_update(object(), release.wait()))
+        await asyncio.sleep(0.01)
+        waiting.cancel()
+        await asyncio.gather(waiting, return_exceptions=True)
+        depth = processor.queue_depth()
+        release.set()
+        await running
+        return depth
+
+    assert asyncio.run(scenario()) == 0
@@ -0,0 +1,58 @@
+# Imita o Monday.com enviando webhooks para o endpoint local do bot, para testar a
+# invalidação do cache do /monday sem cadastrar um webhook de verdade.
+#
+# Uso: python tools/monday_webhook_sender.py BOARD_ID [BOARD_ID ...] [--url URL] [--type TIPO] [--challenge]
+#   MONDAY_SIGNING_SECRET assina os eventos como o Monday faz; sem ele o bot os recusa.
+import os
+import sys
+import json
+import time
+import hmac
+import base64
+import hashlib
+import argparse
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from monday_webhook import MONDAY_WEBHOOK_PATH
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+def sign(payload: dict, secret: str) -> str:
+    header = _b64encode(json.dumps({"alg": "HS256", "typ": "JWT"}).encode())
+    claims = _b64encode(json.dumps(payload).encode())
+    signature = hmac.new(secret.encode(), f"{header}.{claims}".encode(), hashlib.sha256).digest()
+    return f"{header}.{claims}.{_b64encode(signature)}"
+
+def main():
+    port = os.getenv("MONDAY_WEBHOOK_PORT", "8081")
+    parser = argparse.ArgumentParser(description="Envia webhooks de teste do Monday.com")
+    parser.add_argument("board_ids", nargs="*")
+    parser.add_argument("--url", default=f"http://127.0.0.1:{port}{MONDAY_WEBHOOK_PATH}")
+    parser.add_argument("--type", default="update_column_value")
+    parser.add_argument("--challenge", action="store_true", help="envia o desafio de cadastro do webhook")
+    args = parser.parse_args()
+
+    secret = os.getenv("MONDAY_SIGNING_SECRET")
+    with httpx.Client(timeout=10) as client:
+        if args.challenge:
+            response = client.post(args.url, json={"challenge": "desafio-local"})
+            print(f"desafio -> {response.status_code} {response.text}")
+
+        for board_id in args.board_ids:
+            event = {
+                "event": {
+                    "type": args.type,
+                    "boardId": int(board_id),
+                    "pulseId": 1,
+                    "triggerTime": time.strftime("%Y-%m-%dT%H:%M:%S.000Z", time.gmtime())
+                }
+            }
+            headers = {"Authorization": sign({"dat": {"board_id": board_id}, "iat": int(time.time())}, secret)} if secret else {}
+            response = client.post(args.url, json=event, headers=headers)
+            print(f"board {board_id} -> {response.status_code} {response.text}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+# Reenvia updates gravados do Telegram para o webhook do bot, em rajada, e mede o
+# tempo de resposta do servidor e a vazão.
+#
+# Uso: python tools/replay_updates.py [--url URL] [--file updates.jsonl] [--count N] [--concurrency C] [--chats K]
+#   python tools/replay_updates.py --serve   sobe um servidor local que só enfileira os updates,
+#                                            para medir a entrada sem o Telegram nem os handlers.
+#   TELEGRAM_WEBHOOK_SECRET é enviado no cabeçalho do segredo, como o Telegram faz.
+import os
+import sys
+import copy
+import json
+import time
+import asyncio
+import argparse
+import statistics
+from types import SimpleNamespace
+from urllib.parse import urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from webhook_server import WebhookServer
+from telegram_webhook import webhook_handler, TELEGRAM_WEBHOOK_PATH, TELEGRAM_WEBHOOK_PORT, SECRET_HEADER
+
+SAMPLE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sample_updates.jsonl")
+
+def load_updates(path: str) -> list:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def expand(updates: list, count: int, chats: int) -> list:
+    # Repete os updates gravados espalhando-os por `chats` chats, com update_id crescente
+    expanded = []
+    for index in range(count):
+        update = copy.deepcopy(updates[index % len(updates)])
+        update["update_id"] = index + 1
+        chat_id = 1000 + index % chats
+        payload = update.get("message") or update.get("callback_query", {}).get("message")
+        if payload:
+            payload["chat"]["id"] = chat_id
+            payload["message_id"] = index + 1
+        sender = (update.get("message") or update.get("callback_query") or {}).get("from")
+        if sender:
+            sender["id"] = chat_id
+        expanded.append(update)
+    return expanded
+
+async def post_json(reader, writer, host: str, path: str, headers: dict, update: dict) -> int:
+    # Uma requisição HTTP/1.1 keep-alive escrita de uma vez só, como o Telegram faz
+    body = json.dumps(update).encode()
+    head = "".join(f"{name}: {value}\r\n" for name, value in headers.items())
+    writer.write(
+        f"POST {path} HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n{head}Content-Length: {len(body)}\r\n\r\n".encode() + body
+    )
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        if name.strip().lower() == "content-length":
+            length = int(value)
+    await reader.readexactly(length)
+    return status
+
+async def replay(url: str, secret: str, updates: list, concurrency: int):
+    target = urlsplit(url)
+    port = target.port or (443 if target.scheme == "https" else 80)
+    headers = {SECRET_HEADER: secret} if secret else {}
+    queue = asyncio.Queue()
+    for update in updates:
+        queue.put_nowait(update)
+    latencies = []
+    statuses = {}
+
+    async def sender():
+        reader, writer = await asyncio.open_connection(target.hostname, port, ssl=target.scheme == "https")
+        try:
+            while not queue.empty():
+                update = queue.get_nowait()
+                start = time.perf_counter()
+                status = await post_json(reader, writer, target.netloc, target.path or "/", headers, update)
+                latencies.append((time.perf_counter() - start) * 1000)
+                statuses[status] = statuses.get(status, 0) + 1
+        finally:
+            writer.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(sender() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    print(f"{len(updates)} updates em {elapsed:.2f}s ({len(updates) / elapsed:.0f}/s), status {statuses}")
+    print(
+        f"latência ms: mediana {statistics.median(latencies):.2f}  "
+        f"p95 {latencies[int(len(latencies) * 0.95) - 1]:.2f}  p99 {latencies[int(len(latencies) * 0.99) - 1]:.2f}  máx {latencies[-1]:.2f}"
+    )
+
+async def serve_locally(secret: str):
+    # Mesmo caminho de entrada do bot, com uma fila que só é esvaziada
+    application = SimpleNamespace(bot=None, update_queue=asyncio.Queue())
+    server = WebhookServer("127.0.0.1", 0, {TELEGRAM_WEBHOOK_PATH: webhook_handler(application, secret)})
+    await server.start()
+
+    async def drain():
+        while True:
+            await application.update_queue.get()
+
+    return server, asyncio.create_task(drain())
+
+async def main():
+    parser = argparse.ArgumentParser(description="Reenvia updates gravados para o webhook do bot")
+    parser.add_argument("--url", default=f"http://127.0.0.1:{TELEGRAM_WEBHOOK_PORT}{TELEGRAM_WEBHOOK_PATH}")
+    parser.add_argument("--file", default=SAMPLE_FILE)
+    parser.add_argument("--count", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=40)
+    parser.add_argument("--chats", type=int, default=200)
+    parser.add_argument("--serve", action="store_true", help="sobe um servidor local em vez de usar o bot")
+    args = parser.parse_args()
+
+    secret = os.getenv("TELEGRAM_WEBHOOK_SECRET", "segredo-local")
+    updates = expand(load_updates(args.file), args.count, args.chats)
+    if args.serve:
+        server, drainer = await serve_locally(secret)
+        await replay(f"http://127.0.0.1:{server.port}{TELEGRAM_WEBHOOK_PATH}", secret, updates, args.concurrency)
+        drainer.cancel()
+        await server.stop()
+    else:
+        await replay(args.url, secret, updates, args.concurrency)
+
+if __name__ == "__main__":
+    asyncio.run(main())
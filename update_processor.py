@@ -0,0 +1,129 @@
+import os
+import time
+import asyncio
+import logging
+from collections import Counter
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+logger = logging.getLogger(__name__)
+
+# Quantos updates rodam ao mesmo tempo (de chats diferentes)
+BOT_WORKERS = int(os.getenv("BOT_WORKERS", "16"))
+# Quantos updates podem estar rodando ou esperando a vez do seu chat. Não limita o que o bot
+# aceita: o Application cria uma tarefa para cada update recebido, e as que passam deste
+# limite esperam a admissão (e também contam como fila)
+BOT_MAX_PENDING = int(os.getenv("BOT_MAX_PENDING", "1024"))
+
+def handler_name(update: object) -> str:
+    # Rótulo usado nas métricas: o comando, ou o tipo do update
+    if isinstance(update, Update):
+        if update.message and update.message.text and update.message.text.startswith("/"):
+            return update.message.text.split()[0].split("@")[0]
+        if update.callback_query:
+            return "callback_query"
+        if update.message:
+            return "message"
+        if update.edited_message:
+            return "edited_message"
+    return type(update).__name__
+
+class ChatOrderedUpdateProcessor(BaseUpdateProcessor):
+    """Processa updates de chats diferentes em paralelo e os do mesmo chat em ordem.
+
+    Cada chat tem uma fila (um Lock justo): um update só começa quando o anterior
+    do mesmo chat terminou, então os estados do ConversationHandler não se
+    atropelam. Depois disso o update espera um dos `workers` livres.
+
+    Antes disso, no máximo `max_pending` updates entram nas filas dos chats; os
+    demais esperam a admissão. A profundidade da fila soma todos os que ainda
+    não começaram.
+    """
+
+    def __init__(self, workers: int = BOT_WORKERS, max_pending: int = BOT_MAX_PENDING):
+        # O limite do processador é a admissão abaixo; o semáforo da classe base não segura nada,
+        # já que o Application cria a tarefa do update antes de chegar a ele
+        super().__init__(2 ** 31 - 1)
+        self.max_pending = max(max_pending, workers)
+        self.workers = workers
+        self.processed = 0
+        self.in_flight = Counter()
+        self._worker_slots = asyncio.Semaphore(workers)
+        self._admission = asyncio.Semaphore(self.max_pending)
+        self._chats = {}
+        self._waiting = 0
+        self._busy_time = 0.0
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+    async def do_process_update(self, update: object, coroutine):
+        started = False
+        self._waiting += 1
+        try:
+            # Admissão antes da fila do chat: no máximo `max_pending` updates ocupam filas de chat
+            async with self._admission:
+                chat = update.effective_chat if isinstance(update, Update) else None
+                key = chat.id if chat else None
+                name = handler_name(update)
+                lock = self._acquire_chat(key)
+                try:
+                    if lock is not None:
+                        await lock.acquire()
+                    try:
+                        async with self._worker_slots:
+                            self._waiting -= 1
+                            started = True
+                            self.in_flight[name] += 1
+                            start = time.perf_counter()
+                            try:
+                                await coroutine
+                            finally:
+                                self._busy_time += time.perf_counter() - start
+                                self.processed += 1
+                                self.in_flight[name] -= 1
+                                if not self.in_flight[name]:
+                                    del self.in_flight[name]
+                    finally:
+                        if lock is not None:
+                            lock.release()
+                finally:
+                    self._release_chat(key)
+        finally:
+            if not started:
+                # Cancelado ainda na fila: a corrotina nunca será aguardada
+                self._waiting -= 1
+                if hasattr(coroutine, "close"):
+                    coroutine.close()
+
+    def _acquire_chat(self, key):
+        if key is None:
+            return None
+        lock, users = self._chats.get(key) or (asyncio.Lock(), 0)
+        self._chats[key] = (lock, users + 1)
+        return lock
+
+    def _release_chat(self, key):
+        if key is None:
+            return
+        lock, users = self._chats[key]
+        if users == 1:
+            del self._chats[key]
+        else:
+            self._chats[key] = (lock, users - 1)
+
+    def queue_depth(self) -> int:
+        return self._waiting
+
+    def metrics(self) -> dict:
+        return {
+            "workers": self.workers,
+            "queue_depth": self.queue_depth(),
+            "in_flight": dict(self.in_flight),
+            "active_chats": len(self._chats),
+            "processed": self.processed,
+            "busy_seconds": round(self._busy_time, 1)
+        }
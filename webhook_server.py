@@ -0,0 +1,94 @@
+import json
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+READ_TIMEOUT = 10
+# Conexões keep-alive ociosas são fechadas depois deste tempo
+IDLE_TIMEOUT = 60
+MAX_BODY_SIZE = 1024 * 1024
+REASONS = {200: "OK", 400: "Bad Request", 401: "Unauthorized", 403: "Forbidden", 404: "Not Found", 405: "Method Not Allowed", 413: "Payload Too Large", 500: "Internal Server Error"}
+
+class WebhookServer:
+    """Servidor HTTP/1.1 mínimo para receber webhooks (POST com corpo JSON).
+
+    `routes` liga cada caminho a uma corrotina handler(body: bytes, headers: dict)
+    que devolve (status, resposta em dict). As conexões são mantidas abertas
+    (keep-alive) para o remetente reaproveitá-las.
+    """
+
+    def __init__(self, host: str, port: int, routes: dict):
+        self.host = host
+        self.port = port
+        self.routes = routes
+        self._server = None
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        # Com porta 0 o sistema escolhe uma livre
+        self.port = self._server.sockets[0].getsockname()[1]
+        logger.info(f"Servidor de webhooks ouvindo em {self.host}:{self.port}")
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                try:
+                    request_line = await asyncio.wait_for(reader.readline(), IDLE_TIMEOUT)
+                except asyncio.TimeoutError:
+                    break
+                if not request_line.strip():
+                    break
+
+                keep_alive = True
+                try:
+                    status, payload, keep_alive = await asyncio.wait_for(self._dispatch(request_line, reader), READ_TIMEOUT)
+                except (asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError) as e:
+                    status, payload, keep_alive = 400, {"error": str(e) or "Requisição inválida"}, False
+                except Exception as e:
+                    logger.error(f"Erro ao processar webhook: {e}")
+                    status, payload = 500, {"error": "Erro interno"}
+
+                body = json.dumps(payload).encode()
+                writer.write(
+                    f"HTTP/1.1 {status} {REASONS.get(status, 'OK')}\r\n"
+                    f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode() + body
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _dispatch(self, request_line: bytes, reader: asyncio.StreamReader) -> tuple:
+        method, target, version = request_line.decode("latin-1").strip().split(" ", 2)
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        keep_alive = headers.get("connection", "").lower() != "close" and version != "HTTP/1.0"
+
+        length = int(headers.get("content-length", "0"))
+        if length > MAX_BODY_SIZE:
+            return 413, {"error": "Corpo grande demais"}, False
+        body = await reader.readexactly(length)
+
+        handler = self.routes.get(target.split("?", 1)[0])
+        if handler is None:
+            return 404, {"error": "Caminho desconhecido"}, keep_alive
+        if method != "POST":
+            return 405, {"error": "Use POST"}, keep_alive
+        status, payload = await handler(body, headers)
+        return status, payload, keep_alive